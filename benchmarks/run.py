@@ -0,0 +1,207 @@
+"""Benchmark the retrieval, data loading and preprocessing hot paths and startup
+
+Runs fully offline on synthetic embeddings and the bundled data/raw texts, and
+writes the results as JSON to diff between commits:
+
+    python -m benchmarks.run
+    python -m benchmarks.run --full --compare benchmarks/results/<baseline>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Settings require an API key, although no benchmark calls the API
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+import numpy as np  # noqa: E402
+from rich.console import Console  # noqa: E402
+from rich.markup import escape  # noqa: E402
+from rich.table import Table  # noqa: E402
+
+from src.config.settings import settings  # noqa: E402
+
+from . import suites  # noqa: E402
+
+console = Console()
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+FULL_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+BENCHMARKS = ["index_search", "search_step", "data_store", "preprocessing", "startup"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark retrieval, data loading, preprocessing and startup "
+        "offline"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        help=f"Corpus sizes in chunks (default: {DEFAULT_SIZES})",
+        default=None,
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help=f"Benchmark corpus sizes {FULL_SIZES}",
+    )
+    parser.add_argument(
+        "--dimension",
+        type=int,
+        help="Dimension of the synthetic embeddings (default: 256)",
+        default=256,
+    )
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=["numpy", "ivf", "int8", "pq"],
+        help="Index backends to benchmark; recall is measured against numpy",
+        default=["numpy", "ivf", "int8", "pq"],
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=BENCHMARKS,
+        help="Benchmarks to run (default: all)",
+        default=BENCHMARKS,
+    )
+    parser.add_argument(
+        "--queries", type=int, help="Queries per search benchmark", default=100
+    )
+    parser.add_argument("--top-k", type=int, help="Top-k per query", default=10)
+    parser.add_argument(
+        "--repeat", type=int, help="Timed repetitions per measurement", default=3
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="JSON results file (default: benchmarks/results/<time>_<commit>.json)",
+        default=None,
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        help="Earlier JSON results file to compare timings with",
+        default=None,
+    )
+    return parser.parse_args()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "preprocessing": settings.preprocessing.model_dump(),
+    }
+
+
+def result_id(result: Dict[str, Any]) -> str:
+    params = ",".join(f"{key}={value}" for key, value in result["params"].items())
+    return f"{result['benchmark']}[{params}]"
+
+
+def display_results(results: List[Dict[str, Any]], baseline: Dict[str, Any] = None):
+    """Display results in a table, with timing ratios against a baseline run"""
+    table = Table(title="Benchmark Results")
+    table.add_column("Benchmark", style="cyan", overflow="fold")
+    table.add_column("Metrics", style="green")
+    if baseline is not None:
+        table.add_column("vs Baseline", style="yellow")
+        baseline_metrics = {result_id(r): r["metrics"] for r in baseline["results"]}
+
+    for result in results:
+        metrics = result["metrics"]
+        row = [
+            escape(result_id(result)),
+            ", ".join(
+                f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in metrics.items()
+            ),
+        ]
+        if baseline is not None:
+            previous = baseline_metrics.get(result_id(result), {})
+            # Ratios of timings only: above 1.0 is slower than the baseline
+            row.append(
+                ", ".join(
+                    f"{key} x{metrics[key] / previous[key]:.2f}"
+                    for key in metrics
+                    if (key.endswith("_s") or key.endswith("_ms") or key == "seconds")
+                    and previous.get(key)
+                )
+            )
+        table.add_row(*row)
+
+    console.print(table)
+
+
+def main():
+    args = parse_args()
+    sizes = args.sizes or (FULL_SIZES if args.full else DEFAULT_SIZES)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="benchmarks-") as workdir:
+        workdir = Path(workdir)
+        if "index_search" in args.only:
+            results += suites.bench_index_search(
+                sizes,
+                args.dimension,
+                args.backends,
+                args.queries,
+                args.top_k,
+                args.repeat,
+            )
+        if "search_step" in args.only:
+            results += suites.bench_search_step(
+                sizes, args.dimension, args.queries, args.repeat, workdir
+            )
+        if "data_store" in args.only:
+            results += suites.bench_data_store(
+                sizes, args.dimension, args.repeat, workdir
+            )
+        if "preprocessing" in args.only:
+            results += suites.bench_preprocessing(args.repeat)
+        if "startup" in args.only:
+            results += suites.bench_startup(args.repeat)
+
+    run = {"environment": environment(), "args": vars(args), "results": results}
+    if args.output:
+        output_path = Path(args.output)
+    else:
+        timestamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        output_path = Path("benchmarks/results") / f"{timestamp}_{git_commit()}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(run, indent=2), encoding="utf-8")
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+    display_results(results, baseline)
+    console.log(f"[bold green]✅ Results saved to {output_path}[/bold green]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+from haystack import Document
+import numpy as np
+
+from src.data_preparation.preprocessed_data_store import PreprocessedDataStore
+from src.data_preparation.preprocessing import TextPreprocessor
+from src.pipeline.steps.similarity_search import SimilaritySearchStep
+from src.utils.run_log import RunLogger
+from src.vector_store.base import SimilarityIndex
+from src.vector_store.ivf_index import IVFSimilarityIndex
+from src.vector_store.numpy_index import NumpySimilarityIndex
+from src.vector_store.quantization import ProductQuantizer, ScalarQuantizer
+from src.vector_store.quantized_index import QuantizedSimilarityIndex
+from src.vector_store.recall import recall_at_k
+
+from .synthetic import (
+    RAW_TEXTS,
+    StubEmbedder,
+    load_words,
+    synthetic_documents,
+    synthetic_embeddings,
+)
+
+# Largest corpora for benchmarks that hold a text chunk per document in memory,
+# and for JSONL which stores embeddings as text
+SEARCH_STEP_MAX_SIZE = 100_000
+JSONL_MAX_SIZE = 100_000
+
+Result = Dict[str, Any]
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Wall-clock seconds of `repeat` calls of a function"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.fmean(timings),
+    }
+
+
+def result(benchmark: str, params: Dict[str, Any], metrics: Dict[str, Any]) -> Result:
+    return {"benchmark": benchmark, "params": params, "metrics": metrics}
+
+
+def create_index(backend: str, dimension: int) -> SimilarityIndex:
+    """Index of a benchmarked backend, with its default parameters"""
+    if backend == "numpy":
+        return NumpySimilarityIndex()
+    if backend == "ivf":
+        return IVFSimilarityIndex(nlist=None, nprobe=16)
+    if backend == "int8":
+        return QuantizedSimilarityIndex(quantizer=ScalarQuantizer())
+    if backend == "pq":
+        return QuantizedSimilarityIndex(quantizer=ProductQuantizer(dimension // 8))
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+def index_bytes(index: SimilarityIndex) -> int:
+    """In-memory size of the arrays an index scans"""
+    if isinstance(index, QuantizedSimilarityIndex):
+        return index.codes.nbytes
+    if isinstance(index, IVFSimilarityIndex):
+        return index.list_matrix.nbytes + index.centroids.nbytes
+    return index.matrix.nbytes
+
+
+def bench_index_search(
+    sizes: Sequence[int],
+    dimension: int,
+    backends: Sequence[str],
+    queries: int,
+    top_k: int,
+    repeat: int,
+) -> List[Result]:
+    """Build time, query latency, memory and recall@k of every index backend"""
+    results = []
+    for size in sizes:
+        embeddings = synthetic_embeddings(size + queries, dimension)
+        corpus, query_embeddings = embeddings[:size], embeddings[size:]
+        documents = [Document(id=str(i), content="") for i in range(size)]
+
+        exact = None
+        for backend in backends:
+            index = create_index(backend, dimension)
+            build = measure(lambda: index.add_documents(documents, corpus), 1)
+            search = measure(
+                lambda: list(index.search_batch(query_embeddings, top_k=top_k)),
+                repeat,
+            )
+
+            metrics = {
+                "build_s": build["median_s"],
+                "query_ms": search["median_s"] * 1000 / queries,
+                "index_bytes": index_bytes(index),
+            }
+            if backend == "numpy":
+                exact = index
+            elif exact is not None:
+                report = recall_at_k(index, exact, query_embeddings, top_k)
+                metrics["similar_recall"] = report.similar_recall
+                metrics["dissimilar_recall"] = report.dissimilar_recall
+
+            results.append(
+                result(
+                    "index_search",
+                    {
+                        "backend": backend,
+                        "size": size,
+                        "dimension": dimension,
+                        "queries": queries,
+                        "top_k": top_k,
+                    },
+                    metrics,
+                )
+            )
+    return results
+
+
+def bench_search_step(
+    sizes: Sequence[int], dimension: int, queries: int, repeat: int, workdir: Path
+) -> List[Result]:
+    """Latency of SimilaritySearchStep over an exact index, run logging included"""
+    words = load_words()
+    results = []
+    for size in sizes:
+        if size > SEARCH_STEP_MAX_SIZE:
+            continue
+
+        embeddings = synthetic_embeddings(size + queries, dimension)
+        index = NumpySimilarityIndex()
+        index.add_documents(synthetic_documents(size, words), embeddings[:size])
+
+        step = SimilaritySearchStep(embedder=StubEmbedder(dimension), index=index)
+        step.run_log = RunLogger(log_dir=workdir / "logs")
+        query_documents = [
+            Document(content=doc.content, embedding=embedding.tolist())
+            for doc, embedding in zip(
+                synthetic_documents(queries, words[::-1]), embeddings[size:]
+            )
+        ]
+
+        timing = measure(
+            lambda: step.execute({"query_documents": query_documents}), repeat
+        )
+        step.run_log.close()
+        results.append(
+            result(
+                "search_step",
+                {"size": size, "dimension": dimension, "queries": queries},
+                {"query_ms": timing["median_s"] * 1000 / queries},
+            )
+        )
+    return results
+
+
+def bench_data_store(
+    sizes: Sequence[int], dimension: int, repeat: int, workdir: Path
+) -> List[Result]:
+    """Save and load time and file size of every PreprocessedDataStore format"""
+    words = load_words()
+    results = []
+    for size in sizes:
+        embeddings = synthetic_embeddings(size, dimension)
+        documents = [
+            Document(content=doc.content, meta=doc.meta, embedding=embedding)
+            for doc, embedding in zip(synthetic_documents(size, words), embeddings)
+        ]
+
+        for storage_type in ("npy", "jsonl"):
+            if storage_type == "jsonl" and size > JSONL_MAX_SIZE:
+                continue
+
+            store = PreprocessedDataStore(storage_type=storage_type)
+            path = workdir / f"chunks-{size}.jsonl"
+            save = measure(lambda: store.save_chunks(documents, str(path)), 1)
+
+            if storage_type == "npy":
+                matrix_path, meta_path = store.npy_paths(str(path))
+                files = [matrix_path, meta_path]
+
+                def load():
+                    store.load_chunks(str(path), with_embeddings=False)
+                    np.asarray(store.load_embedding_matrix(str(path))).sum()
+
+            else:
+                files = [path]
+
+                def load():
+                    store.load_chunks(str(path))
+
+            results.append(
+                result(
+                    "data_store",
+                    {"format": storage_type, "size": size, "dimension": dimension},
+                    {
+                        "save_s": save["median_s"],
+                        "load_s": measure(load, repeat)["median_s"],
+                        "file_bytes": sum(f.stat().st_size for f in files),
+                    },
+                )
+            )
+            for f in files:
+                f.unlink()
+    return results
+
+
+def bench_preprocessing(repeat: int) -> List[Result]:
+    """Chunking time of the bundled raw texts, whole-text and streamed"""
+    preprocessor = TextPreprocessor()
+    odyssey, dalloway = (str(path) for path in RAW_TEXTS)
+    runs = {
+        "process_odyssey": lambda: preprocessor.process_odyssey(odyssey),
+        "iter_odyssey": lambda: list(preprocessor.iter_odyssey(odyssey)),
+        "get_dalloway_queries": lambda: preprocessor.get_dalloway_queries(dalloway),
+    }
+
+    results = []
+    for name, run in runs.items():
+        chunks = len(run())
+        timing = measure(run, repeat)
+        results.append(
+            result(
+                "preprocessing",
+                {"function": name},
+                {"seconds": timing["median_s"], "chunks": chunks},
+            )
+        )
+    return results
+
+
+# Commands whose wall-clock time, interpreter startup included, is the CLI's
+# startup time; "python" runs nothing and gives the interpreter baseline
+STARTUP_COMMANDS = {
+    "python": ["-c", "pass"],
+    "main_help": ["-m", "src.main", "--help"],
+    "import_main": ["-c", "import src.main"],
+    "import_pipeline": ["-c", "import src.pipeline.pipeline_facade"],
+    "import_data_manager": ["-c", "import src.data_preparation.data_manager"],
+}
+
+
+def bench_startup(repeat: int) -> List[Result]:
+    """Wall-clock time of CLI and import commands, each in a fresh interpreter"""
+    results = []
+    for name, command in STARTUP_COMMANDS.items():
+
+        def run():
+            subprocess.run(
+                [sys.executable, *command], check=True, stdout=subprocess.DEVNULL
+            )
+
+        run()  # Warm the bytecode and file system caches
+        timing = measure(run, repeat)
+        results.append(
+            result(
+                "startup",
+                {"command": name},
+                {"min_s": timing["min_s"], "median_s": timing["median_s"]},
+            )
+        )
+    return results
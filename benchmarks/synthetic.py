@@ -0,0 +1,86 @@
+import hashlib
+from pathlib import Path
+from typing import List, Sequence
+from haystack import Document
+import numpy as np
+
+RAW_TEXTS = [Path("data/raw/odyssey_butcher.txt"), Path("data/raw/mrs_dalloway.txt")]
+
+# Words per synthetic chunk, about the size of a 10-sentence chunk
+CHUNK_WORDS = 200
+
+# Rows generated at a time, bounding the temporary memory of large corpora
+BLOCK_SIZE = 65536
+
+
+def synthetic_embeddings(n: int, dimension: int, seed: int = 42) -> np.ndarray:
+    """Unit-length float32 embeddings scattered around random topic centroids
+
+    Clustered vectors behave like text embeddings for approximate indexes, where
+    uniformly random vectors would have no structure to exploit.
+
+    Args:
+        n: Number of embeddings
+        dimension: Embedding dimension
+        seed: Random seed
+    """
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((max(16, int(np.sqrt(n))), dimension))
+    centroids = centroids.astype(np.float32)
+
+    embeddings = np.empty((n, dimension), dtype=np.float32)
+    for start in range(0, n, BLOCK_SIZE):
+        size = min(BLOCK_SIZE, n - start)
+        block = centroids[rng.integers(0, len(centroids), size)]
+        block += rng.standard_normal((size, dimension), dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        embeddings[start : start + size] = block
+    return embeddings
+
+
+def load_words() -> List[str]:
+    """Words of the bundled raw texts"""
+    return [word for path in RAW_TEXTS for word in path.read_text("utf-8").split()]
+
+
+def synthetic_documents(n: int, words: Sequence[str]) -> List[Document]:
+    """Chunks of real text cut from the bundled texts at spread-out offsets
+
+    Args:
+        n: Number of documents
+        words: Words to cut the chunks from (see `load_words`)
+    """
+    documents = []
+    for i in range(n):
+        start = (i * 7919) % (len(words) - CHUNK_WORDS)
+        documents.append(
+            Document(
+                id=str(i),
+                content=" ".join(words[start : start + CHUNK_WORDS]),
+                meta={"chapter": f"Book {i % 24 + 1}", "chunk_id": i},
+            )
+        )
+    return documents
+
+
+class StubEmbedder:
+    """Offline stand-in for OpenAIEmbedder with deterministic pseudo-embeddings"""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    def embed_query(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8])
+        vector = np.random.default_rng(seed).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, documents: List[Document]) -> List[Document]:
+        return [
+            Document(
+                id=doc.id,
+                content=doc.content,
+                meta=doc.meta,
+                embedding=self.embed_query(doc.content),
+            )
+            for doc in documents
+        ]
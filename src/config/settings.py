@@ -7,6 +7,22 @@ class TextPaths(BaseSettings):
     raw_path: Path
     processed_path: Path | None = None
     query_path: Path | None = None
+    # Sources are queried against targets; every target gets its own index
+    role: Literal["source", "target"] = "target"
+    title: str | None = None
+    # "books" splits the text at BOOK headings, "plain" chunks it as a whole
+    structure: Literal["plain", "books"] = "plain"
+    # Number of chunks randomly sampled as queries from a source (None: all)
+    sample_size: int | None = None
+
+    @property
+    def output_path(self) -> Path:
+        """Path the text's preprocessed chunks are saved under"""
+        return (
+            self.query_path
+            or self.processed_path
+            or Path("data/processed") / f"{self.raw_path.stem}.jsonl"
+        )
 
 
 class PreprocessingSettings(BaseSettings):
@@ -14,29 +30,108 @@ class PreprocessingSettings(BaseSettings):
     chunk_size: int = 4
     chunk_overlap: int = 1
     include_context_header: bool = True
+    streaming: bool = False
+    num_workers: int = 1
+    stream_window_chars: int = 100000
 
 
 class EmbeddingSettings(BaseSettings):
     api_model: str = "text-embedding-3-small"
     dimension: int = 1536
+    # Full size of the model's embeddings. A smaller `dimension` is requested via
+    # the API's `dimensions` argument, or, with truncate_locally, computed from
+    # full-size vectors by truncation and renormalization (which keeps the
+    # full-size vectors cached for other sizes)
+    native_dimension: int = 1536
+    truncate_locally: bool = False
+    cache_enabled: bool = True
+    max_concurrency: int = 4
+    max_batch_size: int = 512
+    batch_token_budget: int = 100000
+    storage_format: Literal["jsonl", "npy"] = "npy"
+    storage_dtype: Literal["float32", "float16"] = "float32"
+    # Compact in-memory codes scanned by the "numpy" backend, with the best and
+    # worst rescore_candidates per query rescored exactly in float32 (other
+    # backends reject it)
+    quantization: Literal["none", "int8", "pq"] = "none"
+    pq_subvectors: int = 96
+    rescore_candidates: int = 100
 
     class Config:
         protected_namespaces = ("settings_",)
 
 
+class VectorStoreSettings(BaseSettings):
+    backend: Literal["numpy", "ivf", "qdrant"] = "numpy"
+    query_block_size: int = 256
+    persistent: bool = False
+    # Approximate "ivf" backend: inverted lists (default: 4 * sqrt(corpus size))
+    # and lists probed per query, trading recall for latency
+    ivf_nlist: int | None = None
+    ivf_nprobe: int = 16
+    # Qdrant server (instead of the local, exact-search store) and its HNSW graph
+    qdrant_url: str | None = None
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    # Sampled queries for the recall@k check of approximate backends (0: off)
+    recall_check_queries: int = 0
+
+
 class LLMSettings(BaseSettings):
     model: str = "gpt-4o"
     temperature: float = 0
     max_tokens: int = 2000
     prompt_template: Literal["expert_prompt", "naive_prompt"] = "expert_prompt"
+    max_concurrency: int = 4
+    requests_per_minute: int | None = 500
+    tokens_per_minute: int | None = 30000
+    batch_poll_interval: float = 30
+    # Limits of one Batch API job; larger runs are split into several batches
+    batch_max_requests: int = 50000
+    batch_max_file_bytes: int = 190_000_000
+    cache_enabled: bool = True
+    refresh_cache: bool = False
+    cache_max_entries: int = 10000
+    use_prompt_cache_key: bool = True
+    # Assumptions used by --dry-run to project output cost and duration; the
+    # output estimate is also reserved against tokens_per_minute per request
+    estimated_output_tokens: int = 1200
+    estimated_latency_seconds: float = 30
 
     class Config:
         protected_namespaces = ("settings_",)
 
 
+class HTTPSettings(BaseSettings):
+    # Connection pool shared by the embedders, the analysis step and the batch runner
+    max_connections: int = 32
+    max_keepalive_connections: int = 16
+    keepalive_expiry: float = 30
+    # Negotiated with the server when the h2 package is installed
+    http2: bool = True
+    connect_timeout: float = 10
+    # Read/write timeout; analyses with long outputs take a while
+    timeout: float = 600
+    max_retries: int = 2
+
+
+class MetricsSettings(BaseSettings):
+    # Export every timed stage as an OpenTelemetry span (needs opentelemetry-api)
+    opentelemetry: bool = False
+
+
+class RunLogSettings(BaseSettings):
+    # "quiet" logs no search results, "info" logs sampled top/bottom-k hits and
+    # score statistics, "debug" adds the full score ranking and per-hit console output
+    verbosity: Literal["quiet", "info", "debug"] = "info"
+    # Fraction of queries whose search result is written to the run log
+    sample_rate: float = 1.0
+
+
 class Settings(BaseSettings):
     # OpenAI
     openai_api_key: str
+    openai_base_url: str | None = None
 
     # LLM settings
     llm: LLMSettings = LLMSettings()
@@ -47,15 +142,34 @@ class Settings(BaseSettings):
     # Embedding settings
     embeddings: EmbeddingSettings = EmbeddingSettings()
 
-    # Text paths
+    # Vector store settings
+    vector_store: VectorStoreSettings = VectorStoreSettings()
+
+    # HTTP client settings
+    http: HTTPSettings = HTTPSettings()
+
+    # Metrics settings
+    metrics: MetricsSettings = MetricsSettings()
+
+    # Run log settings
+    run_log: RunLogSettings = RunLogSettings()
+
+    # Corpus registry: any number of source and target texts, by name.
+    # The first source and target form the default pair; --all-pairs runs all.
     texts: Dict[str, TextPaths] = {
         "dalloway": TextPaths(
             raw_path="data/raw/mrs_dalloway.txt",
             query_path="data/processed/mrs_dalloway_queries.jsonl",
+            role="source",
+            title="Mrs Dalloway",
+            sample_size=20,
         ),
         "odyssey": TextPaths(
             raw_path="data/raw/odyssey_butcher.txt",
             processed_path="data/processed/odyssey_processed.jsonl",
+            role="target",
+            title="The Odyssey",
+            structure="books",
         ),
     }
 
@@ -63,6 +177,10 @@ class Settings(BaseSettings):
     storage: Dict[str, Path] = {
         "persist_dir": Path("data/persisted"),
         "embeddings_dir": Path("data/persisted/embeddings"),
+        "batch_dir": Path("data/batches"),
+        "analysis_cache_dir": Path("data/persisted/analysis_cache"),
+        "preprocessing_manifest": Path("data/processed/manifest.json"),
+        "log_dir": Path("data/logs"),
     }
 
     class Config:
@@ -1,5 +1,19 @@
-from .preprocessing import TextPreprocessor
-from .data_manager import DataManager
-from .preprocessed_data_store import PreprocessedDataStore
+import importlib
 
-__all__ = ["TextPreprocessor", "DataManager", "PreprocessedDataStore"]
+# Re-exports are imported on first access, so importing a light module of the
+# package (e.g. corpus_registry) doesn't load NLTK and Haystack
+_EXPORTS = {
+    "TextPreprocessor": ".preprocessing",
+    "DataManager": ".data_manager",
+    "PreprocessedDataStore": ".preprocessed_data_store",
+    "CorpusRegistry": ".corpus_registry",
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["TextPreprocessor", "DataManager", "PreprocessedDataStore", "CorpusRegistry"]
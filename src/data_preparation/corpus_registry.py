@@ -0,0 +1,40 @@
+from typing import Dict, List, Optional
+from src.config.settings import TextPaths, settings
+
+
+class CorpusRegistry:
+    """Source and target texts declared in settings.texts"""
+
+    def __init__(self, texts: Optional[Dict[str, TextPaths]] = None):
+        """Initialize the registry
+
+        Args:
+            texts: Texts by name (default: settings.texts)
+        """
+        if texts is None:
+            texts = settings.texts
+        self.texts = texts
+        if not self.sources() or not self.targets():
+            raise ValueError(
+                "settings.texts must declare at least one source and one target text"
+            )
+
+    def sources(self) -> List[str]:
+        """Names of the source texts, whose chunks are used as queries"""
+        return [name for name, text in self.texts.items() if text.role == "source"]
+
+    def targets(self) -> List[str]:
+        """Names of the target texts, which are indexed and searched"""
+        return [name for name, text in self.texts.items() if text.role == "target"]
+
+    @property
+    def default_source(self) -> str:
+        return self.sources()[0]
+
+    @property
+    def default_target(self) -> str:
+        return self.targets()[0]
+
+    def title(self, name: str) -> str:
+        """Display title of a text, falling back to its name"""
+        return self.texts[name].title or name
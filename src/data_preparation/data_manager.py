@@ -1,75 +1,304 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from functools import cached_property
+from itertools import batched
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
 from haystack import Document
 from rich.console import Console
+import numpy as np
 import random
 
-from src.data_preparation.preprocessing import TextPreprocessor
 from src.data_preparation.preprocessed_data_store import PreprocessedDataStore
+from src.data_preparation.preprocessing_cache import PreprocessingCache
+from src.data_preparation.corpus_registry import CorpusRegistry
 from src.config.settings import settings
-from src.embeddings.openai_embedder import OpenAIEmbedder
+from src.embeddings.openai_embedder import OpenAIEmbedder, truncate_embedding
+from src.utils.fingerprint import corpus_fingerprint
 
 console = Console()
 
 
 class DataManager:
     def __init__(self):
-        self.preprocessor = TextPreprocessor()
-        self.data_store = PreprocessedDataStore()
+        self.data_store = PreprocessedDataStore(
+            storage_type=settings.embeddings.storage_format,
+            dtype=settings.embeddings.storage_dtype,
+        )
         self.embedder = OpenAIEmbedder(document_store=None)
+        self.preprocessing_cache = PreprocessingCache()
+        # Memory-mapped embedding matrices of corpora loaded from "npy" storage,
+        # keyed by text name; their documents carry no embeddings of their own
+        self.embedding_matrices: Dict[str, np.ndarray] = {}
 
-    def prepare_odyssey_chunks(self) -> List[Document]:
-        """Process The Odyssey text and save with embeddings"""
-        output_path = settings.texts["odyssey"].processed_path
+    @cached_property
+    def preprocessor(self):
+        """Text preprocessor, imported on first use as cached chunks don't need it"""
+        from src.data_preparation.preprocessing import TextPreprocessor
+
+        return TextPreprocessor()
+
+    def _load_chunks(self, path: str, name: str | None = None) -> List[Document] | None:
+        """Load saved chunks, converting chunks saved as JSONL to the configured format
+
+        Args:
+            path: Path the chunks were saved to
+            name: Text name; if given and the store is memory-mapped, embeddings are
+                kept in `self.embedding_matrices[name]` instead of being attached
+                to the documents
+
+        Returns:
+            The saved chunks, or None if nothing has been saved at `path` yet
+        """
+        if self.data_store.exists(path):
+            if name is not None and self.data_store.storage_type == "npy":
+                chunks = self.data_store.load_chunks(path, with_embeddings=False)
+                matrix = self.data_store.load_embedding_matrix(path)
+                if len(matrix) == len(chunks):
+                    self.embedding_matrices[name] = matrix
+                    return chunks
+            return self.data_store.load_chunks(path)
 
-        if not Path(output_path).exists():
-            console.log("Processing The Odyssey...")
-            chunks = self.preprocessor.process_odyssey(
-                settings.texts["odyssey"].raw_path
+        if self.data_store.storage_type != "jsonl" and Path(path).exists():
+            console.log(
+                f"Converting {path} to {self.data_store.storage_type} storage..."
             )
-            chunks = self.embedder.embed_documents(chunks)
-            self.data_store.save_chunks(chunks, output_path)
-            return chunks
+            chunks = PreprocessedDataStore(storage_type="jsonl").load_chunks(path)
+            self.data_store.save_chunks(chunks, path)
+            return self._load_chunks(path, name)
 
-        return self.data_store.load_chunks(output_path)
+        return None
 
-    def prepare_dalloway_queries(self, sample_size: int = 20, random_seed: int = 42) -> List[Document]:
-        """Process Mrs Dalloway text into query chunks and randomly sample
+    def _embed_stream(self, chunks: Iterable[Document]) -> Iterator[Document]:
+        """Embed streamed chunks batch by batch, in order
 
-        Args:
-            sample_size: Number of chunks to randomly sample (default: 20)
-            random_seed: Seed for random sampling to ensure consistency (default: 42)
+        Each batch is embedded in a background thread while preprocessing
+        produces the next one, and at most two batches are held in memory.
         """
-        output_path = settings.texts["dalloway"].query_path
+        with ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="stream-embedding"
+        ) as executor:
+            pending = deque()
+            for batch in batched(chunks, settings.embeddings.max_batch_size):
+                pending.append(
+                    executor.submit(self.embedder.embed_documents, list(batch))
+                )
+                if len(pending) > 1:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
 
-        if not Path(output_path).exists():
-            console.log("Processing Mrs Dalloway for queries...")
-            queries = self.preprocessor.get_dalloway_queries(
-                settings.texts["dalloway"].raw_path
+    def _saved_embeddings(
+        self, path: str | Path
+    ) -> Tuple[List[Document], Sequence[np.ndarray | None]] | None:
+        """Chunks saved at `path` and their embeddings, or None if there are none
+
+        Outputs of earlier versions (and of runs with the "jsonl" storage format)
+        are JSONL files, which the "npy" store doesn't see, so they are read as
+        JSONL when the store has nothing at `path`.
+        """
+        if self.data_store.exists(path):
+            if self.data_store.storage_type == "npy":
+                documents = self.data_store.load_chunks(path, with_embeddings=False)
+                matrix = self.data_store.load_embedding_matrix(path)
+                if len(matrix) == len(documents):
+                    return documents, matrix
+            documents = self.data_store.load_chunks(path)
+        elif self.data_store.storage_type != "jsonl" and Path(path).is_file():
+            documents = PreprocessedDataStore(storage_type="jsonl").load_chunks(path)
+        else:
+            return None
+        return documents, [doc.embedding for doc in documents]
+
+    def _previous_embeddings(
+        self, name: str, fingerprint: str, base_path: str
+    ) -> Dict[str, np.ndarray]:
+        """Embeddings of earlier preprocessing outputs of a text, keyed by chunk content
+
+        Covers the text's other cache entries with the current embedding model,
+        plus chunks saved at the unversioned `base_path` by earlier versions.
+        Larger embeddings of those cache entries are truncated to the current
+        dimension when it is shorter than the model's; the unversioned chunks
+        record no model, so only embeddings of the current dimension are reused.
+        """
+        dimension = settings.embeddings.dimension
+        truncatable = dimension < settings.embeddings.native_dimension
+        sources = [
+            (path, truncatable)
+            for path in self.preprocessing_cache.previous_paths(name, fingerprint)
+        ]
+        sources.append((Path(base_path), False))
+
+        previous: Dict[str, np.ndarray] = {}
+        for path, truncate in sources:
+            saved = self._saved_embeddings(path)
+            if saved is None:
+                continue
+
+            documents, embeddings = saved
+            for doc, embedding in zip(documents, embeddings):
+                if embedding is None or doc.content in previous:
+                    continue
+                if len(embedding) == dimension:
+                    previous[doc.content] = embedding
+                elif truncate and len(embedding) > dimension:
+                    previous[doc.content] = truncate_embedding(embedding, dimension)
+        return previous
+
+    def _reuse_embeddings(
+        self, chunks: Iterable[Document], previous: Dict[str, np.ndarray]
+    ) -> Iterator[Document]:
+        """Attach earlier embeddings to chunks whose content is unchanged"""
+        reused = 0
+        for doc in chunks:
+            embedding = previous.get(doc.content) if doc.embedding is None else None
+            if embedding is not None:
+                reused += 1
+                doc = replace(doc, embedding=np.asarray(embedding, dtype=np.float32))
+            yield doc
+
+        if reused:
+            console.log(f"Reused {reused} embeddings from earlier preprocessing runs")
+
+    def _prepare_text(self, name: str) -> List[Document]:
+        """Load a text's chunks from the preprocessing cache, or create and cache them
+
+        Outputs are saved next to the text's configured output path under its
+        corpus fingerprint, so changing the raw text, preprocessing settings or
+        embedding model creates a new cache entry. Unchanged chunks of earlier
+        entries keep their embeddings. Target texts loaded from memory-mapped
+        storage keep their embeddings in `self.embedding_matrices[name]`.
+
+        Args:
+            name: Text name in settings.texts
+        """
+        text = settings.texts[name]
+        title = text.title or name
+        if text.structure == "books":
+            process, stream = (
+                self.preprocessor.process_books,
+                self.preprocessor.iter_books,
             )
-            queries = self.embedder.embed_documents(queries)
-            self.data_store.save_chunks(queries, output_path)
         else:
-            queries = self.data_store.load_chunks(output_path)
+            process, stream = (
+                self.preprocessor.process_text,
+                self.preprocessor.iter_text,
+            )
+
+        fingerprint = corpus_fingerprint(text)
+        output_path = str(
+            self.preprocessing_cache.lookup(fingerprint)
+            or PreprocessingCache.entry_path(text.output_path, fingerprint)
+        )
+        matrix_name = name if text.role == "target" else None
 
-        if sample_size and sample_size < len(queries):
+        chunks = self._load_chunks(output_path, matrix_name)
+        if chunks is not None:
+            return chunks
+
+        previous = self._previous_embeddings(name, fingerprint, text.output_path)
+        if settings.preprocessing.streaming:
+            console.log(f"Streaming {title}...")
+            chunks = self._reuse_embeddings(stream(text.raw_path, title), previous)
+            self.data_store.save_chunks(self._embed_stream(chunks), output_path)
+            chunks = self._load_chunks(output_path, matrix_name)
+        else:
+            console.log(f"Processing {title}...")
+            chunks = list(
+                self._reuse_embeddings(process(text.raw_path, title), previous)
+            )
+            chunks = self.embedder.embed_documents(chunks)
+            self.data_store.save_chunks(chunks, output_path)
+
+        self.preprocessing_cache.record(name, fingerprint, output_path)
+        return chunks
+
+    @staticmethod
+    def _sample(
+        chunks: List[Document], sample_size: int | None, random_seed: int = 42
+    ) -> List[Document]:
+        """Randomly sample chunks reproducibly
+
+        Args:
+            chunks: Chunks to sample from
+            sample_size: Number of chunks to sample (None: all chunks)
+            random_seed: Seed for random sampling to ensure consistency (default: 42)
+        """
+        if sample_size and sample_size < len(chunks):
             # Set random seed for reproducible sampling
             random.seed(random_seed)
-            sampled_queries = random.sample(queries, sample_size)
+            sampled_chunks = random.sample(chunks, sample_size)
             # Reset random seed to avoid affecting other random operations
             random.seed()
-            return sampled_queries
-        return queries
+            return sampled_chunks
+        return chunks
+
+    def prepare_corpus(self, name: str) -> List[Document]:
+        """Load or create the chunks of a registered text
+
+        Source texts are sampled down to their configured `sample_size`.
+        """
+        text = settings.texts[name]
+        chunks = self._prepare_text(name)
+        if text.role == "source":
+            return self._sample(chunks, text.sample_size)
+        return chunks
+
+    def prepare_odyssey_chunks(self) -> List[Document]:
+        """Process The Odyssey text and save with embeddings"""
+        return self._prepare_text("odyssey")
+
+    def prepare_dalloway_queries(
+        self, sample_size: int = 20, random_seed: int = 42
+    ) -> List[Document]:
+        """Process Mrs Dalloway text into query chunks and randomly sample
+
+        Args:
+            sample_size: Number of chunks to randomly sample (default: 20)
+            random_seed: Seed for random sampling to ensure consistency (default: 42)
+        """
+        return self._sample(self._prepare_text("dalloway"), sample_size, random_seed)
 
     def load_data(self) -> Tuple[List[Document], List[Document]]:
-        """Load or create query chunks and Odyssey documents"""
+        """Load or create the query chunks and documents of the default text pair
+
+        The default pair is the first source and first target in settings.texts
+        (Mrs Dalloway and The Odyssey unless configured otherwise).
+        """
         console.log("📚 Loading and preparing documents")
 
-        odyssey_docs = self.prepare_odyssey_chunks()
-        dalloway_queries = self.prepare_dalloway_queries()
+        registry = CorpusRegistry()
+        target_docs = self.prepare_corpus(registry.default_target)
+        queries = self.prepare_corpus(registry.default_source)
 
+        target_title = registry.title(registry.default_target)
+        source_title = registry.title(registry.default_source)
         console.log(
-            f"[bold green]✅ Loaded {len(odyssey_docs)} Odyssey chunks and {len(dalloway_queries)} Dalloway queries![/bold green]"
+            f"[bold green]✅ Loaded {len(target_docs)} {target_title} chunks "
+            f"and {len(queries)} {source_title} queries![/bold green]"
         )
 
-        return dalloway_queries, odyssey_docs
+        return queries, target_docs
+
+    def load_corpora(
+        self,
+    ) -> Tuple[Dict[str, List[Document]], Dict[str, List[Document]]]:
+        """Load or create the chunks of every registered text
+
+        Each text is preprocessed and embedded once, however many pairs it is in.
+
+        Returns:
+            Query chunks by source name and documents by target name
+        """
+        console.log("📚 Loading and preparing all corpora")
+
+        registry = CorpusRegistry()
+        targets = {name: self.prepare_corpus(name) for name in registry.targets()}
+        sources = {name: self.prepare_corpus(name) for name in registry.sources()}
+
+        console.log(
+            f"[bold green]✅ Loaded {len(sources)} source and {len(targets)} "
+            f"target texts![/bold green]"
+        )
+        return sources, targets
@@ -1,24 +1,58 @@
 import json
+import shutil
 from pathlib import Path
-from typing import List, Dict, Union
+from typing import Iterable, List, Dict, Tuple, Union
 from haystack import Document
 import numpy as np
 from rich.console import Console
 
 console = Console()
 
+NPY_FORMAT_VERSION = 1
+
 
 class PreprocessedDataStore:
-    def __init__(self, storage_type: str = "jsonl"):
+    def __init__(self, storage_type: str = "jsonl", dtype: str = "float32"):
+        """Initialize the data store
+
+        Args:
+            storage_type: "jsonl" stores embeddings inline as JSON float lists;
+                "npy" stores them as one binary matrix that is memory-mapped on load,
+                with content and metadata in a sidecar JSONL file
+            dtype: Embedding dtype for the "npy" storage type ("float32" or "float16")
+        """
+        if storage_type not in ("jsonl", "npy"):
+            raise ValueError(f"Unsupported storage type: {storage_type}")
         self.storage_type = storage_type
+        self.dtype = np.dtype(dtype)
+
+    @staticmethod
+    def npy_paths(output_path: str) -> Tuple[Path, Path]:
+        """Paths of the embedding matrix and sidecar metadata file for a store path"""
+        base = Path(output_path).with_suffix("")
+        return base.with_suffix(".npy"), base.with_suffix(".meta.jsonl")
+
+    def exists(self, path: str) -> bool:
+        """Whether chunks have been saved at `path` in this store's format"""
+        if self.storage_type == "npy":
+            return all(p.exists() for p in self.npy_paths(path))
+        return Path(path).exists()
 
     def save_chunks(
-        self, documents: Union[List[Document], List[Dict]], output_path: str
+        self, documents: Union[Iterable[Document], Iterable[Dict]], output_path: str
     ) -> None:
-        """Save preprocessed chunks with their metadata and embeddings"""
+        """Save preprocessed chunks with their metadata and embeddings
+
+        `documents` may be any iterable, e.g. a generator of streamed chunks; it is
+        consumed once and written incrementally.
+        """
+        if self.storage_type == "npy":
+            return self._save_npy(documents, output_path)
+
         console.log(f"💾 Saving chunks to: {output_path}")
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
 
+        total = 0
         total_with_embeddings = 0
         with open(output_path, "w", encoding="utf-8", errors="replace") as f:
             for doc in documents:
@@ -34,9 +68,6 @@ class PreprocessedDataStore:
                         else:
                             doc_dict["embedding"] = doc.embedding
                             total_with_embeddings += 1
-                        console.log(
-                            f"[green]Saving document with embedding of size {len(doc.embedding)}[/green]"
-                        )
                 else:
                     doc_dict = doc
                     if "embedding" in doc_dict:
@@ -44,13 +75,26 @@ class PreprocessedDataStore:
 
                 json_str = json.dumps(doc_dict, ensure_ascii=False)
                 f.write(json_str + "\n")
+                total += 1
 
         console.log(
-            f"[bold green]✅ Saved {len(documents)} chunks ({total_with_embeddings} with embeddings)![/bold green]"
+            f"[bold green]✅ Saved {total} chunks ({total_with_embeddings} with embeddings)![/bold green]"
         )
 
-    def load_chunks(self, input_path: str) -> List[Document]:
-        """Load preprocessed chunks with embeddings"""
+    def load_chunks(
+        self, input_path: str, with_embeddings: bool = True
+    ) -> List[Document]:
+        """Load preprocessed chunks with embeddings
+
+        Args:
+            input_path: Path the chunks were saved to
+            with_embeddings: Attach embeddings to the documents. For the "npy"
+                storage type, pass False and use `load_embedding_matrix` to get the
+                embeddings as one memory-mapped matrix without copying them.
+        """
+        if self.storage_type == "npy":
+            return self._load_npy(input_path, with_embeddings)
+
         console.log(f"📖 Loading chunks from: {input_path}")
 
         documents = []
@@ -65,7 +109,7 @@ class PreprocessedDataStore:
 
                     embedding = None
                     if "embedding" in chunk:
-                        embedding = np.array(chunk["embedding"])
+                        embedding = np.asarray(chunk["embedding"], dtype=np.float32)
                         total_with_embeddings += 1
                         # console.log(f"[green]Found cached embedding of size {len(embedding)} in chunk {line_num}[/green]")
 
@@ -88,6 +132,139 @@ class PreprocessedDataStore:
 
         return documents
 
+    def _save_npy(
+        self, documents: Union[Iterable[Document], Iterable[Dict]], output_path: str
+    ) -> None:
+        """Save embeddings as one binary matrix plus a sidecar JSONL file
+
+        The first sidecar line is a header describing the matrix; every following
+        line holds one chunk's content, metadata and row in the matrix (null for
+        chunks without an embedding).
+
+        Rows and records are first streamed to temporary files, so memory use does
+        not grow with the number of chunks; the matrix is then copied into its
+        .npy file once its shape is known.
+        """
+        matrix_path, meta_path = self.npy_paths(output_path)
+        console.log(f"💾 Saving chunks to: {matrix_path} and {meta_path}")
+        matrix_path.parent.mkdir(parents=True, exist_ok=True)
+        rows_path = matrix_path.with_suffix(".rows.tmp")
+        records_path = meta_path.with_suffix(".tmp")
+
+        rows = 0
+        dimension = 0
+        total = 0
+        with (
+            open(rows_path, "wb") as rows_file,
+            open(records_path, "w", encoding="utf-8", errors="replace") as records_file,
+        ):
+            for doc in documents:
+                if isinstance(doc, Document):
+                    content, meta, embedding = doc.content, doc.meta, doc.embedding
+                else:
+                    content = doc.get("content", doc.get("text", ""))
+                    meta, embedding = doc.get("meta", {}), doc.get("embedding")
+
+                row = None
+                if embedding is not None:
+                    vector = np.asarray(embedding, dtype=self.dtype)
+                    if rows == 0:
+                        dimension = len(vector)
+                    elif len(vector) != dimension:
+                        raise ValueError(
+                            f"Embedding of size {len(vector)} does not match "
+                            f"the matrix dimension {dimension}"
+                        )
+                    row = rows
+                    rows += 1
+                    rows_file.write(vector.tobytes())
+
+                record = {"content": content, "meta": meta, "row": row}
+                records_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                total += 1
+
+        if rows:
+            matrix = np.lib.format.open_memmap(
+                matrix_path, mode="w+", dtype=self.dtype, shape=(rows, dimension)
+            )
+            matrix[:] = np.memmap(
+                rows_path, dtype=self.dtype, mode="r", shape=(rows, dimension)
+            )
+            matrix.flush()
+            del matrix
+        else:
+            np.save(matrix_path, np.empty((0, 0), dtype=self.dtype))
+        rows_path.unlink()
+
+        header = {
+            "format_version": NPY_FORMAT_VERSION,
+            "dtype": self.dtype.name,
+            "rows": rows,
+            "dimension": dimension,
+            "documents": total,
+        }
+        with open(meta_path, "w", encoding="utf-8", errors="replace") as f:
+            f.write(json.dumps(header) + "\n")
+            with open(records_path, "r", encoding="utf-8") as records_file:
+                shutil.copyfileobj(records_file, f)
+        records_path.unlink()
+
+        console.log(
+            f"[bold green]✅ Saved {total} chunks ({rows} with embeddings)![/bold green]"
+        )
+
+    def load_embedding_matrix(self, input_path: str) -> np.ndarray:
+        """Memory-map the embedding matrix saved with the "npy" storage type
+
+        Row i holds the embedding of the i-th saved chunk that has an embedding.
+        """
+        matrix_path, _ = self.npy_paths(input_path)
+        return np.load(matrix_path, mmap_mode="r")
+
+    def _load_npy(self, input_path: str, with_embeddings: bool) -> List[Document]:
+        """Load chunks whose embeddings are stored in a memory-mapped matrix"""
+        matrix_path, meta_path = self.npy_paths(input_path)
+        console.log(f"📖 Loading chunks from: {matrix_path} and {meta_path}")
+
+        matrix = self.load_embedding_matrix(input_path)
+
+        with open(meta_path, "r", encoding="utf-8", errors="replace") as f:
+            header = json.loads(f.readline())
+            if header.get("format_version") != NPY_FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported format version {header.get('format_version')} "
+                    f"in {meta_path}"
+                )
+            if (
+                matrix.dtype.name != header["dtype"]
+                or matrix.shape[0] != header["rows"]
+                or (header["rows"] and matrix.shape[1] != header["dimension"])
+            ):
+                raise ValueError(
+                    f"Embedding matrix {matrix_path} {matrix.shape}/{matrix.dtype} "
+                    f"does not match its header {header}"
+                )
+
+            documents = []
+            for line in f:
+                record = json.loads(line)
+                row = record["row"]
+                embedding = None
+                if with_embeddings and row is not None:
+                    embedding = matrix[row].astype(np.float32).tolist()
+                documents.append(
+                    Document(
+                        content=record["content"],
+                        meta=record["meta"],
+                        embedding=embedding,
+                    )
+                )
+
+        console.log(
+            f"[bold green]✅ Loaded {len(documents)} chunks ({header['rows']} with embeddings)![/bold green]"
+        )
+        return documents
+
     def merge_files(self, input_paths: List[str], output_path: str) -> None:
         """Merge multiple JSONL files into one"""
         console.log(f"🔄 Merging files into: {output_path}")
@@ -1,5 +1,8 @@
 import re
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from itertools import groupby
+from typing import Iterable, Iterator, List, Tuple
 from rich.console import Console
 from rich.progress import track
 from haystack.components.preprocessors import (
@@ -8,10 +11,27 @@ from haystack.components.preprocessors import (
     TextCleaner,
 )
 from haystack import Document
-from src.config.settings import settings
+from src.config.settings import PreprocessingSettings, settings
 
 console = Console()
 
+BOOK_HEADING = re.compile(r"(BOOK [IVXLCDM]+\.)")
+
+# Preprocessor of a worker process, created once by _init_worker
+_worker_preprocessor = None
+
+
+def _init_worker(preprocessing: dict) -> None:
+    """Create the worker's preprocessor with the parent's preprocessing settings"""
+    global _worker_preprocessor
+    settings.preprocessing = PreprocessingSettings(**preprocessing)
+    _worker_preprocessor = TextPreprocessor()
+
+
+def _process_book_worker(book: Tuple[str, str, int]) -> List[Document]:
+    """Process one book in a worker process"""
+    return _worker_preprocessor._process_book(*book)
+
 
 class TextPreprocessor:
     """Handles text preprocessing and chunking for both texts"""
@@ -39,6 +59,7 @@ class TextPreprocessor:
         )
 
         self.include_context_header = settings.preprocessing.include_context_header
+        self.stream_window_chars = settings.preprocessing.stream_window_chars
 
     def _clean_text(self, text: str) -> str:
         """Initial cleaning of raw text using Haystack's TextCleaner"""
@@ -47,7 +68,20 @@ class TextPreprocessor:
 
     def get_dalloway_queries(self, input_file: str) -> List[Document]:
         """Process Mrs Dalloway text and return chunks for querying"""
-        console.log(f"📖 Reading Mrs Dalloway for queries: {input_file}")
+        return self.process_text(input_file, title="Mrs Dalloway")
+
+    def process_odyssey(self, input_file: str) -> List[Document]:
+        """Process The Odyssey text and return chunks with metadata"""
+        return self.process_books(input_file, title="The Odyssey")
+
+    def process_text(self, input_file: str, title: str) -> List[Document]:
+        """Process a text as a whole and return its chunks
+
+        Args:
+            input_file: Raw text file
+            title: Text title, stored as the chunks' "source" metadata
+        """
+        console.log(f"📖 Reading {title}: {input_file}")
         with open(input_file, "r", encoding="utf-8", errors="replace") as f:
             text = f.read()
 
@@ -59,40 +93,180 @@ class TextPreprocessor:
         split_docs = self.splitter.run(documents=cleaned_docs)["documents"]
 
         for i, doc in enumerate(split_docs, 1):
-            doc.meta = {"source": "Mrs Dalloway", "chunk_number": i}
+            doc.meta = {"source": title, "chunk_number": i}
 
         return split_docs
 
-    def process_odyssey(self, input_file: str) -> List[Document]:
-        """Process The Odyssey text and return chunks with metadata"""
-        console.log(f"📖 Reading The Odyssey: {input_file}")
+    def process_books(self, input_file: str, title: str) -> List[Document]:
+        """Process a text split into "BOOK <numeral>." sections into chunks with
+        chapter metadata"""
+        console.log(f"📖 Reading {title}: {input_file}")
         with open(input_file, "r", encoding="utf-8", errors="replace") as f:
             text = f.read()
 
-        books = re.split(r"(BOOK [IVXLCDM]+\.)", text)[1:]
-        processed_chunks = []
+        parts = re.split(r"(BOOK [IVXLCDM]+\.)", text)[1:]
+        books = [
+            (parts[i].strip(), parts[i + 1], i // 2 + 1)
+            for i in range(0, len(parts), 2)
+        ]
+
+        num_workers = settings.preprocessing.num_workers
+        if num_workers > 1 and len(books) > 1:
+            # Books are independent; map() returns them in book order
+            with ProcessPoolExecutor(
+                max_workers=min(num_workers, len(books)),
+                initializer=_init_worker,
+                initargs=(settings.preprocessing.model_dump(),),
+            ) as executor:
+                book_chunks = list(
+                    track(
+                        executor.map(_process_book_worker, books),
+                        total=len(books),
+                        description=f"📚 Processing books ({num_workers} workers)",
+                    )
+                )
+        else:
+            book_chunks = [
+                self._process_book(*book)
+                for book in track(books, description="📚 Processing books")
+            ]
+
+        return [chunk for chunks in book_chunks for chunk in chunks]
+
+    def _process_book(
+        self, book_title: str, book_content: str, book_num: int
+    ) -> List[Document]:
+        """Clean and split one book into chunks with metadata"""
+        book_content = self._clean_text(book_content)
+
+        doc = Document(content=book_content)
+
+        cleaned_docs = self.cleaner.run(documents=[doc])["documents"]
+        split_docs = self.splitter.run(documents=cleaned_docs)["documents"]
+
+        for chunk_num, doc in enumerate(split_docs, 1):
+            if self.include_context_header:
+                doc.content = doc.content
+
+            doc.meta = {
+                "chapter": book_title,
+                "book_number": book_num,
+                "chunk_number": chunk_num,
+            }
+
+        return split_docs
+
+    def _iter_windows(self, lines: Iterable[str]) -> Iterator[str]:
+        """Group lines into windows of about `stream_window_chars` characters
+
+        Windows only end at blank lines, so no paragraph (or footnote) is split
+        across two windows.
+        """
+        window: List[str] = []
+        size = 0
+        for line in lines:
+            window.append(line)
+            size += len(line)
+            if size >= self.stream_window_chars and not line.strip():
+                yield "".join(window)
+                window, size = [], 0
+        if window:
+            yield "".join(window)
+
+    def _iter_book_windows(self, input_file: str) -> Iterator[Tuple[int, str, str]]:
+        """Read a text incrementally, yielding (book number, title, window)
 
-        for i in track(range(0, len(books), 2), description="📚 Processing books"):
-            book_title = books[i].strip()
-            book_content = books[i + 1]
-            book_num = i // 2 + 1
+        Text before the first book heading is skipped, as in `process_books`.
+        Windows of a long book end at blank lines once they reach
+        `stream_window_chars` characters.
+        """
+        book_num = 0
+        book_title = None
+        window: List[str] = []
+        size = 0
 
-            book_content = self._clean_text(book_content)
+        with open(input_file, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                parts = BOOK_HEADING.split(line)
+                # Odd parts are headings, even parts the text around them
+                for k, part in enumerate(parts):
+                    if k % 2:
+                        if window:
+                            yield book_num, book_title, "".join(window)
+                        book_num += 1
+                        book_title, window, size = part.strip(), [], 0
+                    elif book_title is not None and part:
+                        window.append(part)
+                        size += len(part)
+
+                if size >= self.stream_window_chars and not line.strip():
+                    yield book_num, book_title, "".join(window)
+                    window, size = [], 0
+
+        if window:
+            yield book_num, book_title, "".join(window)
+
+    def _iter_chunks(self, windows: Iterable[str]) -> Iterator[Document]:
+        """Clean and split consecutive windows of one text into chunks
+
+        The last chunk of each window may continue in the next one, so its text is
+        carried over and split again together with the next window. Chunks and
+        their overlaps therefore run across window boundaries just as if the whole
+        text had been split at once, while only one window is held in memory.
+        """
+        carry = ""
+        for window in windows:
+            doc = Document(content=self._clean_text(window))
+            cleaned = self.cleaner.run(documents=[doc])["documents"][0].content or ""
+            if not cleaned:
+                continue
 
-            doc = Document(content=book_content)
+            # Windows end at blank lines, which cleaning collapses to one space
+            text = f"{carry} {cleaned}" if carry else cleaned
+            split_docs = self.splitter.run(documents=[Document(content=text)])[
+                "documents"
+            ]
+            if not split_docs:
+                continue
 
-            cleaned_docs = self.cleaner.run(documents=[doc])["documents"]
-            split_docs = self.splitter.run(documents=cleaned_docs)["documents"]
+            yield from split_docs[:-1]
+            carry = text[split_docs[-1].meta["split_idx_start"] :]
 
-            for chunk_num, doc in enumerate(split_docs, 1):
-                if self.include_context_header:
-                    doc.content = doc.content
+        if carry:
+            yield from self.splitter.run(documents=[Document(content=carry)])[
+                "documents"
+            ]
 
-                doc.meta = {
-                    "chapter": book_title,
-                    "book_number": book_num,
-                    "chunk_number": chunk_num,
-                }
-                processed_chunks.append(doc)
+    def iter_dalloway_queries(self, input_file: str) -> Iterator[Document]:
+        """Stream Mrs Dalloway query chunks, reading the text window by window"""
+        return self.iter_text(input_file, title="Mrs Dalloway")
 
-        return processed_chunks
+    def iter_odyssey(self, input_file: str) -> Iterator[Document]:
+        """Stream The Odyssey chunks with metadata, reading it book by book"""
+        return self.iter_books(input_file, title="The Odyssey")
+
+    def iter_text(self, input_file: str, title: str) -> Iterator[Document]:
+        """Stream the chunks of `process_text`, reading the text window by window"""
+        console.log(f"📖 Streaming {title}: {input_file}")
+        with open(input_file, "r", encoding="utf-8", errors="replace") as f:
+            chunks = self._iter_chunks(self._iter_windows(f))
+            for i, doc in enumerate(chunks, 1):
+                yield replace(doc, meta={"source": title, "chunk_number": i})
+
+    def iter_books(self, input_file: str, title: str) -> Iterator[Document]:
+        """Stream the chunks of `process_books`, reading the text book by book"""
+        console.log(f"📖 Streaming {title}: {input_file}")
+        book_windows = groupby(
+            self._iter_book_windows(input_file), key=lambda item: item[:2]
+        )
+        for (book_num, book_title), windows in book_windows:
+            chunks = self._iter_chunks(window for _, _, window in windows)
+            for chunk_num, doc in enumerate(chunks, 1):
+                yield replace(
+                    doc,
+                    meta={
+                        "chapter": book_title,
+                        "book_number": book_num,
+                        "chunk_number": chunk_num,
+                    },
+                )
@@ -0,0 +1,93 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from rich.console import Console
+
+from src.config.settings import settings
+from src.utils.fingerprint import EXECUTION_ONLY_PREPROCESSING_SETTINGS
+
+console = Console()
+
+
+class PreprocessingCache:
+    """Manifest of preprocessed outputs, content-addressed by corpus fingerprint
+
+    Every entry maps a corpus fingerprint (raw file hash, preprocessing settings,
+    embedding model and dimension) to the path its chunks were saved to, so
+    changed settings produce a new entry instead of silently reusing stale chunks.
+    """
+
+    def __init__(self, manifest_path: Optional[Path] = None):
+        """Load the manifest, if any
+
+        Args:
+            manifest_path: JSON file listing the cached preprocessing outputs
+                (default: settings.storage["preprocessing_manifest"])
+        """
+        if manifest_path is None:
+            manifest_path = settings.storage["preprocessing_manifest"]
+        self.manifest_path = Path(manifest_path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if self.manifest_path.exists():
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+
+    @staticmethod
+    def entry_path(base_path: str | Path, fingerprint: str) -> Path:
+        """Path for the output of a fingerprint, derived from the configured path"""
+        base_path = Path(base_path)
+        return base_path.with_name(
+            f"{base_path.stem}-{fingerprint[:16]}{base_path.suffix}"
+        )
+
+    def lookup(self, fingerprint: str) -> Optional[Path]:
+        """Saved output path of a fingerprint, or None if it was never recorded"""
+        entry = self.entries.get(fingerprint)
+        return Path(entry["path"]) if entry else None
+
+    def previous_paths(self, name: str, fingerprint: str) -> List[Path]:
+        """Outputs of other fingerprints of a text with the current embedding
+        model and at least the current dimension, those of the current dimension
+        first, then most recent first"""
+        dimension = settings.embeddings.dimension
+        entries = [
+            entry
+            for key, entry in self.entries.items()
+            if key != fingerprint
+            and entry["text"] == name
+            and entry["embedding_model"] == settings.embeddings.api_model
+            and entry["embedding_dimension"] >= dimension
+        ]
+        entries.sort(
+            key=lambda entry: (
+                entry["embedding_dimension"] == dimension,
+                entry["created"],
+            ),
+            reverse=True,
+        )
+        return [Path(entry["path"]) for entry in entries]
+
+    def record(self, name: str, fingerprint: str, path: str | Path) -> None:
+        """Add an entry for a newly saved output and write the manifest"""
+        self.entries[fingerprint] = {
+            "text": name,
+            "path": str(path),
+            "raw_path": str(settings.texts[name].raw_path),
+            "preprocessing": settings.preprocessing.model_dump(
+                exclude=EXECUTION_ONLY_PREPROCESSING_SETTINGS
+            ),
+            "embedding_model": settings.embeddings.api_model,
+            "embedding_dimension": settings.embeddings.dimension,
+            "storage_format": settings.embeddings.storage_format,
+            "created": datetime.now().isoformat(),
+        }
+
+        # Write to a temporary file first so an interrupted write keeps the old one
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries}, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+        console.log(f"Recorded preprocessing cache entry {fingerprint[:16]} for {name}")
@@ -0,0 +1,132 @@
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+from src.config.settings import settings
+
+
+class EmbeddingCache:
+    """Persistent embedding cache keyed by content hash, backed by SQLite
+
+    Entries are keyed by (content hash, model, dimension), so embeddings from
+    different models or sizes never mix. Vectors are stored as float32 blobs.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        model: Optional[str] = None,
+        dimension: Optional[int] = None,
+    ):
+        """Open (or create) the cache database
+
+        Args:
+            cache_dir: Directory holding the SQLite database
+                (default: settings.storage["embeddings_dir"])
+            model: Embedding model the cached vectors belong to
+                (default: settings.embeddings.api_model)
+            dimension: Embedding dimension the cached vectors belong to
+                (default: settings.embeddings.dimension)
+        """
+        if cache_dir is None:
+            cache_dir = settings.storage["embeddings_dir"]
+        if model is None:
+            model = settings.embeddings.api_model
+        if dimension is None:
+            dimension = settings.embeddings.dimension
+        self.model = model
+        self.dimension = dimension
+
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self.db_path = Path(cache_dir) / "embeddings.sqlite"
+        # Embedding batches may complete on worker threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                content_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                embedding BLOB NOT NULL,
+                PRIMARY KEY (content_hash, model, dimension)
+            )
+            """
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """SHA-256 hex digest of a text"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(
+        self, texts: Sequence[str], dimension: Optional[int] = None
+    ) -> List[Optional[np.ndarray]]:
+        """Look up embeddings for texts, returning None for cache misses
+
+        Args:
+            texts: Texts to look up
+            dimension: Dimension to look up instead of the cache's own, e.g. the
+                model's full size for vectors that are truncated locally
+        """
+        dimension = dimension or self.dimension
+        hashes = [self.content_hash(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self.lock:
+            # Stay well below SQLite's limit on bound parameters
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.connection.execute(
+                    f"SELECT content_hash, embedding FROM embeddings "
+                    f"WHERE model = ? AND dimension = ? "
+                    f"AND content_hash IN ({placeholders})",
+                    [self.model, dimension, *chunk],
+                )
+                for content_hash, blob in rows:
+                    found[content_hash] = np.frombuffer(blob, dtype=np.float32)
+
+        return [found.get(content_hash) for content_hash in hashes]
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Look up the embedding of a single text"""
+        return self.get_many([text])[0]
+
+    def put_many(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        dimension: Optional[int] = None,
+    ):
+        """Store embeddings for texts, replacing existing entries
+
+        Args:
+            texts: Texts the embeddings belong to
+            embeddings: Embeddings to store
+            dimension: Dimension to store them under instead of the cache's own
+        """
+        dimension = dimension or self.dimension
+        rows = [
+            (
+                self.content_hash(text),
+                self.model,
+                dimension,
+                np.asarray(embedding, dtype=np.float32).tobytes(),
+            )
+            for text, embedding in zip(texts, embeddings)
+        ]
+
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows
+            )
+            self.connection.commit()
+
+    def put(self, text: str, embedding: Sequence[float]):
+        """Store the embedding of a single text"""
+        self.put_many([text], [embedding])
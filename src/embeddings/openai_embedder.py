@@ -1,51 +1,327 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import replace
+from functools import cached_property
 from haystack import Document
-from haystack.components.embedders import OpenAITextEmbedder, OpenAIDocumentEmbedder
-from typing import List
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+import tiktoken
 from src.config.settings import settings
+from src.embeddings.embedding_cache import EmbeddingCache
+from src.utils.http_client import get_openai_client
+from src.utils.metrics import metrics
 from rich.console import Console
 
 console = Console()
 
 
+def truncate_embedding(embedding: Sequence[float], dimension: int) -> np.ndarray:
+    """Shorten an embedding to its first `dimension` values and renormalize it
+
+    text-embedding-3 models are trained so that a truncated and renormalized
+    embedding matches the one requested with the API's `dimensions` argument.
+    """
+    truncated = np.asarray(embedding, dtype=np.float32)[:dimension]
+    norm = np.linalg.norm(truncated)
+    return truncated / norm if norm else truncated
+
+
 class OpenAIEmbedder:
     """Handles document embedding using OpenAI's embedding models."""
 
-    def __init__(self, document_store=None):
+    def __init__(self, document_store=None, cache: Optional[EmbeddingCache] = None):
         """Initialize embedder
 
         Args:
             document_store: Document store for storing and retrieving embeddings
+            cache: Persistent embedding cache shared by query and document
+                embedding (default: a cache under settings.storage["embeddings_dir"]
+                when settings.embeddings.cache_enabled is set). Document
+                embedding uses the default cache even when it is disabled, so
+                an interrupted corpus embedding resumes from completed batches.
         """
         self.document_store = document_store
 
+        self.dimension = settings.embeddings.dimension
+        self.native_dimension = settings.embeddings.native_dimension
+        if self.dimension > self.native_dimension:
+            raise ValueError(
+                f"Embedding dimension {self.dimension} exceeds the model's "
+                f"{self.native_dimension}"
+            )
+        self.reduced = self.dimension < self.native_dimension
+        # Full-size vectors are requested and shortened here instead of by the API
+        self.truncate_locally = self.reduced and settings.embeddings.truncate_locally
+
+        if cache is None and settings.embeddings.cache_enabled:
+            cache = self._create_cache()
+        self.cache = cache
+
+    # The API embedders and the tokenizer are built on first use, so runs whose
+    # embeddings are all cached neither import the OpenAI client nor load an encoding
+
+    @property
+    def _embedder_config(self) -> Dict[str, Any]:
         embedder_config = {"model": settings.embeddings.api_model}
+        if self.reduced and not self.truncate_locally:
+            embedder_config["dimensions"] = self.dimension
+        return embedder_config
+
+    @cached_property
+    def document_embedder(self):
+        from haystack.components.embedders import OpenAIDocumentEmbedder
+
+        # Batching is done here, so each document embedder run is one API request
+        embedder = OpenAIDocumentEmbedder(
+            **self._embedder_config,
+            batch_size=settings.embeddings.max_batch_size,
+            progress_bar=False,
+        )
+        # Requests go through the shared client and its connection pool
+        embedder.client = get_openai_client()
+        return embedder
+
+    @cached_property
+    def text_embedder(self):
+        from haystack.components.embedders import OpenAITextEmbedder
+
+        embedder = OpenAITextEmbedder(**self._embedder_config)
+        embedder.client = get_openai_client()
+        return embedder
+
+    def _create_cache(self) -> EmbeddingCache:
+        """Default cache, keyed by the model and the dimension resolved above"""
+        return EmbeddingCache(
+            model=settings.embeddings.api_model, dimension=self.dimension
+        )
 
-        self.document_embedder = OpenAIDocumentEmbedder(**embedder_config)
-        self.text_embedder = OpenAITextEmbedder(**embedder_config)
+    @cached_property
+    def document_cache(self) -> EmbeddingCache:
+        """Cache persisting completed document batches, even with caching disabled"""
+        return self.cache if self.cache is not None else self._create_cache()
+
+    @cached_property
+    def encoding(self):
+        return tiktoken.encoding_for_model(settings.embeddings.api_model)
+
+    def _token_batches(self, texts: Sequence[str]) -> List[List[int]]:
+        """Group text indices into batches bounded by input count and token budget"""
+        token_counts = [len(tokens) for tokens in self.encoding.encode_batch(texts)]
+        token_budget = settings.embeddings.batch_token_budget
+        max_batch_size = settings.embeddings.max_batch_size
+
+        batches: List[List[int]] = []
+        batch: List[int] = []
+        batch_tokens = 0
+        for i, tokens in enumerate(token_counts):
+            if batch and (
+                batch_tokens + tokens > token_budget or len(batch) >= max_batch_size
+            ):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(i)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _lookup(
+        self, texts: Sequence[str], cache: EmbeddingCache
+    ) -> List[Optional[np.ndarray]]:
+        """Cached embeddings of texts at the configured dimension
+
+        When embeddings are shortened, cached full-size vectors of the missing
+        texts are truncated and cached at the configured dimension too.
+        """
+        found = cache.get_many(texts)
+        missing = [i for i, embedding in enumerate(found) if embedding is None]
+        if not (self.reduced and missing):
+            return found
+
+        native = cache.get_many(
+            [texts[i] for i in missing], dimension=self.native_dimension
+        )
+        truncated = [
+            (i, truncate_embedding(embedding, self.dimension))
+            for i, embedding in zip(missing, native)
+            if embedding is not None
+        ]
+        for i, embedding in truncated:
+            found[i] = embedding
+        if truncated:
+            cache.put_many(
+                [texts[i] for i, _ in truncated],
+                [embedding for _, embedding in truncated],
+            )
+        return found
+
+    def _from_api(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[Optional[List[float]]],
+        cache: Optional[EmbeddingCache],
+    ) -> List[Optional[List[float]]]:
+        """Bring embeddings returned by the API to the configured dimension
+
+        Full-size vectors are cached before being truncated, so any later
+        dimension can be derived from them without another request.
+        """
+        if not self.truncate_locally:
+            return list(embeddings)
+
+        done = [
+            (text, embedding)
+            for text, embedding in zip(texts, embeddings)
+            if embedding is not None
+        ]
+        if cache is not None and done:
+            cache.put_many(
+                [text for text, _ in done],
+                [embedding for _, embedding in done],
+                dimension=self.native_dimension,
+            )
+        return [
+            truncate_embedding(embedding, self.dimension).tolist()
+            if embedding is not None
+            else None
+            for embedding in embeddings
+        ]
+
+    def _embed_batch(
+        self, texts: List[str], cache: Optional[EmbeddingCache]
+    ) -> List[Optional[List[float]]]:
+        """Embed one batch of texts in a single API request"""
+        with metrics.timer("embedding.request"):
+            result = self.document_embedder.run(
+                documents=[Document(content=text) for text in texts]
+            )
+        usage = result.get("meta", {}).get("usage", {})
+        metrics.increment("embedding.texts", len(texts))
+        metrics.increment("embedding.tokens", usage.get("prompt_tokens", 0))
+        return self._from_api(
+            texts, [doc.embedding for doc in result["documents"]], cache
+        )
+
+    def _embed_texts(
+        self, texts: List[str], cache: Optional[EmbeddingCache] = None
+    ) -> List[Optional[List[float]]]:
+        """Embed texts in token-budgeted batches, several batches concurrently
+
+        Args:
+            texts: Texts to embed
+            cache: Cache each batch is written to as soon as it completes, so an
+                interrupted run resumes from the batches already persisted
+        """
+        batches = self._token_batches(texts)
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        failed_batches = 0
+
+        # Initialize the API client once, before it is shared across threads
+        if hasattr(self.document_embedder, "warm_up"):
+            self.document_embedder.warm_up()
+
+        with ThreadPoolExecutor(
+            max_workers=settings.embeddings.max_concurrency,
+            thread_name_prefix="embedding",
+        ) as executor:
+            futures = {
+                executor.submit(
+                    self._embed_batch, [texts[i] for i in batch], cache
+                ): batch
+                for batch in batches
+            }
+
+            for completed, future in enumerate(as_completed(futures), 1):
+                batch = futures[future]
+                try:
+                    batch_embeddings = future.result()
+                except Exception as e:
+                    failed_batches += 1
+                    console.print(f"[red]Error embedding batch: {str(e)}[/red]")
+                    continue
+
+                done = [
+                    (i, embedding)
+                    for i, embedding in zip(batch, batch_embeddings)
+                    if embedding is not None
+                ]
+                for i, embedding in done:
+                    embeddings[i] = embedding
+
+                if cache is not None and done:
+                    cache.put_many(
+                        [texts[i] for i, _ in done],
+                        [embedding for _, embedding in done],
+                    )
+                console.log(
+                    f"Embedded batch {completed}/{len(batches)} ({len(batch)} texts)"
+                )
+
+        missing = sum(embedding is None for embedding in embeddings)
+        if missing:
+            resume = (
+                "completed batches are cached, re-run to resume"
+                if cache is not None
+                else "completed batches were not persisted"
+            )
+            raise RuntimeError(
+                f"Failed to embed {missing} documents ({failed_batches} failed batches); "
+                f"{resume}"
+            )
+        return embeddings
 
     def embed_documents(self, documents: List[Document]) -> List[Document]:
-        """Embed documents that don't have embeddings"""
-        docs_to_embed = []
-        embedded_docs = []
-
-        for doc in documents:
-            if doc.embedding is not None:
-                embedded_docs.append(doc)
-            else:
-                docs_to_embed.append(doc)
-
-        if docs_to_embed:
-            console.log(f"Embedding {len(docs_to_embed)} new documents...")
-            newly_embedded = self.document_embedder.run(documents=docs_to_embed)
-            embedded_docs.extend(newly_embedded["documents"])
+        """Embed documents that don't have embeddings
+
+        Embeddings are looked up in the cache by content hash first, so only
+        unseen texts are sent to the API. Document order is preserved, and new
+        embeddings are attached as float lists, like the API returns them.
+        """
+        embeddings = [doc.embedding for doc in documents]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        if missing:
+            cached = self._lookup(
+                [documents[i].content for i in missing], self.document_cache
+            )
+            for i, embedding in zip(missing, cached):
+                if embedding is not None:
+                    embeddings[i] = embedding.tolist()
+            hits = sum(embedding is not None for embedding in cached)
+            metrics.increment("embedding.cache_hits", hits)
+            missing = [i for i in missing if embeddings[i] is None]
+
+        if missing:
+            console.log(f"Embedding {len(missing)} new documents...")
+            newly_embedded = self._embed_texts(
+                [documents[i].content for i in missing], self.document_cache
+            )
+            for i, embedding in zip(missing, newly_embedded):
+                embeddings[i] = embedding
         else:
             console.log(
                 "[bold green]All documents already have embeddings![/bold green]"
             )
 
-        return embedded_docs
+        return [
+            doc if doc.embedding is not None else replace(doc, embedding=embedding)
+            for doc, embedding in zip(documents, embeddings)
+        ]
 
     def embed_query(self, text: str) -> List[float]:
-        """Get embedding for a query text"""
-        result = self.text_embedder.run(text=text)
-        return result["embedding"]
+        """Get embedding for a query text, as a float list whether cached or not"""
+        if self.cache is not None:
+            cached = self._lookup([text], self.cache)[0]
+            if cached is not None:
+                metrics.increment("embedding.cache_hits")
+                return cached.tolist()
+
+        with metrics.timer("embedding.query_request"):
+            result = self.text_embedder.run(text=text)
+        usage = result.get("meta", {}).get("usage", {})
+        metrics.increment("embedding.texts")
+        metrics.increment("embedding.tokens", usage.get("prompt_tokens", 0))
+        (embedding,) = self._from_api([text], [result["embedding"]], self.cache)
+
+        if self.cache is not None:
+            self.cache.put(text, embedding)
+        return embedding
@@ -1,19 +1,23 @@
 import os
 import argparse
+import json
 from pathlib import Path
+from typing import TYPE_CHECKING
 from rich.console import Console
-from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn, TimeRemainingColumn
-import pandas as pd
 from datetime import datetime
-from src.pipeline.pipeline_facade import PipelineFacade
-from src.data_preparation.data_manager import DataManager
-from src.config.settings import settings
-from src.utils.token_counter import TokenCounter
-import csv
-import json
-from haystack import Document
-from src.models.schemas import Analysis
+from src.utils.results_writer import (
+    PAIR_COLUMNS,
+    RESULT_COLUMNS,
+    ResultsWriter,
+    result_key,
+)
+
+# The pipeline, settings and their dependencies (Haystack, OpenAI, Qdrant,
+# tiktoken) are imported where they are used, so --help starts immediately
+if TYPE_CHECKING:
+    from haystack import Document
+    from rich.progress import Progress
+    from src.models.schemas import Analysis
 
 console = Console()
 
@@ -35,6 +39,61 @@ def parse_args():
         help="Choose the prompt template to use (overrides settings.py)",
         default=None,
     )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        help="Maximum number of concurrent LLM analyses (overrides settings.py)",
+        default=None,
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Submit all analyses as one OpenAI Batch API job instead of live requests",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither read nor write the persistent LLM analysis cache",
+    )
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Ignore cached LLM analyses, re-query the API and overwrite the cache",
+    )
+    parser.add_argument(
+        "--resume",
+        type=str,
+        metavar="RESULTS_CSV",
+        help="Resume an interrupted run by appending to its results CSV, "
+        "skipping analyses it already contains",
+        default=None,
+    )
+    parser.add_argument(
+        "--all-pairs",
+        action="store_true",
+        help="Search every source text against every target text in settings.texts "
+        "instead of only the default pair",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Render and tokenize every prompt and report the projected tokens, "
+        "cost and wall-clock time without making any LLM request",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        help="Write per-stage latency percentiles, counts, errors and token "
+        "throughput of the run to this file",
+        default=None,
+    )
+    parser.add_argument(
+        "--metrics-format",
+        type=str,
+        choices=["json", "prometheus"],
+        help="Format of the --metrics file (default: json)",
+        default="json",
+    )
     return parser.parse_args()
 
 
@@ -45,8 +104,24 @@ def get_timestamped_filename(base_name: str) -> str:
     return f"{name}_{timestamp}{ext}"
 
 
-def display_settings_table():
+def create_progress() -> "Progress":
+    """Progress display shared by the search and analysis phases"""
+    from rich.progress import Progress, SpinnerColumn, TextColumn, TimeRemainingColumn
+
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        TimeRemainingColumn(),
+        console=console,
+        transient=False,
+    )
+
+
+def display_settings_table(batch: bool = False):
     """Display analysis settings in a formatted table"""
+    from rich.table import Table
+    from src.config.settings import settings
+
     table = Table(title="Analysis Settings")
 
     table.add_column("Parameter", style="cyan", no_wrap=True)
@@ -56,25 +131,54 @@ def display_settings_table():
     table.add_row("Prompt Template", settings.llm.prompt_template)
     table.add_row("Temperature", str(settings.llm.temperature))
     table.add_row("Max Tokens", str(settings.llm.max_tokens))
+    table.add_row("Max Concurrency", str(settings.llm.max_concurrency))
+    table.add_row("Mode", "batch" if batch else "interactive")
     table.add_row("Chunk Size", str(settings.preprocessing.chunk_size))
     table.add_row("Chunk Overlap", str(settings.preprocessing.chunk_overlap))
 
     console.print(table)
 
 
-def process_analysis_results(analysis: Analysis, query_text: str, doc: Document):
+def report_metrics(args):
+    """Display the run's stage metrics and write them to the --metrics file"""
+    from src.utils.metrics import display_metrics_table, metrics
+
+    display_metrics_table()
+    if args.metrics:
+        if args.metrics_format == "prometheus":
+            metrics.write_prometheus(Path(args.metrics))
+        else:
+            metrics.write_json(Path(args.metrics))
+        console.log(f"[green]Metrics saved to {args.metrics}[/green]")
+
+
+def close_run_log():
+    """Write the buffered run log records to disk"""
+    from src.utils.run_log import run_log
+
+    log_path = run_log.close()
+    if log_path is not None:
+        console.log(f"[green]Run log saved to {log_path}[/green]")
+
+
+def process_analysis_results(analysis: "Analysis", query_text: str, doc: "Document"):
     """Convert analysis to dictionary format for DataFrame"""
+    from src.config.settings import settings
+
+    # Passages from an all-pairs search also name the texts they compare
+    pair = {column: doc.meta[column] for column in PAIR_COLUMNS if column in doc.meta}
     return {
+        **pair,
         "dalloway_text": query_text,
         "odyssey_text": doc.content,
         "odyssey_chapter": doc.meta.get("chapter", ""),
         "similarity_score": doc.score,
         "similarity_type": doc.meta["similarity_type"],
         "prompt_type": settings.llm.prompt_template,
-        
         "initial_observations": analysis.initial_observations,
-        
-        "thinking_steps": json.dumps([step.model_dump() for step in analysis.thinking_steps]),
+        "thinking_steps": json.dumps(
+            [step.model_dump() for step in analysis.thinking_steps]
+        ),
         "connections": json.dumps([conn.model_dump() for conn in analysis.connections]),
         "evaluation": json.dumps(analysis.evaluation.model_dump()),
     }
@@ -83,100 +187,166 @@ def process_analysis_results(analysis: Analysis, query_text: str, doc: Document)
 def main():
     args = parse_args()
 
+    from src.config.settings import settings
+    from src.data_preparation.corpus_registry import CorpusRegistry
+    from src.data_preparation.data_manager import DataManager
+    from src.pipeline.pipeline_facade import PipelineFacade
+    from src.utils.cost_estimator import display_estimate_table
+    from src.utils.token_counter import TokenCounter
+
     if args.prompt_template:
         settings.llm.prompt_template = args.prompt_template
 
-    display_settings_table()
+    if args.max_concurrency:
+        settings.llm.max_concurrency = args.max_concurrency
+
+    if args.no_cache:
+        settings.llm.cache_enabled = False
+
+    if args.refresh_cache:
+        settings.llm.refresh_cache = True
+
+    display_settings_table(batch=args.batch)
 
     data_manager = DataManager()
     token_counter = TokenCounter()
     pipeline = PipelineFacade(token_counter=token_counter)
 
+    registry = CorpusRegistry()
+
     console.log("📚 Loading and preparing documents")
-    query_chunks, odyssey_docs = data_manager.load_data()
+    if args.all_pairs:
+        source_docs, target_docs = data_manager.load_corpora()
+    else:
+        query_chunks, docs = data_manager.load_data()
+        source_docs = {registry.default_source: query_chunks}
+        target_docs = {registry.default_target: docs}
 
     if args.limit:
         console.log(f"[yellow]Limiting analysis to first {args.limit} queries[/yellow]")
-        query_chunks = query_chunks[: args.limit]
+        source_docs = {name: docs[: args.limit] for name, docs in source_docs.items()}
 
-    pipeline.index_documents(odyssey_docs)
+    # Every target is indexed once, however many sources are searched against it
+    for target, docs in target_docs.items():
+        pipeline.index_target(
+            target, docs, embeddings=data_manager.embedding_matrices.get(target)
+        )
+    if settings.vector_store.recall_check_queries:
+        pipeline.check_recall(source_docs)
+
+    columns = RESULT_COLUMNS + PAIR_COLUMNS if args.all_pairs else RESULT_COLUMNS
+    if args.resume:
+        output_path = Path(args.resume)
+        if not output_path.exists():
+            raise FileNotFoundError(f"No results file to resume at {output_path}")
+        # Fail before searching and analyzing rather than when writing results
+        ResultsWriter.check_columns(output_path, columns)
+        console.log(f"[yellow]Resuming run from {output_path}[/yellow]")
+    else:
+        output_dir = Path("data/results")
+        run_name = "all_pairs_" if args.all_pairs else ""
+        output_filename = get_timestamped_filename(
+            f"intertextual_analysis_{run_name}{settings.llm.prompt_template}_{settings.llm.model}.csv"
+        )
+        output_path = output_dir / output_filename
 
-    results = []
+    completed = ResultsWriter.completed_keys(output_path)
 
-    total_queries = len(query_chunks)
+    total_queries = sum(len(docs) for docs in source_docs.values())
+    source_titles = " / ".join(registry.title(name) for name in source_docs)
 
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        TimeRemainingColumn(),
-        console=console,
-        transient=False,
-    ) as progress:
-        dalloway_task = progress.add_task(
-            "[cyan]Processing Mrs Dalloway chunks...", total=total_queries
+    with create_progress() as progress:
+        query_task = progress.add_task(
+            f"[cyan]Processing {source_titles} chunks...", total=total_queries
         )
 
+        analysis_tasks = []
+        if args.all_pairs:
+            # Queries of all sources are searched together, one pass per target
+            pairs = pipeline.find_similar_passages_all_pairs(source_docs)
+            for (source, _), passages_per_query in pairs.items():
+                for query_doc, all_docs in zip(source_docs[source], passages_per_query):
+                    analysis_tasks.extend((query_doc.content, doc) for doc in all_docs)
+        else:
+            # All queries are searched together in one batched pass over the corpus
+            (query_chunks,) = source_docs.values()
+            passages_per_query = pipeline.find_similar_passages_batch(query_chunks)
+            for query_doc, all_docs in zip(query_chunks, passages_per_query):
+                analysis_tasks.extend((query_doc.content, doc) for doc in all_docs)
+
+        progress.update(query_task, completed=total_queries)
+
+        if completed:
+            # Skip (query chunk, passage, prompt template, target) tuples already written
+            remaining_tasks = [
+                (query_text, doc)
+                for query_text, doc in analysis_tasks
+                if result_key(
+                    query_text,
+                    doc.content,
+                    settings.llm.prompt_template,
+                    doc.meta.get("target_corpus", ""),
+                )
+                not in completed
+            ]
+            console.log(
+                f"[yellow]Skipping {len(analysis_tasks) - len(remaining_tasks)} "
+                f"completed analyses[/yellow]"
+            )
+            analysis_tasks = remaining_tasks
+
+    if args.dry_run:
+        display_estimate_table(
+            pipeline.estimate_analyses(analysis_tasks, batch=args.batch)
+        )
+        token_counter.print_usage_report()
+        report_metrics(args)
+        close_run_log()
+        return
+
+    with (
+        create_progress() as progress,
+        ResultsWriter(output_path, columns=columns) as results_writer,
+    ):
         analysis_task = progress.add_task(
-            "[cyan]Analyzing passages...",
-            total=total_queries * 2,  # 1 similar + 1 dissimilar passage per chunk
+            "[cyan]Analyzing passages...", total=len(analysis_tasks)
         )
 
-        for i, query_doc in enumerate(query_chunks, 1):
-            query_text = query_doc.content
+        if args.batch:
+            analyses = pipeline.analyze_similarities_batch(analysis_tasks)
+        else:
+            # Analyses run concurrently but are yielded in task order,
+            # so the results match those of a serial run
+            analyses = pipeline.analyze_similarities(analysis_tasks)
+
+        for j, ((query_text, doc), analysis) in enumerate(
+            zip(analysis_tasks, analyses), 1
+        ):
+            if analysis is None:
+                console.log(
+                    f"[yellow]Skipping failed batch analysis {j}/{len(analysis_tasks)}[/yellow]"
+                )
+                progress.update(analysis_task, advance=1)
+                continue
 
             progress.update(
-                dalloway_task,
-                description=f"[cyan]Processing Dalloway chunk {i}/{total_queries}",
+                analysis_task,
+                description=f"[cyan]Analyzed {doc.meta['similarity_type']} passage {j}/{len(analysis_tasks)}",
             )
 
-            all_docs = pipeline.find_similar_passages(query_text)
-
-            for j, doc in enumerate(all_docs, 1):
-                progress.update(
-                    analysis_task,
-                    description=f"[cyan]Analyzing {doc.meta['similarity_type']} passage {j}/{len(all_docs)} for chunk {i}/{total_queries}",
-                )
-
-                analysis = pipeline.analyze_similarity(query_text, doc)
-                result = process_analysis_results(analysis, query_text, doc)
-                results.append(result)
-
-                progress.update(analysis_task, advance=1)
+            # Each result is written as soon as it is available
+            result = process_analysis_results(analysis, query_text, doc)
+            results_writer.write(result)
 
-            progress.update(dalloway_task, advance=1)
+            progress.update(analysis_task, advance=1)
 
-    output_dir = Path("data/results")
-    output_dir.mkdir(parents=True, exist_ok=True)
-    output_filename = get_timestamped_filename(
-        f"intertextual_analysis_{settings.llm.prompt_template}_{settings.llm.model}.csv"
-    )
-    output_path = output_dir / output_filename
-
-    column_order = [
-        "dalloway_text",
-        "odyssey_text",
-        "odyssey_chapter",
-        "similarity_score",
-        "similarity_type",
-        "prompt_type",
-        "initial_observations",
-        "thinking_steps",
-        "connections",
-        "evaluation"
-    ]
-
-    df = pd.DataFrame(results)
-    
-    existing_columns = [col for col in column_order if col in df.columns]
-    remaining_columns = [col for col in df.columns if col not in column_order]
-    df = df[existing_columns + remaining_columns]
-
-    df.to_csv(output_path, index=False, encoding="utf-8")
     console.print(
         f"\n[bold green]✅ Analysis results saved to {output_path}[/bold green]"
     )
 
     token_counter.print_usage_report()
+    report_metrics(args)
+    close_run_log()
 
 
 if __name__ == "__main__":
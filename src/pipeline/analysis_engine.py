@@ -0,0 +1,63 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Iterable, Iterator, Tuple
+from haystack import Document
+from rich.console import Console
+
+from src.models.schemas import Analysis
+from .steps.intertextual_analysis import IntertextualAnalysisStep
+
+console = Console()
+
+
+class ConcurrentAnalysisEngine:
+    """Runs intertextual analyses on a bounded thread pool
+
+    Results are yielded in the same order as the input tasks, so the output of a
+    concurrent run is identical to that of a serial run.
+    """
+
+    def __init__(self, analysis_step: IntertextualAnalysisStep, max_concurrency: int):
+        """Initialize the engine
+
+        Args:
+            analysis_step: Step used to analyze a single passage pair
+            max_concurrency: Maximum number of analyses in flight at once
+        """
+        self.analysis_step = analysis_step
+        self.max_concurrency = max(1, max_concurrency)
+
+    def _analyze(self, query_text: str, doc: Document) -> Analysis:
+        return self.analysis_step.execute({"query_text": query_text, "document": doc})
+
+    def analyze(self, tasks: Iterable[Tuple[str, Document]]) -> Iterator[Analysis]:
+        """Analyze (query text, document) pairs concurrently
+
+        Args:
+            tasks: Pairs of Mrs Dalloway query text and Odyssey document
+
+        Yields:
+            Analysis results in input order
+        """
+        if self.max_concurrency == 1:
+            for query_text, doc in tasks:
+                yield self._analyze(query_text, doc)
+            return
+
+        pending: Deque[Future] = deque()
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="analysis"
+        )
+
+        try:
+            for query_text, doc in tasks:
+                pending.append(executor.submit(self._analyze, query_text, doc))
+
+                # Keep a bounded window of submitted work and release results in order
+                while len(pending) >= 2 * self.max_concurrency:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,364 @@
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from openai import OpenAI
+from haystack import Document
+from rich.console import Console
+
+from src.config.settings import settings
+from src.models.schemas import Analysis
+from src.utils.fingerprint import file_sha256
+from src.utils.token_counter import TokenCounter
+from src.utils.metrics import metrics
+from .steps.intertextual_analysis import IntertextualAnalysisStep
+
+console = Console()
+
+TERMINAL_BATCH_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# Statuses of saved batches whose requests are submitted again on resume
+RESUBMITTED_BATCH_STATUSES = {"failed", "expired", "cancelled"}
+
+
+class BatchAnalysisRunner:
+    """Runs intertextual analyses through the OpenAI Batch API
+
+    Prompts are rendered exactly as in the interactive analysis step, written to
+    JSONL request files within the Batch API limits, submitted as one batch per
+    file and parsed back into `Analysis` objects in task order. Submitted batch
+    ids are saved, so re-running the same analyses after an interruption resumes
+    waiting for the batches instead of submitting them again.
+    """
+
+    def __init__(
+        self,
+        client: OpenAI,
+        analysis_step: IntertextualAnalysisStep,
+        token_counter: TokenCounter,
+        batch_dir: Optional[Path] = None,
+        poll_interval: Optional[float] = None,
+        max_requests: Optional[int] = None,
+        max_file_bytes: Optional[int] = None,
+    ):
+        """Initialize the batch runner
+
+        Arguments left as None default to the current settings.
+
+        Args:
+            client: OpenAI client used to upload files and manage batches
+            analysis_step: Step providing prompt rendering and request bodies
+            token_counter: Token counter for usage tracking
+            batch_dir: Directory for request, result and error JSONL files
+                (default: settings.storage["batch_dir"])
+            poll_interval: Seconds between batch status checks
+                (default: settings.llm.batch_poll_interval)
+            max_requests: Maximum requests per batch
+                (default: settings.llm.batch_max_requests)
+            max_file_bytes: Maximum size of a batch's request file
+                (default: settings.llm.batch_max_file_bytes)
+        """
+        if batch_dir is None:
+            batch_dir = settings.storage["batch_dir"]
+        if poll_interval is None:
+            poll_interval = settings.llm.batch_poll_interval
+        if max_requests is None:
+            max_requests = settings.llm.batch_max_requests
+        if max_file_bytes is None:
+            max_file_bytes = settings.llm.batch_max_file_bytes
+
+        self.client = client
+        self.analysis_step = analysis_step
+        self.token_counter = token_counter
+        self.batch_dir = Path(batch_dir)
+        self.poll_interval = poll_interval
+        self.max_requests = max_requests
+        self.max_file_bytes = max_file_bytes
+        # Batch ids by request file digest, for batches whose results are pending
+        self.jobs_path = self.batch_dir / "batch_jobs.json"
+
+    def write_requests(
+        self, tasks: Sequence[Tuple[str, Document]], output_path: Path
+    ) -> Tuple[List[Path], Dict[str, List[Dict[str, str]]]]:
+        """Write one Batch API request per task to JSONL files
+
+        A new file (`<output_path stem>_<n>.jsonl`) is started before one would
+        exceed `max_requests` lines or `max_file_bytes`, so each file can be
+        submitted as one batch.
+
+        Returns:
+            Paths of the request files, and the rendered chat messages by
+            request custom_id
+        """
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        paths: List[Path] = []
+        messages_by_id = {}
+        f = None
+        lines, size = 0, 0
+
+        try:
+            for i, (query_text, doc) in enumerate(tasks):
+                custom_id = f"task-{i}"
+                messages = self.analysis_step.build_messages(query_text, doc)
+                messages_by_id[custom_id] = messages
+
+                request = {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self.analysis_step.build_request_body(messages),
+                }
+                line = (json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8")
+                if len(line) > self.max_file_bytes:
+                    raise ValueError(
+                        f"Batch request {custom_id} of {len(line)} bytes exceeds the "
+                        f"{self.max_file_bytes} bytes limit of a batch file"
+                    )
+
+                if (
+                    f is None
+                    or lines >= self.max_requests
+                    or size + len(line) > self.max_file_bytes
+                ):
+                    if f is not None:
+                        f.close()
+                    path = output_path.with_name(
+                        f"{output_path.stem}_{len(paths)}{output_path.suffix}"
+                    )
+                    paths.append(path)
+                    f = open(path, "wb")
+                    lines, size = 0, 0
+
+                f.write(line)
+                lines += 1
+                size += len(line)
+        finally:
+            if f is not None:
+                f.close()
+
+        console.log(
+            f"💾 Wrote {len(tasks)} batch requests to {len(paths)} files: "
+            f"{', '.join(str(path) for path in paths)}"
+        )
+        return paths, messages_by_id
+
+    def _load_jobs(self) -> Dict[str, str]:
+        if not self.jobs_path.exists():
+            return {}
+        return json.loads(self.jobs_path.read_text(encoding="utf-8"))
+
+    def _save_jobs(self, jobs: Dict[str, str]) -> None:
+        self.jobs_path.parent.mkdir(parents=True, exist_ok=True)
+        self.jobs_path.write_text(json.dumps(jobs, indent=2), encoding="utf-8")
+
+    def submit(self, request_path: Path) -> str:
+        """Create a batch for a request file, returning the batch id
+
+        If a batch was already submitted for a file with the same contents and
+        has not failed, expired or been cancelled, its id is returned instead.
+        """
+        key = file_sha256(request_path)
+        jobs = self._load_jobs()
+        if key in jobs:
+            batch = self.client.batches.retrieve(jobs[key])
+            if batch.status not in RESUBMITTED_BATCH_STATUSES:
+                console.log(
+                    f"[cyan]Resuming batch {batch.id} ({batch.status}) "
+                    f"submitted earlier for these requests[/cyan]"
+                )
+                return batch.id
+
+        with open(request_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        jobs[key] = batch.id
+        self._save_jobs(jobs)
+        console.log(f"[cyan]Submitted batch {batch.id}[/cyan]")
+        return batch.id
+
+    def forget(self, batch_id: str) -> None:
+        """Drop a batch whose results were downloaded from the saved batch ids"""
+        jobs = self._load_jobs()
+        self._save_jobs({key: job for key, job in jobs.items() if job != batch_id})
+
+    def wait(self, batch_id: str):
+        """Poll a batch until it reaches a terminal status"""
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            counts = batch.request_counts
+            if counts is not None:
+                console.log(
+                    f"[cyan]Batch {batch_id}: {batch.status} "
+                    f"({counts.completed}/{counts.total} completed, {counts.failed} failed)[/cyan]"
+                )
+            else:
+                console.log(f"[cyan]Batch {batch_id}: {batch.status}[/cyan]")
+
+            if batch.status in TERMINAL_BATCH_STATUSES:
+                return batch
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def _error_message(result: Dict) -> str:
+        """Error of a failed request line from a batch output or error file"""
+        response = result.get("response") or {}
+        error = result.get("error") or (response.get("body") or {}).get("error")
+        if isinstance(error, dict):
+            return f"{error.get('code')}: {error.get('message')}"
+        return str(error or response.get("body"))
+
+    def log_errors(self, error_text: str) -> int:
+        """Log every failed request of a batch error file
+
+        Returns:
+            Number of failed requests
+        """
+        failed = 0
+        for line in error_text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            console.print(
+                f"[red]Batch request {result.get('custom_id')} failed: "
+                f"{self._error_message(result)}[/red]"
+            )
+            failed += 1
+        return failed
+
+    def parse_results(
+        self, output_text: str, messages_by_id: Dict[str, List[Dict[str, str]]]
+    ) -> Dict[str, Analysis]:
+        """Parse Batch API output lines into Analysis objects keyed by custom_id"""
+        analyses = {}
+
+        for line in output_text.splitlines():
+            if not line.strip():
+                continue
+
+            result = json.loads(line)
+            custom_id = result["custom_id"]
+            response = result.get("response") or {}
+
+            if result.get("error") or response.get("status_code") != 200:
+                console.print(
+                    f"[red]Batch request {custom_id} failed: {self._error_message(result)}[/red]"
+                )
+                continue
+
+            body = response["body"]
+            try:
+                content = body["choices"][0]["message"]["content"]
+                analyses[custom_id] = Analysis.model_validate_json(content)
+            except Exception as e:
+                console.print(
+                    f"[red]Could not parse analysis for {custom_id}: {str(e)}[/red]"
+                )
+                continue
+
+            usage = body.get("usage") or {}
+            self.token_counter.track_completion(
+                messages=messages_by_id[custom_id],
+                completion_tokens=usage.get("completion_tokens"),
+                prompt_tokens=usage.get("prompt_tokens"),
+                cached_tokens=(usage.get("prompt_tokens_details") or {}).get(
+                    "cached_tokens"
+                ),
+                model=body.get("model"),
+                batch=True,
+            )
+
+        return analyses
+
+    def collect(
+        self, batch, messages_by_id: Dict[str, List[Dict[str, str]]], name: str
+    ) -> Dict[str, Analysis]:
+        """Download, save and parse the output and error files of a finished batch
+
+        Args:
+            batch: Batch in a terminal status
+            messages_by_id: Rendered messages by request custom_id
+            name: Suffix of the saved `batch_results_*` / `batch_errors_*` files
+        """
+        errors = getattr(batch, "errors", None)
+        for error in getattr(errors, "data", None) or []:
+            console.print(
+                f"[red]Batch {batch.id} error {error.code} "
+                f"(line {error.line}): {error.message}[/red]"
+            )
+
+        analyses = {}
+        if batch.output_file_id:
+            output_text = self.client.files.content(batch.output_file_id).text
+            result_path = self.batch_dir / f"batch_results_{name}.jsonl"
+            result_path.write_text(output_text, encoding="utf-8")
+            analyses = self.parse_results(output_text, messages_by_id)
+
+        if batch.error_file_id:
+            error_text = self.client.files.content(batch.error_file_id).text
+            error_path = self.batch_dir / f"batch_errors_{name}.jsonl"
+            error_path.write_text(error_text, encoding="utf-8")
+            failed = self.log_errors(error_text)
+            console.print(
+                f"[red]{failed} requests of batch {batch.id} failed, "
+                f"see {error_path}[/red]"
+            )
+
+        if batch.status != "completed":
+            console.print(
+                f"[red]Batch {batch.id} ended with status {batch.status}[/red]"
+            )
+        self.forget(batch.id)
+        return analyses
+
+    def run(self, tasks: Sequence[Tuple[str, Document]]) -> List[Optional[Analysis]]:
+        """Analyze all tasks in as few batches as the Batch API limits allow
+
+        Tasks with a cached analysis are not submitted. All batches are
+        submitted before waiting, so they are processed concurrently.
+
+        Returns:
+            Analyses in task order; None for requests that failed
+        """
+        results: List[Optional[Analysis]] = [None] * len(tasks)
+        pending = []
+        for i, (query_text, doc) in enumerate(tasks):
+            messages = self.analysis_step.build_messages(query_text, doc)
+            results[i] = self.analysis_step.get_cached(messages)
+            if results[i] is None:
+                pending.append(i)
+
+        if len(pending) < len(tasks):
+            console.log(
+                f"[green]Using {len(tasks) - len(pending)} cached analyses[/green]"
+            )
+        if not pending:
+            return results
+
+        timestamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        request_paths, messages_by_id = self.write_requests(
+            [tasks[i] for i in pending],
+            self.batch_dir / f"batch_requests_{timestamp}.jsonl",
+        )
+
+        analyses = {}
+        with metrics.timer("llm.batch_job"):
+            batch_ids = [self.submit(path) for path in request_paths]
+            for j, batch_id in enumerate(batch_ids):
+                batch = self.wait(batch_id)
+                analyses.update(self.collect(batch, messages_by_id, f"{timestamp}_{j}"))
+
+        console.log(
+            f"[bold green]✅ Parsed {len(analyses)}/{len(pending)} batch analyses[/bold green]"
+        )
+
+        for j, i in enumerate(pending):
+            analysis = analyses.get(f"task-{j}")
+            if analysis is not None:
+                self.analysis_step.store_cached(messages_by_id[f"task-{j}"], analysis)
+            results[i] = analysis
+        return results
@@ -1,17 +1,40 @@
-from typing import Dict, Any
+from functools import cached_property
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 from rich.console import Console
-from openai import OpenAI
 
 from src.config.settings import settings
-from src.embeddings.openai_embedder import OpenAIEmbedder
-from src.vector_store.qdrant_store import QdrantManager
+from src.data_preparation.corpus_registry import CorpusRegistry
 from src.prompts.generator import PromptGenerator
 from src.utils.token_counter import TokenCounter
+from src.utils.rate_limiter import RateLimiter
+from src.utils.fingerprint import corpus_fingerprint
+from src.utils.http_client import get_openai_client
+from src.utils.analysis_cache import AnalysisCache
 from src.models.schemas import Analysis
 
-from .steps.document_indexing import DocumentIndexingStep
-from .steps.similarity_search import SimilaritySearchStep
-from .steps.intertextual_analysis import IntertextualAnalysisStep
+# NumPy, Haystack, the embedder, the index backends and the cost estimator are
+# imported where they are used, so dry runs and cached runs don't wait for the
+# ones their path never touches
+if TYPE_CHECKING:
+    from haystack import Document
+    import numpy as np
+    from src.embeddings.openai_embedder import OpenAIEmbedder
+    from src.vector_store.base import SimilarityIndex
+    from src.vector_store.numpy_index import NumpySimilarityIndex
+    from src.vector_store.recall import RecallReport
+    from src.utils.cost_estimator import RunEstimate
+    from .steps.document_indexing import DocumentIndexingStep
+    from .steps.similarity_search import SimilaritySearchStep
 
 console = Console()
 
@@ -20,28 +43,211 @@ class PipelineOrchestrator:
     """Orchestrates the intertextuality analysis pipeline"""
 
     def __init__(self, token_counter: TokenCounter):
-        self.vector_store = QdrantManager(embedding_dim=settings.embeddings.dimension)
+        self.token_counter = token_counter
 
-        self.embedder = OpenAIEmbedder(document_store=self.vector_store.document_store)
+        self.registry = CorpusRegistry()
+        # One index per target text, created on first use
+        self.indexes: Dict[str, "SimilarityIndex"] = {}
+        # Exact indexes of approximate targets, kept for the recall check
+        self.exact_indexes: Dict[str, "NumpySimilarityIndex"] = {}
 
-        self.prompt_generator = PromptGenerator()
-        self.system_prompt = self.prompt_generator.generate(
+    # Components are built on first use, so a run only imports and creates the
+    # clients its path needs, e.g. Qdrant only for the qdrant backend
+
+    @cached_property
+    def vector_store(self) -> "SimilarityIndex":
+        return self.get_index(self.registry.default_target)
+
+    @cached_property
+    def embedder(self) -> "OpenAIEmbedder":
+        from src.embeddings.openai_embedder import OpenAIEmbedder
+
+        return OpenAIEmbedder(
+            document_store=getattr(self.vector_store, "document_store", None)
+        )
+
+    @cached_property
+    def prompt_generator(self) -> PromptGenerator:
+        return PromptGenerator()
+
+    @cached_property
+    def system_prompt(self) -> str:
+        return self.prompt_generator.generate(
             template_name=settings.llm.prompt_template
         )
 
-        self.client = OpenAI(api_key=settings.openai_api_key)
+    @cached_property
+    def client(self):
+        return get_openai_client()
 
-        self.indexing_step = DocumentIndexingStep(
+    @cached_property
+    def indexing_step(self) -> "DocumentIndexingStep":
+        from .steps.document_indexing import DocumentIndexingStep
+
+        return DocumentIndexingStep(
             embedder=self.embedder, vector_store=self.vector_store
         )
-        self.search_step = SimilaritySearchStep(embedder=self.embedder)
-        self.analysis_step = IntertextualAnalysisStep(
+
+    @cached_property
+    def search_step(self) -> "SimilaritySearchStep":
+        from .steps.similarity_search import SimilaritySearchStep
+
+        return SimilaritySearchStep(embedder=self.embedder, index=self.vector_store)
+
+    @cached_property
+    def analysis_step(self):
+        from .steps.intertextual_analysis import IntertextualAnalysisStep
+
+        return IntertextualAnalysisStep(
             client=self.client,
             prompt_generator=self.prompt_generator,
             system_prompt=self.system_prompt,
-            token_counter=token_counter,
+            token_counter=self.token_counter,
+            rate_limiter=RateLimiter(
+                requests_per_minute=settings.llm.requests_per_minute,
+                tokens_per_minute=settings.llm.tokens_per_minute,
+            ),
+            cache=AnalysisCache() if settings.llm.cache_enabled else None,
+            refresh_cache=settings.llm.refresh_cache,
+        )
+
+    @cached_property
+    def analysis_engine(self):
+        from .analysis_engine import ConcurrentAnalysisEngine
+
+        return ConcurrentAnalysisEngine(
+            analysis_step=self.analysis_step,
+            max_concurrency=settings.llm.max_concurrency,
+        )
+
+    @cached_property
+    def batch_runner(self):
+        from .batch_analysis import BatchAnalysisRunner
+
+        return BatchAnalysisRunner(
+            client=self.client,
+            analysis_step=self.analysis_step,
+            token_counter=self.token_counter,
+        )
+
+    def get_index(self, target: str) -> "SimilarityIndex":
+        """Similarity index of a target text, created with the configured backend
+
+        Raises:
+            ValueError: If quantization is configured for a backend other than
+                "numpy", the only one that supports it
+        """
+        if target in self.indexes:
+            return self.indexes[target]
+
+        quantization = settings.embeddings.quantization
+        if quantization != "none" and settings.vector_store.backend != "numpy":
+            raise ValueError(
+                f"EMBEDDINGS__QUANTIZATION={quantization} is only supported by the "
+                f'"numpy" backend, not "{settings.vector_store.backend}"; set '
+                "EMBEDDINGS__QUANTIZATION=none or VECTOR_STORE__BACKEND=numpy"
+            )
+
+        if settings.vector_store.backend == "qdrant":
+            from src.vector_store.qdrant_store import QdrantManager
+
+            path, fingerprint = None, None
+            if settings.vector_store.qdrant_url is not None:
+                # One collection per target on a shared server
+                return self.indexes.setdefault(
+                    target,
+                    QdrantManager(
+                        embedding_dim=settings.embeddings.dimension,
+                        url=settings.vector_store.qdrant_url,
+                        index=target,
+                    ),
+                )
+            if settings.vector_store.persistent:
+                # The default target keeps the location used before multiple targets
+                if target == self.registry.default_target:
+                    path = settings.storage["persist_dir"] / "qdrant"
+                else:
+                    path = settings.storage["persist_dir"] / f"qdrant-{target}"
+                fingerprint = corpus_fingerprint(settings.texts[target])
+            index = QdrantManager(
+                embedding_dim=settings.embeddings.dimension,
+                path=path,
+                fingerprint=fingerprint,
+            )
+        elif settings.vector_store.backend == "ivf":
+            from src.vector_store.ivf_index import IVFSimilarityIndex
+
+            index = IVFSimilarityIndex()
+        elif quantization != "none":
+            from src.vector_store.quantized_index import QuantizedSimilarityIndex
+
+            index = QuantizedSimilarityIndex()
+        else:
+            from src.vector_store.numpy_index import NumpySimilarityIndex
+
+            index = NumpySimilarityIndex()
+
+        self.indexes[target] = index
+        return index
+
+    def index_target(
+        self,
+        target: str,
+        documents: List["Document"],
+        embeddings: Optional["np.ndarray"] = None,
+    ) -> None:
+        """Embed and index the documents of a target text in its own index"""
+        from src.vector_store.numpy_index import NumpySimilarityIndex
+        from .steps.document_indexing import DocumentIndexingStep
+
+        index = self.get_index(target)
+        indexing_step = DocumentIndexingStep(embedder=self.embedder, vector_store=index)
+        result = indexing_step.execute(
+            {"documents": documents, "embeddings": embeddings}
         )
 
+        if index.approximate and settings.vector_store.recall_check_queries:
+            exact = NumpySimilarityIndex()
+            exact.add_documents(result["embedded_documents"], embeddings=embeddings)
+            self.exact_indexes[target] = exact
+
+    def check_recall(
+        self, source_docs: Dict[str, List["Document"]], top_k: int = 10
+    ) -> Dict[str, "RecallReport"]:
+        """Compare approximate target indexes with exact search on sampled queries
+
+        Args:
+            source_docs: Query documents by source name, sampled for the check
+            top_k: Number of similar and dissimilar documents compared per query
+        """
+        import numpy as np
+        from src.vector_store.recall import recall_at_k
+
+        queries = [doc for docs in source_docs.values() for doc in docs]
+        sample_size = min(settings.vector_store.recall_check_queries, len(queries))
+        rng = np.random.default_rng(42)
+        sample = [
+            queries[i] for i in rng.choice(len(queries), sample_size, replace=False)
+        ]
+        query_embeddings = [
+            doc.embedding
+            if doc.embedding is not None
+            else self.embedder.embed_query(doc.content)
+            for doc in sample
+        ]
+
+        reports = {}
+        for target, exact in self.exact_indexes.items():
+            report = recall_at_k(self.indexes[target], exact, query_embeddings, top_k)
+            console.log(
+                f"Recall@{top_k} of {target} over {report.queries} queries: "
+                f"{report.similar_recall:.3f} similar, "
+                f"{report.dissimilar_recall:.3f} dissimilar "
+                f"({report.latency_ms:.3f} ms/query vs {report.exact_latency_ms:.3f} ms exact)"
+            )
+            reports[target] = report
+        return reports
+
     def execute(self, initial_data: Dict[str, Any]) -> Dict[str, Any] | Analysis:
         """Execute the appropriate pipeline steps based on input data"""
         current_data = initial_data.copy()
@@ -54,7 +260,13 @@ class PipelineOrchestrator:
                 console.log("[cyan]Executing analysis step...[/cyan]")
                 return self.analysis_step.execute(current_data)
 
-            elif "query_text" in current_data:
+            elif "source_documents" in current_data:
+                current_data["target_indexes"] = {
+                    target: self.get_index(target) for target in self.registry.targets()
+                }
+                current_data = self.search_step.execute(current_data)
+
+            elif "query_text" in current_data or "query_documents" in current_data:
                 current_data = self.search_step.execute(current_data)
 
             else:
@@ -66,3 +278,34 @@ class PipelineOrchestrator:
             console.print(f"[red]Error in pipeline execution: {str(e)}[/red]")
             console.print(f"[red]Current data: {current_data}[/red]")
             raise
+
+    def analyze_many(
+        self, tasks: Iterable[Tuple[str, "Document"]]
+    ) -> Iterator[Analysis]:
+        """Run the analysis step for many passage pairs concurrently, in input order"""
+        return self.analysis_engine.analyze(tasks)
+
+    def analyze_batch(
+        self, tasks: Sequence[Tuple[str, "Document"]]
+    ) -> List[Optional[Analysis]]:
+        """Run the analysis for many passage pairs through the Batch API"""
+        return self.batch_runner.run(tasks)
+
+    def estimate(
+        self, tasks: Sequence[Tuple[str, "Document"]], batch: bool = False
+    ) -> "RunEstimate":
+        """Estimate the cost and duration of analyzing passage pairs, without any LLM call"""
+        from src.utils.cost_estimator import CostEstimator
+
+        messages_list = []
+        cached_requests = 0
+        for query_text, doc in tasks:
+            messages = self.analysis_step.build_messages(query_text, doc)
+            if self.analysis_step.get_cached(messages) is not None:
+                cached_requests += 1
+            else:
+                messages_list.append(messages)
+
+        return CostEstimator(self.token_counter).estimate(
+            messages_list, cached_requests=cached_requests, batch=batch
+        )
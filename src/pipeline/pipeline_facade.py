@@ -1,8 +1,11 @@
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 from haystack import Document
+import numpy as np
 from rich.console import Console
 from .orchestrator import PipelineOrchestrator
 from src.utils.token_counter import TokenCounter
+from src.utils.cost_estimator import RunEstimate
+from src.vector_store.recall import RecallReport
 from src.models.schemas import Analysis
 
 console = Console()
@@ -14,21 +17,116 @@ class PipelineFacade:
     def __init__(self, token_counter: TokenCounter):
         self.orchestrator = PipelineOrchestrator(token_counter=token_counter)
 
-    def index_documents(self, documents: List[Document]) -> None:
-        """Index documents for similarity search"""
-        self.orchestrator.execute({"documents": documents})
+    def index_documents(
+        self, documents: List[Document], embeddings: Optional[np.ndarray] = None
+    ) -> None:
+        """Index documents for similarity search
 
-    def find_similar_passages(self, query_text: str) -> List[Document]:
-        """Find both similar and dissimilar passages"""
-        result = self.orchestrator.execute({"query_text": query_text})
+        Args:
+            documents: Documents to index
+            embeddings: Optional embedding matrix aligned with `documents`, e.g. a
+                memory-mapped matrix from the "npy" data store
+        """
+        self.orchestrator.execute({"documents": documents, "embeddings": embeddings})
+
+    def index_target(
+        self,
+        target: str,
+        documents: List[Document],
+        embeddings: Optional[np.ndarray] = None,
+    ) -> None:
+        """Index the documents of a registered target text in its own index
+
+        Args:
+            target: Target text name in settings.texts
+            documents: Documents to index
+            embeddings: Optional embedding matrix aligned with `documents`
+        """
+        self.orchestrator.index_target(target, documents, embeddings=embeddings)
+
+    def check_recall(
+        self, source_docs: Dict[str, List[Document]], top_k: int = 10
+    ) -> Dict[str, RecallReport]:
+        """Measure recall@k of approximate target indexes against exact search
+
+        Args:
+            source_docs: Query documents by source name, sampled for the check
+            top_k: Number of similar and dissimilar documents compared per query
+        """
+        return self.orchestrator.check_recall(source_docs, top_k=top_k)
+
+    def find_similar_passages(self, query: Union[str, Document]) -> List[Document]:
+        """Find both similar and dissimilar passages
+
+        Args:
+            query: Query text, or a query Document whose stored embedding is reused
+        """
+        if isinstance(query, Document):
+            input_data = {
+                "query_text": query.content,
+                "query_embedding": query.embedding,
+            }
+        else:
+            input_data = {"query_text": query}
+
+        result = self.orchestrator.execute(input_data)
         return result["similar_documents"]
 
+    def find_similar_passages_batch(
+        self, query_docs: List[Document]
+    ) -> List[List[Document]]:
+        """Find similar and dissimilar passages for many queries in one batched search.
+
+        Stored query embeddings are reused, so precomputed queries need no API call.
+        """
+        result = self.orchestrator.execute({"query_documents": query_docs})
+        return result["similar_documents_batch"]
+
+    def find_similar_passages_all_pairs(
+        self, source_docs: Dict[str, List[Document]]
+    ) -> Dict[Tuple[str, str], List[List[Document]]]:
+        """Search the queries of every source text against every indexed target.
+
+        Args:
+            source_docs: Query documents by source name
+
+        Returns:
+            For each (source, target) pair, the similar and dissimilar passages of
+            every query of the source, in query order
+        """
+        result = self.orchestrator.execute({"source_documents": source_docs})
+        return result["similar_documents_pairs"]
+
     def analyze_similarity(self, query_text: str, doc: Document) -> Analysis:
         """Analyze the similarity between two passages."""
-        result = self.orchestrator.execute({
-            "query_text": query_text,
-            "document": doc
-        })
-        
+        result = self.orchestrator.execute({"query_text": query_text, "document": doc})
+
         # Since we're now getting the Analysis object directly, just return it
         return result
+
+    def analyze_similarities(
+        self, tasks: Iterable[Tuple[str, Document]]
+    ) -> Iterator[Analysis]:
+        """Analyze many (query text, document) pairs concurrently.
+
+        Results are yielded in the same order as the input pairs.
+        """
+        return self.orchestrator.analyze_many(tasks)
+
+    def analyze_similarities_batch(
+        self, tasks: Sequence[Tuple[str, Document]]
+    ) -> List[Optional[Analysis]]:
+        """Analyze many (query text, document) pairs through the Batch API.
+
+        Results are returned in input order, with None for failed requests.
+        """
+        return self.orchestrator.analyze_batch(tasks)
+
+    def estimate_analyses(
+        self, tasks: Sequence[Tuple[str, Document]], batch: bool = False
+    ) -> RunEstimate:
+        """Estimate tokens, cost and wall-clock time of analyzing many pairs.
+
+        Every prompt is rendered and tokenized, but no LLM request is made.
+        """
+        return self.orchestrator.estimate(tasks, batch=batch)
@@ -1,9 +1,11 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from haystack import Document
+import numpy as np
 from rich.console import Console
 from .base import PipelineStep
 from src.embeddings.openai_embedder import OpenAIEmbedder
-from src.vector_store.qdrant_store import QdrantManager
+from src.vector_store.base import SimilarityIndex
+from src.utils.metrics import metrics
 
 console = Console()
 
@@ -11,16 +13,28 @@ console = Console()
 class DocumentIndexingStep(PipelineStep):
     """Step for embedding and indexing documents"""
 
-    def __init__(self, embedder: OpenAIEmbedder, vector_store: QdrantManager):
+    def __init__(self, embedder: OpenAIEmbedder, vector_store: SimilarityIndex):
         self.embedder = embedder
         self.vector_store = vector_store
 
+    @metrics.timed("step.indexing")
     def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         documents: List[Document] = input_data["documents"]
+        embeddings: Optional[np.ndarray] = input_data.get("embeddings")
+
+        if self.vector_store.is_current():
+            console.log(
+                "[bold green]✅ Index is up to date, skipping indexing[/bold green]"
+            )
+            return {"embedded_documents": documents}
 
         console.log("📚 Indexing documents")
-        embedded_docs = self.embedder.embed_documents(documents)
-        self.vector_store.add_documents(embedded_docs)
+        if embeddings is not None:
+            # Embeddings were loaded as one matrix aligned with the documents
+            embedded_docs = documents
+        else:
+            embedded_docs = self.embedder.embed_documents(documents)
+        self.vector_store.add_documents(embedded_docs, embeddings=embeddings)
         console.log("[bold green]✅ Indexing complete![/bold green]")
 
         return {"embedded_documents": embedded_docs}
@@ -1,16 +1,54 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Type
 from openai import OpenAI
 from haystack import Document
+from pydantic import BaseModel
 from rich.console import Console
 from .base import PipelineStep
 from src.prompts.generator import PromptGenerator
 from src.models.schemas import Analysis
 from src.config.settings import settings
 from src.utils.token_counter import TokenCounter
+from src.utils.rate_limiter import RateLimiter
+from src.utils.analysis_cache import AnalysisCache
+from src.utils.fingerprint import fingerprint
+from src.utils.metrics import metrics
 
 console = Console()
 
 
+def _strict_schema(schema: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    """Make a JSON schema valid for strict structured outputs
+
+    Every object requires all its properties and forbids others, and a `$ref`
+    with sibling keys (e.g. a field description) is replaced by its definition,
+    which strict mode doesn't allow otherwise.
+    """
+    if "$ref" in schema and len(schema) > 1:
+        ref = schema.pop("$ref")
+        schema.update({**defs[ref.split("/")[-1]], **schema})
+    if schema.get("type") == "object" and "properties" in schema:
+        schema["additionalProperties"] = False
+        schema["required"] = list(schema["properties"])
+    for value in schema.values():
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, dict):
+                _strict_schema(item, defs)
+    return schema
+
+
+def response_format(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Strict `json_schema` response format of a pydantic model for structured outputs"""
+    schema = model.model_json_schema()
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "schema": _strict_schema(schema, schema.get("$defs", {})),
+            "strict": True,
+        },
+    }
+
+
 class IntertextualAnalysisStep(PipelineStep):
     """Step for analyzing intertextual references using LLM"""
 
@@ -20,15 +58,50 @@ class IntertextualAnalysisStep(PipelineStep):
         prompt_generator: PromptGenerator,
         system_prompt: str,
         token_counter: TokenCounter,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[AnalysisCache] = None,
+        refresh_cache: bool = False,
     ):
+        """Initialize the analysis step
+
+        Args:
+            client: OpenAI client
+            prompt_generator: Generator for the per-pair analysis prompt
+            system_prompt: Rendered system prompt
+            token_counter: Token counter for usage tracking
+            rate_limiter: Optional limiter for requests and tokens per minute
+            cache: Optional persistent cache of analyses by prompt fingerprint
+            refresh_cache: Ignore cached analyses but still store new ones
+        """
         self.client = client
         self.prompt_generator = prompt_generator
         self.system_prompt = system_prompt
         self.token_counter = token_counter
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.refresh_cache = refresh_cache
 
-    def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        query_text: str = input_data["query_text"]
-        doc: Document = input_data["document"]
+        # Routes requests sharing the system prompt to the same prompt cache
+        self.prompt_cache_key = (
+            "intertextuality-"
+            + fingerprint(model=settings.llm.model, system_prompt=system_prompt)[:16]
+            if settings.llm.use_prompt_cache_key
+            else None
+        )
+
+    def build_messages(self, query_text: str, doc: Document) -> List[Dict[str, str]]:
+        """Render the chat messages for analyzing a passage pair
+
+        The system prompt is rendered once and always sent first, followed by the
+        static instructions of the analysis template, so every request shares a
+        byte-identical prefix that the API can serve from its prompt cache.
+        """
+        # Passages from an all-pairs search name their texts; the default pair
+        # keeps the template's Mrs Dalloway / The Odyssey wording
+        titles = {}
+        if "source_corpus" in doc.meta:
+            titles["source_title"] = self._title(doc.meta["source_corpus"])
+            titles["target_title"] = self._title(doc.meta["target_corpus"])
 
         prompt = self.prompt_generator.generate(
             template_name="analysis",
@@ -36,30 +109,98 @@ class IntertextualAnalysisStep(PipelineStep):
             odyssey_text=doc.content,
             similarity_score=doc.score,
             similarity_type=doc.meta["similarity_type"],
+            **titles,
         )
 
-        messages = [
+        return [
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": prompt},
         ]
 
+    @staticmethod
+    def _title(name: str) -> str:
+        """Display title of a registered text"""
+        text = settings.texts.get(name)
+        return text.title if text is not None and text.title else name
+
+    def build_request_body(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Build the raw chat completion request body, e.g. for the Batch API"""
+        return {
+            "model": settings.llm.model,
+            "messages": messages,
+            "response_format": response_format(Analysis),
+            "temperature": settings.llm.temperature,
+            "max_tokens": settings.llm.max_tokens,
+            **self.prompt_cache_options(),
+        }
+
+    def prompt_cache_options(self) -> Dict[str, Any]:
+        """Extra request parameters for prompt caching"""
+        if self.prompt_cache_key is None:
+            return {}
+        return {"prompt_cache_key": self.prompt_cache_key}
+
+    def get_cached(self, messages: List[Dict[str, str]]) -> Optional[Analysis]:
+        """Return a cached analysis for these messages, if caching allows it"""
+        if self.cache is None or self.refresh_cache:
+            return None
+        return self.cache.get(AnalysisCache.key(messages))
+
+    def store_cached(self, messages: List[Dict[str, str]], analysis: Analysis) -> None:
+        """Cache an analysis for these messages"""
+        if self.cache is not None:
+            self.cache.put(AnalysisCache.key(messages), analysis)
+
+    @metrics.timed("step.analysis")
+    def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        query_text: str = input_data["query_text"]
+        doc: Document = input_data["document"]
+
+        messages = self.build_messages(query_text, doc)
+
+        cached = self.get_cached(messages)
+        if cached is not None:
+            console.log("[green]Using cached analysis result[/green]")
+            metrics.increment("llm.cache_hits")
+            return cached
+
         try:
+            if self.rate_limiter is not None:
+                # Prompt tokens plus the expected output, as projected by --dry-run;
+                # reserving the whole max_tokens budget would throttle far below
+                # the TPM limit, since analyses rarely use it
+                prompt_tokens = self.token_counter.count_message_tokens(messages)
+                output_tokens = min(
+                    settings.llm.estimated_output_tokens, settings.llm.max_tokens
+                )
+                with metrics.timer("llm.rate_limit_wait"):
+                    self.rate_limiter.acquire(prompt_tokens + output_tokens)
+
             console.log("[cyan]Sending request to OpenAI...[/cyan]")
-            completion = self.client.beta.chat.completions.parse(
-                model=settings.llm.model,
-                messages=messages,
-                response_format=Analysis,
-                temperature=settings.llm.temperature,
-                max_tokens=settings.llm.max_tokens,
-            )
+            with metrics.timer("llm.request"):
+                completion = self.client.beta.chat.completions.parse(
+                    model=settings.llm.model,
+                    messages=messages,
+                    response_format=Analysis,
+                    temperature=settings.llm.temperature,
+                    max_tokens=settings.llm.max_tokens,
+                    **self.prompt_cache_options(),
+                )
 
+            usage = getattr(completion, "usage", None)
+            prompt_details = getattr(usage, "prompt_tokens_details", None)
             self.token_counter.track_completion(
                 messages=messages,
-                completion_tokens=completion.usage.completion_tokens if hasattr(completion, 'usage') else None,
+                completion_tokens=usage.completion_tokens if usage else None,
+                prompt_tokens=usage.prompt_tokens if usage else None,
+                cached_tokens=prompt_details.cached_tokens if prompt_details else None,
+                model=getattr(completion, "model", None),
             )
 
             console.log("[green]Analysis result created successfully[/green]")
-            return completion.choices[0].message.parsed
+            analysis = completion.choices[0].message.parsed
+            self.store_cached(messages, analysis)
+            return analysis
 
         except Exception as e:
             console.print(f"[red]Error in LLM analysis: {str(e)}[/red]")
@@ -1,9 +1,12 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
+from haystack import Document
 from rich.console import Console
 from .base import PipelineStep
 from src.embeddings.openai_embedder import OpenAIEmbedder
-from pathlib import Path
-from datetime import datetime
+from src.vector_store.base import SearchResult, SimilarityIndex
+from src.utils.metrics import metrics
+from src.utils.run_log import run_log
+import numpy as np
 
 console = Console()
 
@@ -11,111 +14,164 @@ console = Console()
 class SimilaritySearchStep(PipelineStep):
     """Step for finding similar passages"""
 
-    def __init__(self, embedder: OpenAIEmbedder, top_k: int = 1):
-        """Initialize with embedder and document store
+    def __init__(
+        self, embedder: OpenAIEmbedder, index: SimilarityIndex, top_k: int = 1
+    ):
+        """Initialize with embedder and similarity index
 
         Args:
             embedder: OpenAI embedder instance
-            top_k: Number of similar/dissimilar passages to return (default: 2)
+            index: Similarity index holding the Odyssey documents
+            top_k: Number of similar/dissimilar passages to return (default: 1)
         """
         self.embedder = embedder
-        self.document_store = embedder.document_store
+        self.index = index
         self.top_k = top_k
-        
-        # Create logs directory if it doesn't exist
-        self.log_dir = Path("data/logs")
-        self.log_dir.mkdir(parents=True, exist_ok=True)
-
-    def log_similarity_scores(self, query_text: str, all_docs: list, similar_docs: list, dissimilar_docs: list):
-        """Log similarity scores and passages to a file"""
-        timestamp = datetime.now().strftime("%Y%m%dT%H%M%S")
-        log_path = self.log_dir / f"similarity_scores_{timestamp}.txt"
-        
-        with open(log_path, "w", encoding="utf-8") as f:
-            # Log query
-            f.write(f"Query Text:\n{query_text}\n\n")
-            
-            # Log all scores in sorted order
-            f.write("All Similarity Scores (sorted):\n")
-            f.write("-" * 80 + "\n")
-            for doc in sorted(all_docs, key=lambda x: x.score, reverse=True):
-                f.write(f"Score: {doc.score:.4f}\n")
-                f.write(f"Text: {doc.content[:200]}...\n")
-                f.write("-" * 80 + "\n")
-            
-            # Log selected similar passages
-            f.write("\nSelected Similar Passages:\n")
-            f.write("=" * 80 + "\n")
-            for doc in similar_docs:
-                f.write(f"Score: {doc.score:.4f}\n")
-                f.write(f"Text: {doc.content}\n")
-                f.write("=" * 80 + "\n")
-            
-            # Log selected dissimilar passages
-            f.write("\nSelected Dissimilar Passages:\n")
-            f.write("=" * 80 + "\n")
-            for doc in dissimilar_docs:
-                f.write(f"Score: {doc.score:.4f}\n")
-                f.write(f"Text: {doc.content}\n")
-                f.write("=" * 80 + "\n")
-            
-            # Log statistics
-            all_scores = [doc.score for doc in all_docs]
-            f.write("\nStatistics:\n")
-            f.write(f"Total documents: {len(all_docs)}\n")
-            f.write(f"Score range: {min(all_scores):.4f} to {max(all_scores):.4f}\n")
-            f.write(f"Mean score: {sum(all_scores)/len(all_scores):.4f}\n")
-
-        console.log(f"[green]Similarity scores logged to {log_path}[/green]")
+        self.run_log = run_log
 
-    def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Find both similar and dissimilar passages"""
-        query_text: str = input_data["query_text"]
-        query_embedding = self.embedder.embed_query(query_text)
-
-        # Get similar documents
-        similar_docs = self.document_store._query_by_embedding(
-            query_embedding=query_embedding,
-            filters={},
-            top_k=self.top_k,
-            return_embedding=True,
-            scale_score=True,
-        )
-
-        # Get ALL documents by using a large limit
-        # Using 10000 as a reasonable upper limit that should get all documents
-        all_docs = self.document_store._query_by_embedding(
-            query_embedding=query_embedding,
-            filters={},
-            top_k=10000,  # Large number to get all documents
-            return_embedding=True,
-            scale_score=True,
-        )
-        
-        # Sort all documents by similarity score
-        all_docs_sorted = sorted(all_docs, key=lambda x: x.score, reverse=True)
-        
-        # Get most dissimilar docs from the bottom of the sorted list
-        dissimilar_docs = all_docs_sorted[-self.top_k:]
-
-        # Log similarity scores and passages
-        self.log_similarity_scores(query_text, all_docs_sorted, similar_docs, dissimilar_docs)
+    @staticmethod
+    def _hit(doc: Document) -> Dict[str, Any]:
+        return {
+            "id": doc.id,
+            "score": doc.score,
+            "chapter": doc.meta.get("chapter"),
+            "content": doc.content[:200],
+        }
+
+    def log_result(self, query_text: str, result: SearchResult):
+        """Record a sampled search result in the run log
+
+        At "info" verbosity the record holds the selected passages and score
+        statistics; "debug" adds the score of every document, best first.
+        """
+        if not self.run_log.enabled_for("info") or not self.run_log.sample():
+            return
+
+        all_scores = result.all_scores
+        record = {
+            "query": query_text,
+            "similar": [self._hit(doc) for doc in result.similar],
+            "dissimilar": [self._hit(doc) for doc in result.dissimilar],
+            "documents": len(all_scores),
+            "min_score": all_scores.min(),
+            "max_score": all_scores.max(),
+            "mean_score": all_scores.mean(),
+        }
+        if self.run_log.enabled_for("debug"):
+            record["ranking"] = [
+                [result.all_documents[i].id, round(float(all_scores[i]), 4)]
+                for i in np.argsort(-all_scores, kind="stable")
+            ]
+        self.run_log.log("search", **record)
+
+    def _label_documents(self, query_text: str, result: SearchResult) -> List[Document]:
+        """Log a search result and tag its documents with their similarity type"""
+        similar_docs = result.similar
+        dissimilar_docs = result.dissimilar
+
+        self.log_result(query_text, result)
+        verbose = self.run_log.enabled_for("debug")
 
         for doc in similar_docs:
             if not hasattr(doc, "meta"):
                 doc.meta = {}
             doc.meta["similarity_type"] = "similar"
-            console.log(
-                f"[cyan]Similar passage (score: {doc.score:.3f}): {doc.content[:100]}...[/cyan]"
-            )
+            if verbose:
+                console.log(
+                    f"[cyan]Similar passage (score: {doc.score:.3f}): {doc.content[:100]}...[/cyan]"
+                )
 
         for doc in dissimilar_docs:
             if not hasattr(doc, "meta"):
                 doc.meta = {}
             doc.meta["similarity_type"] = "dissimilar"
-            console.log(
-                f"[yellow]Dissimilar passage (score: {doc.score:.3f}): {doc.content[:100]}...[/yellow]"
-            )
+            if verbose:
+                console.log(
+                    f"[yellow]Dissimilar passage (score: {doc.score:.3f}): {doc.content[:100]}...[/yellow]"
+                )
+
+        return similar_docs + dissimilar_docs
+
+    @metrics.timed("step.search")
+    def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Find both similar and dissimilar passages
+
+        Accepts either a single `query_text` (with an optional precomputed
+        `query_embedding`), or a list of `query_documents` which are searched
+        together in one batched pass over the index, or `source_documents` by
+        source name to search every source against every index in
+        `target_indexes`.
+        """
+        if "source_documents" in input_data:
+            return self._execute_all_pairs(input_data)
+
+        if "query_documents" in input_data:
+            return self._execute_batch(input_data)
+
+        query_text: str = input_data["query_text"]
+        query_embedding = input_data.get("query_embedding")
+        if query_embedding is None:
+            query_embedding = self.embedder.embed_query(query_text)
+
+        # Top-k and bottom-k come from a single pass over the index
+        result = self.index.search(query_embedding, top_k=self.top_k)
+        metrics.increment("search.queries")
+
+        input_data["similar_documents"] = self._label_documents(query_text, result)
+        return input_data
+
+    def _execute_batch(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Find similar and dissimilar passages for many query documents at once"""
+        query_docs: List[Document] = input_data["query_documents"]
+
+        # Reuse precomputed query embeddings, only embedding the missing ones
+        query_embeddings = [
+            doc.embedding
+            if doc.embedding is not None
+            else self.embedder.embed_query(doc.content)
+            for doc in query_docs
+        ]
+
+        results = self.index.search_batch(query_embeddings, top_k=self.top_k)
+        metrics.increment("search.queries", len(query_embeddings))
+        input_data["similar_documents_batch"] = [
+            self._label_documents(query_doc.content, result)
+            for query_doc, result in zip(query_docs, results)
+        ]
+        return input_data
+
+    def _execute_all_pairs(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Search every source text against every target index
+
+        The queries of all sources are embedded once and searched together in one
+        batched pass per target. Result documents are tagged with their
+        `source_corpus` and `target_corpus`.
+        """
+        source_docs: Dict[str, List[Document]] = input_data["source_documents"]
+        target_indexes: Dict[str, SimilarityIndex] = input_data["target_indexes"]
+
+        queries = [
+            (source, doc) for source, docs in source_docs.items() for doc in docs
+        ]
+        query_embeddings = [
+            doc.embedding
+            if doc.embedding is not None
+            else self.embedder.embed_query(doc.content)
+            for _, doc in queries
+        ]
+
+        pairs: Dict[Tuple[str, str], List[List[Document]]] = {
+            (source, target): [] for target in target_indexes for source in source_docs
+        }
+        for target, index in target_indexes.items():
+            results = index.search_batch(query_embeddings, top_k=self.top_k)
+            metrics.increment("search.queries", len(query_embeddings))
+            for (source, query_doc), result in zip(queries, results):
+                labeled = self._label_documents(query_doc.content, result)
+                for doc in labeled:
+                    doc.meta["source_corpus"] = source
+                    doc.meta["target_corpus"] = target
+                pairs[(source, target)].append(labeled)
 
-        input_data["similar_documents"] = similar_docs + dissimilar_docs
+        input_data["similar_documents_pairs"] = pairs
         return input_data
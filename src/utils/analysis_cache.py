@@ -0,0 +1,124 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.config.settings import settings
+from src.models.schemas import Analysis
+from src.utils.fingerprint import fingerprint
+
+# Changes whenever the Analysis schema changes, invalidating cached analyses
+ANALYSIS_SCHEMA_VERSION = hashlib.sha256(
+    json.dumps(Analysis.model_json_schema(), sort_keys=True).encode("utf-8")
+).hexdigest()[:16]
+
+
+class AnalysisCache:
+    """Persistent, size-bounded LRU cache of parsed LLM analyses, backed by SQLite
+
+    Entries are keyed by a fingerprint of everything that determines the response:
+    model, rendered messages, temperature, max_tokens and the Analysis schema.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        max_entries: Optional[int] = None,
+    ):
+        """Open (or create) the cache database
+
+        Args:
+            cache_dir: Directory holding the SQLite database
+                (default: settings.storage["analysis_cache_dir"])
+            max_entries: Maximum number of cached analyses; the least recently
+                used entries are evicted beyond this
+                (default: settings.llm.cache_max_entries)
+        """
+        if cache_dir is None:
+            cache_dir = settings.storage["analysis_cache_dir"]
+        if max_entries is None:
+            max_entries = settings.llm.cache_max_entries
+        self.max_entries = max_entries
+
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self.db_path = Path(cache_dir) / "analyses.sqlite"
+        # Analyses are cached from concurrent worker threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                analysis TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used)"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def key(
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        """Fingerprint of an analysis request
+
+        Model, temperature and max_tokens default to the current settings.llm
+        values, read on every call so that changed settings change the key.
+        """
+        if model is None:
+            model = settings.llm.model
+        if temperature is None:
+            temperature = settings.llm.temperature
+        if max_tokens is None:
+            max_tokens = settings.llm.max_tokens
+        return fingerprint(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            schema_version=ANALYSIS_SCHEMA_VERSION,
+        )
+
+    def get(self, key: str) -> Optional[Analysis]:
+        """Return the cached analysis for a key, or None on a miss"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT analysis FROM analyses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            self.connection.execute(
+                "UPDATE analyses SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self.connection.commit()
+
+        return Analysis.model_validate_json(row[0])
+
+    def put(self, key: str, analysis: Analysis) -> None:
+        """Cache an analysis, evicting least recently used entries over the limit"""
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?)",
+                (key, analysis.model_dump_json(), time.time()),
+            )
+
+            (count,) = self.connection.execute(
+                "SELECT COUNT(*) FROM analyses"
+            ).fetchone()
+            if count > self.max_entries:
+                self.connection.execute(
+                    "DELETE FROM analyses WHERE key IN "
+                    "(SELECT key FROM analyses ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self.connection.commit()
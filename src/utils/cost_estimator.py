@@ -0,0 +1,155 @@
+import math
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+from rich.console import Console
+from rich.table import Table
+
+from src.config.settings import settings
+from src.utils.token_counter import TokenCounter
+
+console = Console()
+
+# Prompt counts from which tokenization is spread over worker processes
+MULTIPROCESS_THRESHOLD = 10000
+
+
+@dataclass
+class RunEstimate:
+    """Projected token usage, cost and duration of an analysis run
+
+    Attributes:
+        requests: Analyses that would be sent to the API
+        cached_requests: Analyses served from the analysis cache at no cost
+        input_tokens: Exact prompt tokens of the requests
+        output_tokens: Projected completion tokens of the requests
+        input_cost: Cost of the input tokens in USD
+        output_cost: Cost of the output tokens in USD
+        wall_clock_seconds: Projected duration at the configured concurrency
+            and rate limits (None in batch mode)
+    """
+
+    requests: int
+    cached_requests: int
+    input_tokens: int
+    output_tokens: int
+    input_cost: float
+    output_cost: float
+    wall_clock_seconds: Optional[float]
+
+    @property
+    def total_cost(self) -> float:
+        return self.input_cost + self.output_cost
+
+
+class CostEstimator:
+    """Estimates the cost and duration of a run from its rendered prompts"""
+
+    def __init__(self, token_counter: TokenCounter):
+        self.token_counter = token_counter
+
+    def estimate_wall_clock(self, prompt_chars: Sequence[int]) -> float:
+        """Projected duration of interactive analyses, in seconds
+
+        The run takes as long as its tightest constraint: the number of request
+        waves at the configured concurrency, the requests per minute, or the
+        tokens per minute as reserved by the rate limiter.
+
+        Args:
+            prompt_chars: Character count of each request's messages
+        """
+        requests = len(prompt_chars)
+        bounds = [
+            math.ceil(requests / settings.llm.max_concurrency)
+            * settings.llm.estimated_latency_seconds
+        ]
+
+        rpm = settings.llm.requests_per_minute
+        if rpm:
+            # The limiter starts with one minute worth of capacity
+            bounds.append(max(0, requests - rpm) / rpm * 60)
+
+        tpm = settings.llm.tokens_per_minute
+        if tpm:
+            # Same reservation as IntertextualAnalysisStep: ~4 chars per token
+            # plus the full output budget
+            reserved = sum(
+                chars // 4 + settings.llm.max_tokens for chars in prompt_chars
+            )
+            bounds.append(max(0, reserved - tpm) / tpm * 60)
+
+        return max(bounds)
+
+    def estimate(
+        self,
+        messages_list: Sequence[List[Dict[str, str]]],
+        cached_requests: int = 0,
+        batch: bool = False,
+    ) -> RunEstimate:
+        """Estimate a run from the messages of every uncached request
+
+        Args:
+            messages_list: Rendered messages of the requests that would be sent
+            cached_requests: Number of analyses already in the analysis cache
+            batch: Whether the run uses the Batch API, billed at a discount
+
+        Raises:
+            ValueError: If settings.llm.model has no known prices
+        """
+        pricing = TokenCounter.pricing(settings.llm.model)
+        discount = TokenCounter.BATCH_DISCOUNT if batch else 1.0
+
+        processes = (
+            os.cpu_count() if len(messages_list) >= MULTIPROCESS_THRESHOLD else None
+        )
+        input_tokens = sum(
+            self.token_counter.count_message_tokens_batch(
+                messages_list, processes=processes
+            )
+        )
+        output_tokens = len(messages_list) * min(
+            settings.llm.estimated_output_tokens, settings.llm.max_tokens
+        )
+
+        wall_clock = None
+        if not batch:
+            wall_clock = self.estimate_wall_clock(
+                [
+                    sum(len(message["content"]) for message in messages)
+                    for messages in messages_list
+                ]
+            )
+
+        return RunEstimate(
+            requests=len(messages_list),
+            cached_requests=cached_requests,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            input_cost=(input_tokens / 1000) * pricing["input"] * discount,
+            output_cost=(output_tokens / 1000) * pricing["output"] * discount,
+            wall_clock_seconds=wall_clock,
+        )
+
+
+def display_estimate_table(estimate: RunEstimate):
+    """Display a run estimate in a formatted table"""
+    table = Table(title="Dry Run Estimate")
+
+    table.add_column("Metric", style="cyan", no_wrap=True)
+    table.add_column("Value", style="green")
+
+    table.add_row("Requests", f"{estimate.requests:,}")
+    table.add_row("Cached Analyses", f"{estimate.cached_requests:,}")
+    table.add_row("Input Tokens", f"{estimate.input_tokens:,}")
+    table.add_row("Projected Output Tokens", f"{estimate.output_tokens:,}")
+    table.add_row("Input Cost", f"${estimate.input_cost:.4f}")
+    table.add_row("Projected Output Cost", f"${estimate.output_cost:.4f}")
+    table.add_row("Projected Total Cost", f"${estimate.total_cost:.4f}")
+    if estimate.wall_clock_seconds is None:
+        table.add_row("Estimated Wall Clock", "up to 24h (Batch API)")
+    else:
+        minutes, seconds = divmod(round(estimate.wall_clock_seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        table.add_row("Estimated Wall Clock", f"{hours}h {minutes:02d}m {seconds:02d}s")
+
+    console.print(table)
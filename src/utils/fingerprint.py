@@ -0,0 +1,46 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any
+
+from src.config.settings import TextPaths, settings
+
+# Preprocessing settings that change how chunks are produced, but not the chunks
+EXECUTION_ONLY_PREPROCESSING_SETTINGS = {
+    "streaming",
+    "stream_window_chars",
+    "num_workers",
+}
+
+
+def file_sha256(path: str | Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(**parts: Any) -> str:
+    """Stable SHA-256 hex digest of JSON-serializable keyword arguments"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def corpus_fingerprint(text: TextPaths) -> str:
+    """Fingerprint of everything that determines a corpus' chunks and embeddings
+
+    Covers the raw text, its structure and title (stored in chunk metadata), the
+    preprocessing (chunking) settings and the embedding model and dimension.
+    """
+    return fingerprint(
+        raw_sha256=file_sha256(text.raw_path),
+        structure=text.structure,
+        title=text.title,
+        preprocessing=settings.preprocessing.model_dump(
+            exclude=EXECUTION_ONLY_PREPROCESSING_SETTINGS
+        ),
+        embedding_model=settings.embeddings.api_model,
+        embedding_dimension=settings.embeddings.dimension,
+    )
@@ -0,0 +1,86 @@
+import importlib.util
+import threading
+from typing import Any, Dict
+import httpx
+from rich.console import Console
+
+from src.config.settings import settings
+
+console = Console()
+
+_lock = threading.Lock()
+_openai_client = None
+
+
+def _http2() -> bool:
+    """Whether to negotiate HTTP/2, which needs the optional h2 package"""
+    if not settings.http.http2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        console.log(
+            "[yellow]h2 is not installed, connections use HTTP/1.1 with "
+            "keep-alive[/yellow]"
+        )
+        return False
+    return True
+
+
+def _client_options() -> Dict[str, Any]:
+    return {
+        "http2": _http2(),
+        "limits": httpx.Limits(
+            max_connections=settings.http.max_connections,
+            max_keepalive_connections=settings.http.max_keepalive_connections,
+            keepalive_expiry=settings.http.keepalive_expiry,
+        ),
+        "timeout": httpx.Timeout(
+            settings.http.timeout, connect=settings.http.connect_timeout
+        ),
+    }
+
+
+def create_http_client() -> httpx.Client:
+    """HTTP client with the configured connection pool, keep-alive and timeouts"""
+    return httpx.Client(**_client_options())
+
+
+def create_async_http_client() -> httpx.AsyncClient:
+    """Async HTTP client with the configured connection pool, keep-alive and timeouts
+
+    An async client's connections belong to the event loop that opened them, so
+    create one per loop.
+    """
+    return httpx.AsyncClient(**_client_options())
+
+
+def get_openai_client():
+    """OpenAI client shared by the embedders, the analysis step and the batch runner
+
+    All requests go through one connection pool, so concurrent embedding and
+    analysis requests reuse open connections instead of each component opening
+    its own.
+    """
+    global _openai_client
+    with _lock:
+        if _openai_client is None:
+            from openai import OpenAI
+
+            _openai_client = OpenAI(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url,
+                max_retries=settings.http.max_retries,
+                http_client=create_http_client(),
+            )
+        return _openai_client
+
+
+def create_async_openai_client():
+    """AsyncOpenAI client with the configured pool, to create once per event loop"""
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        base_url=settings.openai_base_url,
+        max_retries=settings.http.max_retries,
+        http_client=create_async_http_client(),
+    )
@@ -0,0 +1,207 @@
+import functools
+import json
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+from src.config.settings import settings
+
+console = Console()
+
+PERCENTILES = (50, 95, 99)
+
+
+class MetricsRegistry:
+    """Thread-safe latency, count and error metrics of the pipeline stages
+
+    Timers record the duration of every call of a stage (a pipeline step, an
+    embedding request, an LLM request...), counters accumulate quantities such
+    as tokens. With settings.metrics.opentelemetry, every timed call is also
+    exported as an OpenTelemetry span.
+    """
+
+    def __init__(self, opentelemetry: Optional[bool] = None):
+        """Initialize an empty registry
+
+        Args:
+            opentelemetry: Whether to also record timed calls as OpenTelemetry
+                spans (requires the opentelemetry-api package; default:
+                settings.metrics.opentelemetry when the first call is timed)
+        """
+        self.opentelemetry = opentelemetry
+        self.lock = threading.Lock()
+        self.durations: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.counters: Dict[str, float] = {}
+        self.started = time.monotonic()
+
+    @functools.cached_property
+    def tracer(self):
+        """OpenTelemetry tracer of timed calls, or None if spans are disabled"""
+        enabled = self.opentelemetry
+        if enabled is None:
+            enabled = settings.metrics.opentelemetry
+        return self._create_tracer() if enabled else None
+
+    @staticmethod
+    def _create_tracer():
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            console.log(
+                "[yellow]opentelemetry-api is not installed, "
+                "spans will not be exported[/yellow]"
+            )
+            return None
+        return trace.get_tracer("woolf-intertextuality")
+
+    def reset(self) -> None:
+        """Discard all recorded metrics and restart the run clock"""
+        with self.lock:
+            self.durations.clear()
+            self.errors.clear()
+            self.counters.clear()
+            self.started = time.monotonic()
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Time a block as one call of a stage, counting it as an error if it raises"""
+        with ExitStack() as stack:
+            if self.tracer is not None:
+                stack.enter_context(self.tracer.start_as_current_span(name))
+            start = time.perf_counter()
+            try:
+                yield
+            except BaseException:
+                with self.lock:
+                    self.errors[name] = self.errors.get(name, 0) + 1
+                raise
+            finally:
+                duration = time.perf_counter() - start
+                with self.lock:
+                    self.durations.setdefault(name, []).append(duration)
+
+    def timed(self, name: str) -> Callable:
+        """Decorator timing every call of a function as a stage"""
+
+        def decorator(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Add to a counter"""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self) -> Dict[str, Any]:
+        """Latency percentiles and error counts per stage, counters and their rates"""
+        with self.lock:
+            durations = {name: list(values) for name, values in self.durations.items()}
+            errors = dict(self.errors)
+            counters = dict(self.counters)
+            elapsed = time.monotonic() - self.started
+
+        stages = {}
+        for name, values in sorted(durations.items()):
+            seconds = np.asarray(values)
+            stages[name] = {
+                "count": len(values),
+                "errors": errors.get(name, 0),
+                "total_s": float(seconds.sum()),
+                "mean_s": float(seconds.mean()),
+                **{f"p{p}_s": float(np.percentile(seconds, p)) for p in PERCENTILES},
+                "max_s": float(seconds.max()),
+            }
+
+        return {
+            "elapsed_s": elapsed,
+            "stages": stages,
+            "counters": {
+                name: {"total": value, "per_second": value / elapsed if elapsed else 0}
+                for name, value in sorted(counters.items())
+            },
+        }
+
+    def write_json(self, path: Path) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(self.summary(), indent=2), encoding="utf-8")
+
+    def to_prometheus(self, prefix: str = "woolf") -> str:
+        """Summary in the Prometheus text exposition format"""
+        summary = self.summary()
+        lines = [f"# TYPE {prefix}_stage_duration_seconds summary"]
+        for name, stage in summary["stages"].items():
+            for p in PERCENTILES:
+                lines.append(
+                    f'{prefix}_stage_duration_seconds{{stage="{name}",'
+                    f'quantile="{p / 100}"}} {stage[f"p{p}_s"]}'
+                )
+            lines.append(
+                f'{prefix}_stage_duration_seconds_sum{{stage="{name}"}} '
+                f"{stage['total_s']}"
+            )
+            lines.append(
+                f'{prefix}_stage_duration_seconds_count{{stage="{name}"}} '
+                f"{stage['count']}"
+            )
+
+        lines.append(f"# TYPE {prefix}_stage_errors_total counter")
+        for name, stage in summary["stages"].items():
+            lines.append(
+                f'{prefix}_stage_errors_total{{stage="{name}"}} {stage["errors"]}'
+            )
+
+        for name, counter in summary["counters"].items():
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {counter['total']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(self.to_prometheus(), encoding="utf-8")
+
+
+def display_metrics_table(registry: Optional["MetricsRegistry"] = None):
+    """Display per-stage latency percentiles and counters in a formatted table"""
+    summary = (registry or metrics).summary()
+    table = Table(title="Stage Timings")
+
+    table.add_column("Stage", style="cyan", no_wrap=True)
+    table.add_column("Calls", style="green", justify="right")
+    table.add_column("Errors", style="red", justify="right")
+    table.add_column("p50", style="green", justify="right")
+    table.add_column("p95", style="green", justify="right")
+    table.add_column("Total", style="green", justify="right")
+
+    for name, stage in summary["stages"].items():
+        table.add_row(
+            name,
+            f"{stage['count']:,}",
+            f"{stage['errors']:,}",
+            f"{stage['p50_s'] * 1000:.1f} ms",
+            f"{stage['p95_s'] * 1000:.1f} ms",
+            f"{stage['total_s']:.2f} s",
+        )
+    console.print(table)
+
+    for name, counter in summary["counters"].items():
+        console.print(
+            f"{name}: {counter['total']:,.0f} ({counter['per_second']:,.1f}/s)"
+        )
+
+
+# Registry shared by all pipeline components
+metrics = MetricsRegistry()
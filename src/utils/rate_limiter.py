@@ -0,0 +1,72 @@
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """Initialize the bucket
+
+        Args:
+            rate_per_minute: Number of units added to the bucket per minute
+            capacity: Maximum number of units the bucket can hold
+                (default: one minute worth of units)
+        """
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else float(rate_per_minute)
+        self.available = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.available = min(
+            self.capacity, self.available + elapsed * self.rate_per_second
+        )
+        self.last_refill = now
+
+    def acquire(self, amount: float = 1.0) -> None:
+        """Block until `amount` units are available, then consume them"""
+        # A request larger than the bucket could never be satisfied
+        amount = min(amount, self.capacity)
+
+        while True:
+            with self.lock:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                wait_time = (amount - self.available) / self.rate_per_second
+            time.sleep(wait_time)
+
+
+class RateLimiter:
+    """Limits requests and tokens per minute for OpenAI API calls"""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ):
+        """Initialize the rate limiter
+
+        Args:
+            requests_per_minute: Maximum requests per minute (None disables the limit)
+            tokens_per_minute: Maximum tokens per minute (None disables the limit)
+        """
+        self.request_bucket = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        )
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until one request with an estimated `tokens` may be sent"""
+        if self.request_bucket is not None:
+            self.request_bucket.acquire(1)
+        if self.token_bucket is not None and tokens:
+            self.token_bucket.acquire(tokens)
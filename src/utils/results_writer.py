@@ -0,0 +1,119 @@
+import csv
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+from rich.console import Console
+
+console = Console()
+
+RESULT_COLUMNS = [
+    "dalloway_text",
+    "odyssey_text",
+    "odyssey_chapter",
+    "similarity_score",
+    "similarity_type",
+    "prompt_type",
+    "initial_observations",
+    "thinking_steps",
+    "connections",
+    "evaluation",
+]
+
+# Extra columns of all-pairs runs, naming the texts each row compares
+PAIR_COLUMNS = ["source_corpus", "target_corpus"]
+
+
+def result_key(
+    dalloway_text: str, odyssey_text: str, prompt_type: str, target_corpus: str = ""
+) -> Tuple:
+    """Identity of one analysis row: (query chunk, passage, prompt template, target)"""
+    return (dalloway_text, odyssey_text, prompt_type, target_corpus)
+
+
+class ResultsWriter:
+    """Streams analysis result rows to a CSV file as soon as they are produced
+
+    Every row is flushed to disk immediately, so an interrupted run keeps all
+    completed analyses and can be resumed by appending to the same file.
+    """
+
+    def __init__(self, output_path: Path, columns: List[str] = RESULT_COLUMNS):
+        """Open the results file for appending, writing the header if it is new
+
+        Args:
+            output_path: CSV file to write to; an existing file is appended to
+            columns: CSV columns (default: RESULT_COLUMNS; all-pairs runs add
+                PAIR_COLUMNS)
+
+        Raises:
+            ValueError: If an existing file has different columns
+        """
+        self.output_path = Path(output_path)
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        is_new = self.check_columns(self.output_path, columns) is None
+        self.file = open(self.output_path, "a", encoding="utf-8", newline="")
+        # Same layout as DataFrame.to_csv, so streamed files match earlier results
+        self.writer = csv.DictWriter(self.file, fieldnames=columns, lineterminator="\n")
+        if is_new:
+            self.writer.writeheader()
+            self.file.flush()
+
+        self.rows_written = 0
+
+    @staticmethod
+    def check_columns(output_path: Path, columns: List[str]) -> Optional[List[str]]:
+        """Check that rows with `columns` can be appended to a results file
+
+        Returns:
+            The file's header, or None if the file is missing or empty
+
+        Raises:
+            ValueError: If the file's header doesn't match `columns`, e.g. when
+                resuming an all-pairs run without --all-pairs or vice versa
+        """
+        output_path = Path(output_path)
+        if not output_path.exists():
+            return None
+        with open(output_path, "r", encoding="utf-8", newline="") as f:
+            header = next(csv.reader(f), None)
+        if header is not None and header != list(columns):
+            all_pairs = set(PAIR_COLUMNS) <= set(header)
+            raise ValueError(
+                f"{output_path} has columns {header}, expected {list(columns)}; "
+                f"it was written by a run {'with' if all_pairs else 'without'} "
+                "--all-pairs"
+            )
+        return header
+
+    @staticmethod
+    def completed_keys(output_path: Path) -> Set[Tuple]:
+        """Keys of the rows already present in a results file"""
+        output_path = Path(output_path)
+        if not output_path.exists():
+            return set()
+
+        with open(output_path, "r", encoding="utf-8", newline="") as f:
+            return {
+                result_key(
+                    row["dalloway_text"],
+                    row["odyssey_text"],
+                    row["prompt_type"],
+                    row.get("target_corpus") or "",
+                )
+                for row in csv.DictReader(f)
+            }
+
+    def write(self, row: Dict[str, Any]) -> None:
+        """Append one result row and flush it to disk"""
+        self.writer.writerow(row)
+        self.file.flush()
+        self.rows_written += 1
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "ResultsWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
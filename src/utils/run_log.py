@@ -0,0 +1,160 @@
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+import numpy as np
+
+from src.config.settings import settings
+
+VERBOSITY_LEVELS = ["quiet", "info", "debug"]
+
+# Records waiting to be written before log() blocks, bounding the buffer memory
+MAX_QUEUED_RECORDS = 10_000
+
+_STOP = object()
+
+
+def _to_json(value: Any) -> Any:
+    """Serialize the numpy values records may contain"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+class RunLogger:
+    """Buffered, append-only JSONL log of one pipeline run
+
+    Records are queued and serialized by a background thread, which appends
+    them in batches to a single file per run, so logging costs the caller a
+    queue put. The file is created on the first record.
+    """
+
+    def __init__(
+        self,
+        log_dir: Optional[Path] = None,
+        verbosity: Optional[str] = None,
+        sample_rate: Optional[float] = None,
+        seed: int = 42,
+    ):
+        """Initialize a logger without starting its writer thread
+
+        Arguments left as None follow settings.storage["log_dir"] and
+        settings.run_log, read when they are used rather than at import.
+
+        Args:
+            log_dir: Directory of the run log files
+            verbosity: "quiet", "info" or "debug"
+            sample_rate: Fraction of sampled records to keep (see `sample`)
+            seed: Random seed of the sampling
+        """
+        self._log_dir = log_dir
+        self._verbosity = verbosity
+        self._sample_rate = sample_rate
+        self.path: Optional[Path] = None
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=MAX_QUEUED_RECORDS)
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def log_dir(self) -> Path:
+        if self._log_dir is not None:
+            return Path(self._log_dir)
+        return Path(settings.storage["log_dir"])
+
+    @property
+    def verbosity(self) -> str:
+        if self._verbosity is not None:
+            return self._verbosity
+        return settings.run_log.verbosity
+
+    @property
+    def sample_rate(self) -> float:
+        if self._sample_rate is not None:
+            return self._sample_rate
+        return settings.run_log.sample_rate
+
+    def enabled_for(self, level: str) -> bool:
+        """Whether the verbosity includes records of a level ("info" or "debug")"""
+        return VERBOSITY_LEVELS.index(self.verbosity) >= VERBOSITY_LEVELS.index(level)
+
+    def sample(self) -> bool:
+        """Draw whether to keep a record, with probability `sample_rate`"""
+        sample_rate = self.sample_rate
+        if sample_rate >= 1:
+            return True
+        with self.lock:
+            return self.random.random() < sample_rate
+
+    def log(self, event: str, **fields: Any) -> None:
+        """Queue a record for the run log
+
+        Args:
+            event: Record type, e.g. "search"
+            **fields: JSON-serializable record fields (numpy values allowed)
+        """
+        self._start()
+        self.queue.put({"time": time.time(), "event": event, **fields})
+
+    def _start(self) -> None:
+        with self.lock:
+            if self.thread is not None:
+                return
+            if self.path is None:
+                # Microseconds and the process id keep concurrent runs apart
+                timestamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+                self.path = self.log_dir / f"run_{timestamp}_{os.getpid()}.jsonl"
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self.thread = threading.Thread(
+                target=self._write, name="run-log-writer", daemon=True
+            )
+            self.thread.start()
+            atexit.register(self.close)
+
+    def _write(self) -> None:
+        """Append queued records until `close`, one write per batch"""
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                batch = [self.queue.get()]
+                while True:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stop = any(record is _STOP for record in batch)
+                f.writelines(
+                    json.dumps(record, ensure_ascii=False, default=_to_json) + "\n"
+                    for record in batch
+                    if record is not _STOP
+                )
+                f.flush()
+                if stop:
+                    return
+
+    def close(self) -> Optional[Path]:
+        """Write all queued records and stop the writer thread
+
+        Logging again afterwards appends to the same file.
+
+        Returns:
+            Path of the run log, or None if nothing was logged
+        """
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.queue.put(_STOP)
+            thread.join()
+        return self.path
+
+
+# Run log shared by all pipeline components
+run_log = RunLogger()
@@ -1,9 +1,24 @@
-from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import re
+from typing import Dict, List, Optional, Sequence
+import threading
 import tiktoken
 from rich.console import Console
 
+from src.config.settings import settings
+from src.utils.metrics import metrics
+
 console = Console()
 
+ENCODING_MODEL = "gpt-4o"
+
+
+def _count_tokens_chunk(texts: List[str]) -> List[int]:
+    """Count tokens for a chunk of texts in a worker process"""
+    encoding = tiktoken.encoding_for_model(ENCODING_MODEL)
+    return [len(tokens) for tokens in encoding.encode_batch(texts)]
+
 
 class TokenCounter:
     """Tracks token usage and estimates costs for OpenAI API calls"""
@@ -14,9 +29,33 @@ class TokenCounter:
             "output": 0.01,  # $10.00 per 1M tokens = $0.01 per 1k
             "cached_input": 0.00125,  # $1.25 per 1M tokens = $0.00125 per 1k
         },
+        "gpt-4o-mini": {
+            "input": 0.00015,  # $0.15 per 1M tokens
+            "output": 0.0006,  # $0.60 per 1M tokens
+            "cached_input": 0.000075,  # $0.075 per 1M tokens
+        },
         "text-embedding-3-small": {"input": 0.00002, "output": 0.00002},
     }
 
+    # The Batch API bills input and output tokens at half the interactive price
+    BATCH_DISCOUNT = 0.5
+
+    @classmethod
+    def pricing(cls, model: str) -> Dict[str, float]:
+        """Prices per 1k tokens of a model, dated snapshots priced as their base model
+
+        Raises:
+            ValueError: If the model has no known prices
+        """
+        base_model = re.sub(r"-\d{4}-\d{2}-\d{2}$", "", model)
+        for name in (model, base_model):
+            if name in cls.PRICING:
+                return cls.PRICING[name]
+        raise ValueError(
+            f"No pricing for model {model!r}; add it to TokenCounter.PRICING "
+            f"(known models: {', '.join(cls.PRICING)})"
+        )
+
     def __init__(self):
         self.usage = {
             "embedding": {"tokens": 0, "cost": 0.0},
@@ -27,12 +66,47 @@ class TokenCounter:
                 "cost": 0.0,
             },
         }
-        self.encoding = tiktoken.encoding_for_model("gpt-4o")
+        self.encoding = tiktoken.encoding_for_model(ENCODING_MODEL)
+        # Analyses run concurrently, so usage updates must be serialized
+        self.lock = threading.Lock()
+        # Roles and the system prompt are identical on every call, so their
+        # counts are memoized instead of re-tokenizing them each time
+        self.count_tokens_cached = lru_cache(maxsize=256)(self.count_tokens)
 
     def count_tokens(self, text: str) -> int:
         """Count tokens for a given text"""
         return len(self.encoding.encode(text))
 
+    def count_tokens_batch(
+        self,
+        texts: Sequence[str],
+        num_threads: int = 8,
+        processes: Optional[int] = None,
+    ) -> List[int]:
+        """Count tokens for many texts at once, tokenizing them in parallel
+
+        Args:
+            texts: Texts to count
+            num_threads: Number of tokenizer threads
+            processes: Split the texts across this many worker processes, for
+                large corpora (default: tokenize in this process)
+        """
+        texts = list(texts)
+        if processes is None or processes <= 1 or len(texts) < processes:
+            return [
+                len(tokens)
+                for tokens in self.encoding.encode_batch(texts, num_threads=num_threads)
+            ]
+
+        chunk_size = -(-len(texts) // processes)
+        chunks = [texts[i : i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            return [
+                count
+                for chunk_counts in executor.map(_count_tokens_chunk, chunks)
+                for count in chunk_counts
+            ]
+
     def count_message_tokens(self, messages: List[Dict[str, str]]) -> int:
         """Count tokens in a message list for chat completion"""
         num_tokens = 0
@@ -40,30 +114,113 @@ class TokenCounter:
             # Every message follows <im_start>{role/name}\n{content}<im_end>\n
             num_tokens += 4
             for key, value in message.items():
-                num_tokens += self.count_tokens(value)
+                if key == "content" and message.get("role") != "system":
+                    num_tokens += self.count_tokens(value)
+                else:
+                    num_tokens += self.count_tokens_cached(value)
         num_tokens += 2  # Every reply is primed with <im_start>assistant
         return num_tokens
 
+    def count_message_tokens_batch(
+        self,
+        messages_list: Sequence[List[Dict[str, str]]],
+        processes: Optional[int] = None,
+    ) -> List[int]:
+        """Count tokens for many message lists, tokenizing non-system content in bulk
+
+        Args:
+            messages_list: Message lists, as passed to chat completion
+            processes: Number of worker processes for the bulk tokenization
+        """
+        counts = [2] * len(messages_list)
+        texts: List[str] = []
+        owners: List[int] = []
+        for i, messages in enumerate(messages_list):
+            for message in messages:
+                counts[i] += 4
+                for key, value in message.items():
+                    if key == "content" and message.get("role") != "system":
+                        texts.append(value)
+                        owners.append(i)
+                    else:
+                        counts[i] += self.count_tokens_cached(value)
+
+        for i, count in zip(
+            owners, self.count_tokens_batch(texts, processes=processes)
+        ):
+            counts[i] += count
+        return counts
+
     def track_embedding(self, texts: List[str]):
         """Track token usage for embeddings"""
-        total_tokens = sum(self.count_tokens(text) for text in texts)
+        total_tokens = sum(self.count_tokens_batch(texts))
         cost = (total_tokens / 1000) * self.PRICING["text-embedding-3-small"]["input"]
 
-        self.usage["embedding"]["tokens"] += total_tokens
-        self.usage["embedding"]["cost"] += cost
+        with self.lock:
+            self.usage["embedding"]["tokens"] += total_tokens
+            self.usage["embedding"]["cost"] += cost
 
-    def track_completion(self, messages: List[Dict[str, str]], completion_tokens: Optional[int] = None):
-        """Track token usage for a completion."""
-        prompt_tokens = self.count_message_tokens(messages)
-        
+    def track_completion(
+        self,
+        messages: List[Dict[str, str]],
+        completion_tokens: Optional[int] = None,
+        prompt_tokens: Optional[int] = None,
+        cached_tokens: Optional[int] = None,
+        model: Optional[str] = None,
+        batch: bool = False,
+    ):
+        """Track token usage for a completion.
+
+        Args:
+            messages: Messages sent to the model
+            completion_tokens: Output tokens reported by the API
+            prompt_tokens: Input tokens reported by the API; the messages are only
+                tokenized locally when this is missing
+            cached_tokens: Input tokens served from the prompt cache, billed at
+                the cached input price
+            model: Model that answered, as reported by the API, whose prices
+                apply; settings.llm.model is priced instead when it is missing
+                or has no known prices
+            batch: Whether the completion ran through the Batch API, which
+                bills tokens at BATCH_DISCOUNT times the interactive price
+
+        Raises:
+            ValueError: If settings.llm.model has no known prices either
+        """
+        try:
+            pricing = self.pricing(model or settings.llm.model)
+        except ValueError:
+            pricing = self.pricing(settings.llm.model)
+        discount = self.BATCH_DISCOUNT if batch else 1.0
+        if prompt_tokens is None:
+            prompt_tokens = self.count_message_tokens(messages)
+        cached_tokens = min(cached_tokens or 0, prompt_tokens)
+        standard_tokens = prompt_tokens - cached_tokens
+
+        metrics.increment("llm.prompt_tokens", prompt_tokens)
+        metrics.increment("llm.cached_tokens", cached_tokens)
         if completion_tokens is not None:
-            self.usage["completion"]["output_tokens"] += completion_tokens
-            output_cost = (completion_tokens / 1000) * self.PRICING["gpt-4o"]["output"]
-            self.usage["completion"]["cost"] += output_cost
+            metrics.increment("llm.completion_tokens", completion_tokens)
+
+        with self.lock:
+            if completion_tokens is not None:
+                self.usage["completion"]["output_tokens"] += completion_tokens
+                output_cost = (completion_tokens / 1000) * pricing["output"] * discount
+                self.usage["completion"]["cost"] += output_cost
+
+            self.usage["completion"]["input_tokens"] += standard_tokens
+            self.usage["completion"]["cached_input_tokens"] += cached_tokens
+            input_cost = discount * (
+                (standard_tokens / 1000) * pricing["input"]
+                + (cached_tokens / 1000) * pricing["cached_input"]
+            )
+            self.usage["completion"]["cost"] += input_cost
 
-        self.usage["completion"]["input_tokens"] += prompt_tokens
-        input_cost = (prompt_tokens / 1000) * self.PRICING["gpt-4o"]["input"]
-        self.usage["completion"]["cost"] += input_cost
+    def cache_hit_ratio(self) -> float:
+        """Share of completion input tokens served from the prompt cache"""
+        completion = self.usage["completion"]
+        total = completion["input_tokens"] + completion["cached_input_tokens"]
+        return completion["cached_input_tokens"] / total if total else 0.0
 
     def print_usage_report(self):
         """Print token usage and cost report"""
@@ -80,6 +237,7 @@ class TokenCounter:
         console.print(
             f"Cached Input tokens: {self.usage['completion']['cached_input_tokens']:,}"
         )
+        console.print(f"Prompt cache hit ratio: {self.cache_hit_ratio():.1%}")
         console.print(f"Output tokens: {self.usage['completion']['output_tokens']:,}")
         console.print(f"Cost: ${self.usage['completion']['cost']:.4f}")
 
@@ -0,0 +1,62 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence
+from haystack import Document
+import numpy as np
+
+
+@dataclass
+class SearchResult:
+    """Most and least similar documents for one query
+
+    Attributes:
+        similar: Top-k documents, most similar first
+        dissimilar: Bottom-k documents, in descending score order
+        all_documents: Documents the scores refer to: the whole corpus for exact
+            indexes, only the scored candidates for approximate ones
+        all_scores: Similarity score of every document in `all_documents`
+    """
+
+    similar: List[Document]
+    dissimilar: List[Document]
+    all_documents: Sequence[Document]
+    all_scores: np.ndarray
+
+
+class SimilarityIndex(ABC):
+    """Abstract base class for similarity search backends"""
+
+    # Whether searches may miss some of the exact top-k and bottom-k documents
+    approximate: bool = False
+
+    @abstractmethod
+    def add_documents(
+        self, documents: List[Document], embeddings: Optional[np.ndarray] = None
+    ) -> List[Document]:
+        """Add embedded documents to the index
+
+        Args:
+            documents: Documents to add
+            embeddings: Optional embedding matrix aligned with `documents`, used
+                instead of the documents' own embeddings
+        """
+        pass
+
+    def is_current(self) -> bool:
+        """Whether the index already holds the current corpus and needs no indexing"""
+        return False
+
+    @abstractmethod
+    def search(self, query_embedding: Sequence[float], top_k: int) -> SearchResult:
+        """Find the top-k most and least similar documents for a query embedding
+
+        Scores are cosine similarities scaled to [0, 1].
+        """
+        pass
+
+    def search_batch(
+        self, query_embeddings: Sequence[Sequence[float]], top_k: int
+    ) -> Iterator[SearchResult]:
+        """Search for many query embeddings, yielding one result per query in order"""
+        for query_embedding in query_embeddings:
+            yield self.search(query_embedding, top_k)
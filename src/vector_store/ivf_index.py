@@ -0,0 +1,174 @@
+import math
+from typing import Iterator, List, Optional, Sequence
+from haystack import Document
+import numpy as np
+from rich.console import Console
+
+from src.config.settings import settings
+from .base import SearchResult
+from .kmeans import assign_clusters, spherical_kmeans
+from .numpy_index import (
+    NumpySimilarityIndex,
+    normalize_rows,
+    scale_scores,
+    select_extremes,
+)
+
+console = Console()
+
+
+class CandidateDocuments(Sequence[Document]):
+    """Indexed documents of the candidate rows scored for one query"""
+
+    def __init__(self, documents: List[Document], rows: np.ndarray):
+        self.documents = documents
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.documents[row] for row in self.rows[i]]
+        return self.documents[self.rows[i]]
+
+
+class IVFSimilarityIndex(NumpySimilarityIndex):
+    """Approximate cosine similarity search over inverted lists
+
+    Embeddings are clustered with spherical k-means and stored grouped by
+    cluster, so a query only scores the `nprobe` lists whose centroids are most
+    similar to it, instead of the whole corpus. Bottom-k passages are searched
+    the same way in the lists least similar to the query. Recall grows with
+    `nprobe` and reaches exact search at `nprobe == nlist`.
+    """
+
+    approximate = True
+
+    def __init__(
+        self,
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        query_block_size: Optional[int] = None,
+    ):
+        """Initialize an empty index
+
+        Args:
+            nlist: Number of inverted lists (default: settings.vector_store.ivf_nlist,
+                or 4 * sqrt(corpus size) when that is unset)
+            nprobe: Lists scored per query for each of top-k and bottom-k
+                (default: settings.vector_store.ivf_nprobe)
+            query_block_size: Number of queries whose centroid scores are computed
+                per matrix multiply in `search_batch`
+                (default: settings.vector_store.query_block_size)
+        """
+        if nlist is None:
+            nlist = settings.vector_store.ivf_nlist
+        if nprobe is None:
+            nprobe = settings.vector_store.ivf_nprobe
+        super().__init__(query_block_size=query_block_size)
+        self.nlist = nlist
+        self.nprobe = max(1, nprobe)
+        self.centroids = np.empty((0, 0), dtype=np.float32)
+        # Embeddings grouped by list, in `list_matrix`: list i spans
+        # offsets[i]:offsets[i + 1], and list_rows maps positions to documents
+        self.list_rows = np.empty(0, dtype=np.intp)
+        self.list_matrix = np.empty((0, 0), dtype=np.float32)
+        self.offsets = np.zeros(1, dtype=np.intp)
+
+    def add_documents(
+        self, documents: List[Document], embeddings: Optional[np.ndarray] = None
+    ) -> List[Document]:
+        """Add embedded documents to the index and rebuild the inverted lists
+
+        Embeddings are only kept grouped by list, so the index holds a single
+        copy of them and doesn't reference the given (e.g. memory-mapped) matrix.
+        """
+        documents = super().add_documents(documents, embeddings=embeddings)
+        self._build()
+        return documents
+
+    def _build(self) -> None:
+        """Cluster the indexed embeddings and group them into inverted lists"""
+        # `matrix` only holds the embeddings added since the last build
+        added = len(self.matrix)
+        if self.list_matrix.size:
+            matrix = np.concatenate([self.list_matrix, self.matrix])
+        else:
+            matrix = self.matrix
+        rows = np.concatenate(
+            [
+                self.list_rows,
+                np.arange(len(self.list_rows), len(self.list_rows) + added),
+            ]
+        )
+
+        n = len(matrix)
+        nlist = self.nlist or round(4 * math.sqrt(n))
+        nlist = max(1, min(nlist, n))
+        console.log(f"Training {nlist} inverted lists over {n} documents")
+
+        self.centroids = spherical_kmeans(matrix, nlist)
+        labels = assign_clusters(matrix, self.centroids)
+
+        order = np.argsort(labels, kind="stable")
+        self.list_rows = rows[order]
+        self.list_matrix = np.ascontiguousarray(matrix[order])
+        self.offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(labels, minlength=nlist))]
+        )
+        self.matrix = np.empty((0, matrix.shape[1]), dtype=np.float32)
+
+    def _search_normalized(
+        self, query: np.ndarray, centroid_scores: np.ndarray, top_k: int
+    ) -> SearchResult:
+        """Search the probed lists for one unit-length query"""
+        probed = np.union1d(
+            select_extremes(centroid_scores, self.nprobe, largest=True),
+            select_extremes(centroid_scores, self.nprobe, largest=False),
+        )
+        # Contiguous list slices are scored without gathering rows first
+        positions = np.concatenate(
+            [np.arange(self.offsets[i], self.offsets[i + 1]) for i in probed]
+        )
+        scores = scale_scores(
+            np.concatenate(
+                [
+                    self.list_matrix[self.offsets[i] : self.offsets[i + 1]] @ query
+                    for i in probed
+                ]
+            )
+        )
+        rows = self.list_rows[positions]
+
+        similar = [
+            self._result_document(rows[i], float(scores[i]))
+            for i in select_extremes(scores, top_k, largest=True)
+        ]
+        dissimilar = [
+            self._result_document(rows[i], float(scores[i]))
+            for i in select_extremes(scores, top_k, largest=False)
+        ]
+
+        return SearchResult(
+            similar=similar,
+            dissimilar=dissimilar,
+            all_documents=CandidateDocuments(self.documents, rows),
+            all_scores=scores,
+        )
+
+    def search(self, query_embedding: Sequence[float], top_k: int) -> SearchResult:
+        """Find the approximate top-k most and least similar documents for a query"""
+        query = normalize_rows(np.asarray(query_embedding))
+        return self._search_normalized(query, self.centroids @ query, top_k)
+
+    def search_batch(
+        self, query_embeddings: Sequence[Sequence[float]], top_k: int
+    ) -> Iterator[SearchResult]:
+        """Search for many query embeddings, yielding one result per query in order"""
+        queries = normalize_rows(np.asarray(query_embeddings))
+
+        for start in range(0, len(queries), self.query_block_size):
+            block = queries[start : start + self.query_block_size]
+            for query, centroid_scores in zip(block, block @ self.centroids.T):
+                yield self._search_normalized(query, centroid_scores, top_k)
@@ -0,0 +1,116 @@
+from typing import Optional
+import numpy as np
+
+from .numpy_index import normalize_rows
+
+# Training points per centroid; more add cost without improving the lists much
+MAX_POINTS_PER_CENTROID = 64
+
+
+def assign_clusters(
+    data: np.ndarray,
+    centroids: np.ndarray,
+    block_size: int = 4096,
+    spherical: bool = True,
+) -> np.ndarray:
+    """Index of the nearest centroid for every row of a matrix
+
+    Args:
+        data: Rows to assign
+        centroids: Cluster centroids
+        block_size: Rows scored per matrix multiply
+        spherical: Whether rows and centroids are unit-length, so the nearest
+            centroid is the most similar one; otherwise the nearest by Euclidean
+            distance, ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2
+    """
+    bias = 0.0 if spherical else -0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(data), dtype=np.intp)
+    for start in range(0, len(data), block_size):
+        block = np.asarray(data[start : start + block_size], dtype=np.float32)
+        labels[start : start + block_size] = np.argmax(
+            block @ centroids.T + bias, axis=1
+        )
+    return labels
+
+
+def kmeans(
+    data: np.ndarray,
+    k: int,
+    iterations: int = 10,
+    seed: int = 42,
+    max_points_per_centroid: Optional[int] = MAX_POINTS_PER_CENTROID,
+    spherical: bool = False,
+) -> np.ndarray:
+    """Cluster the rows of a matrix with Lloyd's algorithm
+
+    Centroids are trained on a random sample of at most
+    `k * max_points_per_centroid` rows, so training cost does not grow with
+    the corpus.
+
+    Args:
+        data: Rows to cluster (may be memory-mapped)
+        k: Number of clusters
+        iterations: Lloyd iterations
+        seed: Random seed for sampling and initialization
+        max_points_per_centroid: Training sample size per cluster (None: all rows)
+        spherical: Cluster unit-length rows by cosine similarity, keeping the
+            centroids unit-length
+    """
+    rng = np.random.default_rng(seed)
+    n = len(data)
+    k = max(1, min(k, n))
+
+    if max_points_per_centroid is not None and n > k * max_points_per_centroid:
+        # Sorted indices read a memory-mapped matrix front to back
+        sample = np.sort(rng.choice(n, k * max_points_per_centroid, replace=False))
+        points = np.asarray(data[sample], dtype=np.float32)
+    else:
+        points = np.asarray(data, dtype=np.float32)
+
+    centroids = points[rng.choice(len(points), k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign_clusters(points, centroids, spherical=spherical)
+
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=k)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)])[filled]
+        centroids[filled] = np.add.reduceat(points[order], starts, axis=0)
+        if not spherical:
+            centroids[filled] /= counts[filled, None]
+
+        # Empty clusters restart from random points instead of staying empty
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = points[rng.choice(len(points), len(empty))]
+
+        if spherical:
+            centroids = normalize_rows(centroids)
+
+    return centroids
+
+
+def spherical_kmeans(
+    data: np.ndarray,
+    k: int,
+    iterations: int = 10,
+    seed: int = 42,
+    max_points_per_centroid: Optional[int] = MAX_POINTS_PER_CENTROID,
+) -> np.ndarray:
+    """Cluster unit-length rows by cosine similarity (k-means on the sphere)
+
+    Args:
+        data: Unit-length rows to cluster (may be memory-mapped)
+        k: Number of clusters
+        iterations: Lloyd iterations
+        seed: Random seed for sampling and initialization
+        max_points_per_centroid: Training sample size per cluster (None: all rows)
+    """
+    return kmeans(
+        data,
+        k,
+        iterations=iterations,
+        seed=seed,
+        max_points_per_centroid=max_points_per_centroid,
+        spherical=True,
+    )
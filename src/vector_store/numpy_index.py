@@ -0,0 +1,161 @@
+from typing import Iterator, List, Optional, Sequence
+from haystack import Document
+import numpy as np
+from rich.console import Console
+
+from src.config.settings import settings
+from .base import SearchResult, SimilarityIndex
+
+console = Console()
+
+# Rows whose norms are computed at a time when checking a matrix
+NORM_BLOCK_SIZE = 8192
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize the rows of a matrix as float32, leaving zero rows untouched"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def is_normalized(matrix: np.ndarray, tolerance: float = 1e-3) -> bool:
+    """Whether a matrix is float32 with unit-length rows
+
+    Norms are computed block by block, so checking a memory-mapped matrix
+    doesn't allocate a corpus-sized temporary.
+    """
+    if matrix.dtype != np.float32:
+        return False
+    matrix = matrix.reshape(-1, matrix.shape[-1])
+    for start in range(0, len(matrix), NORM_BLOCK_SIZE):
+        block = matrix[start : start + NORM_BLOCK_SIZE]
+        squared_norms = np.einsum("ij,ij->i", block, block)
+        # |norm - 1| <= tolerance, checked on the squared norms
+        if not np.all(
+            (squared_norms >= (1.0 - tolerance) ** 2)
+            & (squared_norms <= (1.0 + tolerance) ** 2)
+        ):
+            return False
+    return True
+
+
+def scale_scores(scores: np.ndarray) -> np.ndarray:
+    """Scale cosine similarities from [-1, 1] to [0, 1], as Qdrant does"""
+    return (scores + 1.0) / 2.0
+
+
+def select_extremes(scores: np.ndarray, k: int, largest: bool) -> np.ndarray:
+    """Indices of the k largest or smallest scores, sorted by descending score"""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    if largest:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.argpartition(scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class NumpySimilarityIndex(SimilarityIndex):
+    """Exact cosine similarity search over one contiguous float32 matrix
+
+    Embeddings are normalized once at indexing time, so a query costs a single
+    matrix-vector product; top-k and bottom-k are selected with `argpartition`
+    instead of sorting the whole corpus.
+    """
+
+    def __init__(self, query_block_size: Optional[int] = None):
+        """Initialize an empty index
+
+        Args:
+            query_block_size: Number of queries scored per matrix multiply in
+                `search_batch`, bounding the score block to block size x corpus size
+                (default: settings.vector_store.query_block_size)
+        """
+        if query_block_size is None:
+            query_block_size = settings.vector_store.query_block_size
+        self.documents: List[Document] = []
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self.query_block_size = max(1, query_block_size)
+
+    def add_documents(
+        self, documents: List[Document], embeddings: Optional[np.ndarray] = None
+    ) -> List[Document]:
+        """Add embedded documents to the index
+
+        A float32 `embeddings` matrix whose rows are already unit-length (as
+        OpenAI embeddings are) is used as-is, so a memory-mapped matrix is
+        indexed without being copied into memory.
+        """
+        console.log("📚 Adding documents to NumPy similarity index")
+        if embeddings is None:
+            missing = [doc for doc in documents if doc.embedding is None]
+            if missing:
+                raise ValueError(f"{len(missing)} documents have no embedding")
+            embeddings = np.stack([doc.embedding for doc in documents])
+        elif len(embeddings) != len(documents):
+            raise ValueError(
+                f"Got {len(embeddings)} embeddings for {len(documents)} documents"
+            )
+
+        if not is_normalized(embeddings):
+            embeddings = normalize_rows(embeddings)
+        if self.matrix.size:
+            embeddings = np.concatenate([self.matrix, embeddings])
+
+        self.matrix = embeddings
+        self.documents.extend(documents)
+        console.log(
+            f"[bold green]✅ Indexed {len(self.documents)} documents![/bold green]"
+        )
+        return documents
+
+    def _result_document(self, index: int, score: float) -> Document:
+        """Lightweight copy of an indexed document carrying its score"""
+        doc = self.documents[index]
+        # Meta is copied because the search step annotates it per query
+        return Document(
+            id=doc.id, content=doc.content, meta=dict(doc.meta), score=score
+        )
+
+    def _result(self, scores: np.ndarray, top_k: int) -> SearchResult:
+        """Select the top-k and bottom-k documents from one query's scores"""
+        similar = [
+            self._result_document(i, float(scores[i]))
+            for i in select_extremes(scores, top_k, largest=True)
+        ]
+        dissimilar = [
+            self._result_document(i, float(scores[i]))
+            for i in select_extremes(scores, top_k, largest=False)
+        ]
+
+        return SearchResult(
+            similar=similar,
+            dissimilar=dissimilar,
+            all_documents=self.documents,
+            all_scores=scores,
+        )
+
+    def search(self, query_embedding: Sequence[float], top_k: int) -> SearchResult:
+        """Find the top-k most and least similar documents for a query embedding"""
+        query = normalize_rows(np.asarray(query_embedding))
+        return self._result(scale_scores(self.matrix @ query), top_k)
+
+    def search_batch(
+        self, query_embeddings: Sequence[Sequence[float]], top_k: int
+    ) -> Iterator[SearchResult]:
+        """Search for many query embeddings, yielding one result per query in order
+
+        The query x corpus score matrix is computed one block of queries at a time,
+        so memory stays bounded while each block is a single matrix multiply.
+        """
+        queries = normalize_rows(np.asarray(query_embeddings))
+
+        for start in range(0, len(queries), self.query_block_size):
+            block = queries[start : start + self.query_block_size]
+            scores = scale_scores(block @ self.matrix.T)
+            for row in scores:
+                yield self._result(row, top_k)
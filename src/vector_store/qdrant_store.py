@@ -1,30 +1,151 @@
 from haystack_integrations.document_stores.qdrant import QdrantDocumentStore
 from haystack import Document
-from typing import List
+from haystack.document_stores.types import DuplicatePolicy
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import json
+import numpy as np
 from rich.console import Console
 from src.config.settings import settings
+from .base import SearchResult, SimilarityIndex
 
 console = Console()
 
 
-class QdrantManager:
-    def __init__(self, embedding_dim: int = settings.embeddings.dimension):
-        """Initialize QdrantManager"""
+class QdrantManager(SimilarityIndex):
+    def __init__(
+        self,
+        embedding_dim: Optional[int] = None,
+        path: Optional[Path] = None,
+        fingerprint: Optional[str] = None,
+        url: Optional[str] = None,
+        index: str = "Document",
+    ):
+        """Initialize QdrantManager
+
+        Args:
+            embedding_dim: Dimension of the stored embeddings
+                (default: settings.embeddings.dimension)
+            path: Directory for a persistent on-disk index (default: an in-memory
+                index that is rebuilt on every run)
+            fingerprint: Fingerprint of the corpus being indexed; a persistent index
+                built from a different fingerprint is recreated
+            url: Qdrant server to use instead of the local store; the server
+                searches an HNSW graph built with settings.vector_store.hnsw_m and
+                hnsw_ef_construct, whereas the local store always searches exactly
+            index: Collection name, which must differ between texts on one server
+        """
+        if embedding_dim is None:
+            embedding_dim = settings.embeddings.dimension
+        self.path = Path(path) if path is not None and url is None else None
+        self.approximate = url is not None
+        self.fingerprint = fingerprint
+
+        manifest = self._read_manifest()
+        reuse = (
+            self.path is not None
+            and fingerprint is not None
+            and manifest.get("fingerprint") == fingerprint
+            and manifest.get("embedding_dim") == embedding_dim
+        )
+
+        if url is not None:
+            location = {"url": url}
+        else:
+            location = {"path": str(self.path) if self.path is not None else ":memory:"}
+
         self.document_store = QdrantDocumentStore(
-            path=":memory:",
-            recreate_index=True,
+            **location,
+            index=index,
+            recreate_index=not reuse,
             return_embedding=True,
             wait_result_from_api=True,
             embedding_dim=embedding_dim,
+            hnsw_config={
+                "m": settings.vector_store.hnsw_m,
+                "ef_construct": settings.vector_store.hnsw_ef_construct,
+            },
         )
+        self.embedding_dim = embedding_dim
+        self.current = (
+            reuse and self.document_store.count_documents() == manifest["documents"]
+        )
+
+        if self.current:
+            console.log(
+                f"[bold green]✅ Reusing persisted index at {self.path} "
+                f"({manifest['documents']} documents)[/bold green]"
+            )
+
+    @property
+    def manifest_path(self) -> Optional[Path]:
+        return self.path / "index_manifest.json" if self.path is not None else None
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        if self.manifest_path is None or not self.manifest_path.exists():
+            return {}
+        return json.loads(self.manifest_path.read_text(encoding="utf-8"))
 
-    def add_documents(self, documents: List[Document]):
+    def is_current(self) -> bool:
+        """Whether a persisted index for the same corpus fingerprint was reopened"""
+        return self.current
+
+    def add_documents(
+        self, documents: List[Document], embeddings: Optional[np.ndarray] = None
+    ):
         """Add documents to the store"""
         console.log("📚 Adding documents to vector store")
-        self.document_store.write_documents(documents)
+        if embeddings is not None:
+            documents = [
+                replace(doc, embedding=np.asarray(embedding, dtype=np.float32).tolist())
+                for doc, embedding in zip(documents, embeddings)
+            ]
+        # A reopened index whose count didn't match its manifest (e.g. after an
+        # interrupted run) already holds some of the documents
+        self.document_store.write_documents(documents, policy=DuplicatePolicy.OVERWRITE)
+
+        if self.manifest_path is not None and self.fingerprint is not None:
+            manifest = {
+                "fingerprint": self.fingerprint,
+                "embedding_dim": self.embedding_dim,
+                "documents": self.document_store.count_documents(),
+            }
+            self.manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+            self.current = True
+
         console.log("[bold green]✅ Documents added successfully![/bold green]")
         return documents
 
-    def search(self, query: str, top_k: int = 5) -> List[Document]:
-        """Search for top k similar text chunks"""
-        return self.document_store.query(query, top_k=top_k)
+    def search(self, query_embedding: Sequence[float], top_k: int) -> SearchResult:
+        """Find the top-k most and least similar documents for a query embedding
+
+        Qdrant has no "least similar" query, but the documents least similar to
+        a query are the most similar to the negated query, so both sides are
+        top-k (HNSW) queries and never transfer the whole collection.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        similar_docs = self.document_store._query_by_embedding(
+            query_embedding=query.tolist(),
+            filters={},
+            top_k=top_k,
+            scale_score=True,
+        )
+        opposite_docs = self.document_store._query_by_embedding(
+            query_embedding=(-query).tolist(),
+            filters={},
+            top_k=top_k,
+            scale_score=True,
+        )
+        # Scaled cosine scores are (s + 1) / 2, so the negated query scores 1 - score
+        dissimilar_docs = [
+            replace(doc, score=1 - doc.score) for doc in reversed(opposite_docs)
+        ]
+
+        candidates = similar_docs + dissimilar_docs
+        return SearchResult(
+            similar=similar_docs,
+            dissimilar=dissimilar_docs,
+            all_documents=candidates,
+            all_scores=np.array([doc.score for doc in candidates]),
+        )
@@ -0,0 +1,135 @@
+from abc import ABC, abstractmethod
+import numpy as np
+
+from .kmeans import MAX_POINTS_PER_CENTROID, assign_clusters, kmeans
+
+# Rows converted to float32 at a time when encoding or scoring codes
+ROW_BLOCK_SIZE = 8192
+
+
+class Quantizer(ABC):
+    """Compact codes for unit-length embeddings, scored against float32 queries"""
+
+    @abstractmethod
+    def fit(self, data: np.ndarray) -> "Quantizer":
+        """Train the quantizer on unit-length rows"""
+        pass
+
+    @abstractmethod
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        """Codes of unit-length rows, one row of codes per embedding"""
+        pass
+
+    @abstractmethod
+    def scores(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """Approximate cosine similarities of a block of queries with every code
+
+        Args:
+            codes: Codes from `encode`
+            queries: Unit-length queries, one per row
+
+        Returns:
+            Query x code score matrix
+        """
+        pass
+
+
+class ScalarQuantizer(Quantizer):
+    """int8 codes with one symmetric scale per dimension (4x smaller than float32)"""
+
+    def __init__(self):
+        self.scale = np.ones(0, dtype=np.float32)
+
+    def fit(self, data: np.ndarray) -> "ScalarQuantizer":
+        max_abs = np.zeros(data.shape[1], dtype=np.float32)
+        for start in range(0, len(data), ROW_BLOCK_SIZE):
+            block = np.abs(np.asarray(data[start : start + ROW_BLOCK_SIZE]))
+            max_abs = np.maximum(max_abs, block.max(axis=0))
+        max_abs[max_abs == 0] = 1.0
+        self.scale = (max_abs / 127).astype(np.float32)
+        return self
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(data / self.scale), -127, 127).astype(np.int8)
+
+    def scores(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        # Folding the scale into the queries leaves one matrix multiply per block
+        scaled = (queries * self.scale).T
+        return np.concatenate(
+            [
+                codes[start : start + ROW_BLOCK_SIZE].astype(np.float32) @ scaled
+                for start in range(0, len(codes), ROW_BLOCK_SIZE)
+            ]
+        ).T
+
+
+class ProductQuantizer(Quantizer):
+    """One byte per subvector, each the nearest of 256 trained centroids
+
+    With 1536 dimensions and 96 subvectors an embedding takes 96 bytes, 64x
+    less than float32. A query is scored by summing, per subvector, its dot
+    product with the code's centroid, looked up from a per-query table.
+    """
+
+    def __init__(self, subvectors: int):
+        """Initialize an untrained quantizer
+
+        Args:
+            subvectors: Number of subvectors, which must divide the dimension
+        """
+        self.subvectors = subvectors
+        self.codebooks = np.empty((0, 0, 0), dtype=np.float32)
+
+    def _split(self, data: np.ndarray) -> np.ndarray:
+        """View rows as (rows, subvectors, subvector dimension)"""
+        return np.asarray(data, dtype=np.float32).reshape(
+            len(data), self.subvectors, -1
+        )
+
+    def fit(self, data: np.ndarray) -> "ProductQuantizer":
+        if data.shape[1] % self.subvectors:
+            raise ValueError(
+                f"{self.subvectors} subvectors do not divide dimension {data.shape[1]}"
+            )
+        centroids = min(256, len(data))
+        sample_size = min(len(data), centroids * MAX_POINTS_PER_CENTROID)
+        sample = np.sort(
+            np.random.default_rng(42).choice(len(data), sample_size, replace=False)
+        )
+        points = self._split(data[sample])
+
+        self.codebooks = np.stack(
+            [
+                kmeans(points[:, j], centroids, max_points_per_centroid=None)
+                for j in range(self.subvectors)
+            ]
+        )
+        return self
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        points = self._split(data)
+        return np.stack(
+            [
+                assign_clusters(points[:, j], self.codebooks[j], spherical=False)
+                for j in range(self.subvectors)
+            ],
+            axis=1,
+        ).astype(np.uint8)
+
+    def scores(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        # (subvectors, centroids, queries) dot products of query parts and
+        # centroids, laid out so each code gathers one contiguous row of scores
+        tables = np.einsum("qjd,jkd->jkq", self._split(queries), self.codebooks)
+        scores = np.zeros((len(codes), len(queries)), dtype=np.float32)
+        for j in range(self.subvectors):
+            scores += tables[j][codes[:, j]]
+        return scores.T
+
+
+def create_quantizer(kind: str, subvectors: int) -> Quantizer:
+    """Quantizer for settings.embeddings.quantization ("int8" or "pq")"""
+    if kind == "int8":
+        return ScalarQuantizer()
+    if kind == "pq":
+        return ProductQuantizer(subvectors)
+    raise ValueError(f"Unknown quantization: {kind}")
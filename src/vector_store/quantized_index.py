@@ -0,0 +1,178 @@
+from dataclasses import replace
+from typing import Iterator, List, Optional, Sequence
+from haystack import Document
+import numpy as np
+from rich.console import Console
+
+from src.config.settings import settings
+from .base import SearchResult
+from .numpy_index import (
+    NumpySimilarityIndex,
+    normalize_rows,
+    scale_scores,
+    select_extremes,
+)
+from .quantization import ROW_BLOCK_SIZE, Quantizer, create_quantizer
+
+console = Console()
+
+# Rows sampled to train the quantizer
+TRAINING_SAMPLE_SIZE = 65536
+
+
+class QuantizedSimilarityIndex(NumpySimilarityIndex):
+    """Cosine similarity search over quantized embeddings with exact rescoring
+
+    Only the compact codes are held in memory and scanned for every query. The
+    best and worst `rescore_candidates` of that scan are then rescored exactly in
+    float32 from the original embeddings, which stay wherever they were loaded
+    from (e.g. a memory-mapped "npy" matrix) and are only read for candidates.
+    Each `add_documents` call keeps its embeddings as a separate segment, so
+    adding documents never copies earlier (possibly memory-mapped) segments.
+    """
+
+    approximate = True
+
+    def __init__(
+        self,
+        quantizer: Optional[Quantizer] = None,
+        rescore_candidates: Optional[int] = None,
+        query_block_size: Optional[int] = None,
+    ):
+        """Initialize an empty index
+
+        Args:
+            quantizer: Quantizer of the embeddings (default: the one configured
+                by settings.embeddings.quantization)
+            rescore_candidates: Candidates rescored exactly for each of top-k and
+                bottom-k (default: settings.embeddings.rescore_candidates)
+            query_block_size: Number of queries scanned per block in `search_batch`
+                (default: settings.vector_store.query_block_size)
+        """
+        super().__init__(query_block_size=query_block_size)
+        self.quantizer = quantizer or create_quantizer(
+            settings.embeddings.quantization, settings.embeddings.pq_subvectors
+        )
+        if rescore_candidates is None:
+            rescore_candidates = settings.embeddings.rescore_candidates
+        self.rescore_candidates = rescore_candidates
+        self.codes: Optional[np.ndarray] = None
+        # Embeddings used for rescoring, one segment per add_documents call;
+        # segment i holds rows segment_offsets[i]:segment_offsets[i + 1]
+        self.segments: List[np.ndarray] = []
+        self.segment_offsets = [0]
+
+    def add_documents(
+        self, documents: List[Document], embeddings: Optional[np.ndarray] = None
+    ) -> List[Document]:
+        """Add embedded documents to the index, quantizing their embeddings
+
+        The embeddings matrix is kept as-is, without normalizing or copying it.
+        Embeddings given on the documents are gathered into a float32 matrix, and
+        the index keeps copies of the documents without them, so the matrix is
+        their only copy held by the index.
+        """
+        console.log("📚 Adding documents to quantized similarity index")
+        if embeddings is None:
+            missing = [doc for doc in documents if doc.embedding is None]
+            if missing:
+                raise ValueError(f"{len(missing)} documents have no embedding")
+            embeddings = np.array(
+                [doc.embedding for doc in documents], dtype=np.float32
+            )
+        elif len(embeddings) != len(documents):
+            raise ValueError(
+                f"Got {len(embeddings)} embeddings for {len(documents)} documents"
+            )
+
+        if self.codes is None:
+            rng = np.random.default_rng(42)
+            sample_size = min(len(embeddings), TRAINING_SAMPLE_SIZE)
+            sample = np.sort(rng.choice(len(embeddings), sample_size, replace=False))
+            self.quantizer.fit(normalize_rows(embeddings[sample]))
+
+        codes = np.concatenate(
+            [
+                self.quantizer.encode(
+                    normalize_rows(embeddings[start : start + ROW_BLOCK_SIZE])
+                )
+                for start in range(0, len(embeddings), ROW_BLOCK_SIZE)
+            ]
+        )
+        if self.codes is not None:
+            codes = np.concatenate([self.codes, codes])
+
+        self.codes = codes
+        self.segments.append(embeddings)
+        self.segment_offsets.append(self.segment_offsets[-1] + len(embeddings))
+        self.documents.extend(replace(doc, embedding=None) for doc in documents)
+        console.log(
+            f"[bold green]✅ Indexed {len(self.documents)} documents "
+            f"({self.codes.nbytes / 2**20:.1f} MiB of codes, "
+            f"{self.codes[0].nbytes} bytes each)![/bold green]"
+        )
+        return documents
+
+    def _embeddings(self, rows: np.ndarray) -> np.ndarray:
+        """Read the embeddings of sorted rows from the segments holding them"""
+        bounds = np.searchsorted(rows, self.segment_offsets)
+        # Sorted rows read a memory-mapped segment front to back
+        return np.concatenate(
+            [
+                segment[rows[start:end] - offset]
+                for segment, offset, start, end in zip(
+                    self.segments, self.segment_offsets, bounds, bounds[1:]
+                )
+            ]
+        )
+
+    def _rescore(
+        self, query: np.ndarray, approximate: np.ndarray, top_k: int
+    ) -> SearchResult:
+        """Rescore the best and worst candidates of one query's approximate scores"""
+        candidates = max(top_k, self.rescore_candidates)
+        rows = np.union1d(
+            select_extremes(approximate, candidates, largest=True),
+            select_extremes(approximate, candidates, largest=False),
+        )
+        exact = scale_scores(normalize_rows(self._embeddings(rows)) @ query)
+
+        # Every score is approximate except the exactly rescored candidates
+        scores = scale_scores(approximate)
+        scores[rows] = exact
+
+        similar = [
+            self._result_document(rows[i], float(exact[i]))
+            for i in select_extremes(exact, top_k, largest=True)
+        ]
+        dissimilar = [
+            self._result_document(rows[i], float(exact[i]))
+            for i in select_extremes(exact, top_k, largest=False)
+        ]
+
+        return SearchResult(
+            similar=similar,
+            dissimilar=dissimilar,
+            all_documents=self.documents,
+            all_scores=scores,
+        )
+
+    def search(self, query_embedding: Sequence[float], top_k: int) -> SearchResult:
+        """Find the top-k most and least similar documents for a query embedding"""
+        return next(self.search_batch([query_embedding], top_k))
+
+    def search_batch(
+        self, query_embeddings: Sequence[Sequence[float]], top_k: int
+    ) -> Iterator[SearchResult]:
+        """Search for many query embeddings, yielding one result per query in order
+
+        Codes are scanned for one block of queries at a time.
+        """
+        queries = normalize_rows(np.asarray(query_embeddings))
+
+        for start in range(0, len(queries), self.query_block_size):
+            block = queries[start : start + self.query_block_size]
+            for query, approximate in zip(
+                block, self.quantizer.scores(self.codes, block)
+            ):
+                yield self._rescore(query, approximate, top_k)
@@ -0,0 +1,79 @@
+import time
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+from .base import SearchResult, SimilarityIndex
+
+
+@dataclass
+class RecallReport:
+    """Agreement of an approximate index with exact search
+
+    Attributes:
+        queries: Number of queries compared
+        top_k: Number of similar and dissimilar documents per query
+        similar_recall: Fraction of the exact top-k found by the index
+        dissimilar_recall: Fraction of the exact bottom-k found by the index
+        latency_ms: Mean search time per query of the index
+        exact_latency_ms: Mean search time per query of exact search
+    """
+
+    queries: int
+    top_k: int
+    similar_recall: float
+    dissimilar_recall: float
+    latency_ms: float
+    exact_latency_ms: float
+
+
+def _timed_search(
+    index: SimilarityIndex, query_embeddings: Sequence[Sequence[float]], top_k: int
+) -> Tuple[List[SearchResult], float]:
+    """Search results of every query and the mean time per query in milliseconds"""
+    start = time.perf_counter()
+    results = list(index.search_batch(query_embeddings, top_k=top_k))
+    elapsed = time.perf_counter() - start
+    return results, elapsed * 1000 / max(1, len(results))
+
+
+def _overlap(found: SearchResult, expected: SearchResult, similar: bool) -> float:
+    found_docs = found.similar if similar else found.dissimilar
+    expected_docs = expected.similar if similar else expected.dissimilar
+    if not expected_docs:
+        return 1.0
+    found_ids = {doc.id for doc in found_docs}
+    return sum(doc.id in found_ids for doc in expected_docs) / len(expected_docs)
+
+
+def recall_at_k(
+    index: SimilarityIndex,
+    exact: SimilarityIndex,
+    query_embeddings: Sequence[Sequence[float]],
+    top_k: int,
+) -> RecallReport:
+    """Measure recall@k of an index against exact search over the same documents
+
+    Args:
+        index: Approximate index to check
+        exact: Exact index holding the same documents
+        query_embeddings: Sample of query embeddings
+        top_k: Number of similar and dissimilar documents per query
+    """
+    found, latency_ms = _timed_search(index, query_embeddings, top_k)
+    expected, exact_latency_ms = _timed_search(exact, query_embeddings, top_k)
+
+    queries = max(1, len(expected))
+    return RecallReport(
+        queries=len(expected),
+        top_k=top_k,
+        similar_recall=sum(
+            _overlap(f, e, similar=True) for f, e in zip(found, expected)
+        )
+        / queries,
+        dissimilar_recall=sum(
+            _overlap(f, e, similar=False) for f, e in zip(found, expected)
+        )
+        / queries,
+        latency_ms=latency_ms,
+        exact_latency_ms=exact_latency_ms,
+    )
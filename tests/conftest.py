@@ -0,0 +1,28 @@
+import os
+
+import pytest
+import tiktoken
+
+# Settings require an API key at import time; tests never call the API
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+
+class WhitespaceEncoding:
+    """Stand-in for a tiktoken encoding, with one token per whitespace-separated word"""
+
+    name = "whitespace"
+
+    def encode(self, text, **kwargs):
+        return text.split()
+
+    def encode_batch(self, texts, num_threads=8, **kwargs):
+        return [text.split() for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def offline_encoding(monkeypatch):
+    """Keep tiktoken from downloading its BPE files, so tests run offline"""
+    monkeypatch.setattr(
+        tiktoken, "encoding_for_model", lambda model: WhitespaceEncoding()
+    )
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: WhitespaceEncoding())
@@ -0,0 +1,51 @@
+from src.config.settings import settings
+from src.models.schemas import Analysis, Evaluation
+from src.utils.analysis_cache import AnalysisCache
+
+MESSAGES = [{"role": "user", "content": "Compare the two passages."}]
+
+
+def analysis(observations):
+    return Analysis(
+        initial_observations=observations,
+        thinking_steps=[],
+        connections=[],
+        evaluation=Evaluation(
+            intentionality="unclear",
+            significance="minor",
+            interpretation="a shared motif",
+            uncertainties="many",
+            conclusion="no reference",
+            is_reference=False,
+        ),
+    )
+
+
+def test_key_follows_settings_changed_at_runtime(monkeypatch):
+    key = AnalysisCache.key(MESSAGES)
+
+    monkeypatch.setattr(settings.llm, "model", "gpt-4o-mini")
+    assert AnalysisCache.key(MESSAGES) != key
+    assert AnalysisCache.key(MESSAGES) == AnalysisCache.key(
+        MESSAGES, model="gpt-4o-mini"
+    )
+
+    monkeypatch.setattr(settings.llm, "temperature", settings.llm.temperature + 0.5)
+    assert AnalysisCache.key(MESSAGES, model="gpt-4o-mini") != AnalysisCache.key(
+        MESSAGES, model="gpt-4o-mini", temperature=settings.llm.temperature - 0.5
+    )
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.llm, "cache_max_entries", 2)
+    cache = AnalysisCache(cache_dir=tmp_path)
+    assert cache.max_entries == 2
+
+    cache.put("a", analysis("a"))
+    cache.put("b", analysis("b"))
+    assert cache.get("a") == analysis("a")
+    cache.put("c", analysis("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") == analysis("a")
+    assert cache.get("c") == analysis("c")
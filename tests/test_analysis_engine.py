@@ -0,0 +1,54 @@
+import threading
+import time
+
+import pytest
+from haystack import Document
+
+from src.pipeline.analysis_engine import ConcurrentAnalysisEngine
+
+
+class SlowFirstStep:
+    """Analysis step whose earlier tasks take longer, so they finish last"""
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.finished = []
+        self.lock = threading.Lock()
+
+    def execute(self, data):
+        i = int(data["document"].id)
+        time.sleep(0.01 * (self.tasks - i))
+        with self.lock:
+            self.finished.append(i)
+        return f"{data['query_text']}:{i}"
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+def test_results_keep_input_order(max_concurrency):
+    tasks = 12
+    step = SlowFirstStep(tasks)
+    engine = ConcurrentAnalysisEngine(step, max_concurrency=max_concurrency)
+
+    results = list(
+        engine.analyze(("query", Document(id=str(i), content="")) for i in range(tasks))
+    )
+
+    assert results == [f"query:{i}" for i in range(tasks)]
+    if max_concurrency > 1:
+        # Analyses really completed out of order
+        assert step.finished != sorted(step.finished)
+
+
+def test_errors_are_raised_in_input_order():
+    class FailingStep:
+        def execute(self, data):
+            if data["document"].id == "1":
+                raise RuntimeError("analysis failed")
+            return data["document"].id
+
+    engine = ConcurrentAnalysisEngine(FailingStep(), max_concurrency=4)
+    results = engine.analyze(("q", Document(id=str(i), content="")) for i in range(4))
+
+    assert next(results) == "0"
+    with pytest.raises(RuntimeError, match="analysis failed"):
+        next(results)
@@ -0,0 +1,231 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from haystack import Document
+
+from src.config.settings import settings
+from src.models.schemas import Analysis, Evaluation
+from src.pipeline.batch_analysis import BatchAnalysisRunner
+from src.utils.token_counter import TokenCounter
+
+ANALYSIS = Analysis(
+    initial_observations="Both passages describe a journey.",
+    thinking_steps=[],
+    connections=[],
+    evaluation=Evaluation(
+        intentionality="unclear",
+        significance="minor",
+        interpretation="a shared motif",
+        uncertainties="many",
+        conclusion="no reference",
+        is_reference=False,
+    ),
+)
+
+
+class FakeFiles:
+    def __init__(self):
+        self.contents = {}
+
+    def create(self, file, purpose):
+        file_id = f"file-{len(self.contents)}"
+        self.contents[file_id] = file.read().decode("utf-8")
+        return SimpleNamespace(id=file_id)
+
+    def content(self, file_id):
+        return SimpleNamespace(text=self.contents[file_id])
+
+
+class FakeBatches:
+    """Batches that complete on their second status check
+
+    Requests whose query text contains "fail" end up in the error file.
+    """
+
+    def __init__(self, files):
+        self.files = files
+        self.batches = {}
+        self.retrievals = {}
+
+    def create(self, input_file_id, endpoint, completion_window):
+        batch_id = f"batch-{len(self.batches)}"
+        self.batches[batch_id] = input_file_id
+        self.retrievals[batch_id] = 0
+        return SimpleNamespace(id=batch_id, status="validating")
+
+    def retrieve(self, batch_id):
+        self.retrievals[batch_id] += 1
+        if self.retrievals[batch_id] < 2:
+            return SimpleNamespace(
+                id=batch_id, status="in_progress", request_counts=None
+            )
+
+        outputs, errors = [], []
+        for line in self.files.contents[self.batches[batch_id]].splitlines():
+            request = json.loads(line)
+            if "fail" in request["body"]["messages"][0]["content"]:
+                errors.append(
+                    {
+                        "custom_id": request["custom_id"],
+                        "response": None,
+                        "error": {"code": "invalid_request", "message": "too long"},
+                    }
+                )
+                continue
+            body = {
+                "model": "gpt-4o-2024-08-06",
+                "choices": [{"message": {"content": ANALYSIS.model_dump_json()}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5},
+            }
+            outputs.append(
+                {
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "body": body},
+                }
+            )
+
+        def upload(results):
+            if not results:
+                return None
+            file_id = f"file-{len(self.files.contents)}"
+            self.files.contents[file_id] = "\n".join(map(json.dumps, results))
+            return file_id
+
+        return SimpleNamespace(
+            id=batch_id,
+            status="completed",
+            request_counts=None,
+            output_file_id=upload(outputs),
+            error_file_id=upload(errors),
+            errors=None,
+        )
+
+
+class FakeClient:
+    def __init__(self):
+        self.files = FakeFiles()
+        self.batches = FakeBatches(self.files)
+
+
+class FakeAnalysisStep:
+    def __init__(self):
+        self.stored = []
+
+    def build_messages(self, query_text, doc):
+        return [
+            {"role": "user", "content": query_text},
+            {"role": "user", "content": doc.content},
+        ]
+
+    def build_request_body(self, messages):
+        return {"model": "gpt-4o", "messages": messages}
+
+    def get_cached(self, messages):
+        return None
+
+    def store_cached(self, messages, analysis):
+        self.stored.append(messages)
+
+
+class FakeTokenCounter:
+    def __init__(self):
+        self.completions = []
+
+    def track_completion(self, **usage):
+        self.completions.append(usage)
+
+
+def make_runner(tmp_path, client, **kwargs):
+    return BatchAnalysisRunner(
+        client=client,
+        analysis_step=FakeAnalysisStep(),
+        token_counter=FakeTokenCounter(),
+        batch_dir=tmp_path,
+        poll_interval=0,
+        **kwargs,
+    )
+
+
+def make_tasks(queries):
+    return [
+        (query, Document(content=f"passage {i}")) for i, query in enumerate(queries)
+    ]
+
+
+def test_run_shards_requests_and_keeps_task_order(tmp_path):
+    client = FakeClient()
+    runner = make_runner(tmp_path, client, max_requests=2)
+
+    results = runner.run(make_tasks(["a", "b", "fail c", "d", "e"]))
+
+    assert len(client.batches.batches) == 3
+    assert [result is not None for result in results] == [True, True, False, True, True]
+    assert results[0] == ANALYSIS
+    assert len(runner.analysis_step.stored) == 4
+    assert len(runner.token_counter.completions) == 4
+    assert len(list(tmp_path.glob("batch_errors_*.jsonl"))) == 1
+
+
+def test_request_files_respect_size_limit(tmp_path):
+    runner = make_runner(tmp_path, FakeClient(), max_file_bytes=400)
+
+    paths, messages_by_id = runner.write_requests(
+        make_tasks(["a" * 100, "b" * 100, "c" * 100]), tmp_path / "requests.jsonl"
+    )
+
+    assert len(paths) == 3
+    assert all(path.stat().st_size <= 400 for path in paths)
+    assert list(messages_by_id) == ["task-0", "task-1", "task-2"]
+
+
+def test_oversized_request_fails(tmp_path):
+    runner = make_runner(tmp_path, FakeClient(), max_file_bytes=50)
+
+    with pytest.raises(ValueError, match="exceeds"):
+        runner.write_requests(make_tasks(["a"]), tmp_path / "requests.jsonl")
+
+
+def test_submit_resumes_saved_batch(tmp_path):
+    client = FakeClient()
+    paths, messages_by_id = make_runner(tmp_path, client).write_requests(
+        make_tasks(["a", "b"]), tmp_path / "requests.jsonl"
+    )
+
+    batch_id = make_runner(tmp_path, client).submit(paths[0])
+    # A new runner, e.g. of a re-run after an interrupted poll, finds the batch
+    assert make_runner(tmp_path, client).submit(paths[0]) == batch_id
+    assert len(client.batches.batches) == 1
+
+    runner = make_runner(tmp_path, client)
+    runner.collect(runner.wait(batch_id), messages_by_id, "test")
+    # Once its results are downloaded, the same requests form a new batch
+    assert runner.submit(paths[0]) != batch_id
+
+
+def test_reported_cost_has_the_batch_discount(tmp_path):
+    runner = make_runner(tmp_path, FakeClient())
+    runner.token_counter = TokenCounter()
+
+    runner.run(make_tasks(["a", "b"]))
+
+    # Two requests of 10 prompt and 5 completion tokens each
+    pricing = TokenCounter.PRICING["gpt-4o"]
+    interactive = 2 * (10 * pricing["input"] + 5 * pricing["output"]) / 1000
+    assert runner.token_counter.usage["completion"]["cost"] == pytest.approx(
+        interactive * TokenCounter.BATCH_DISCOUNT
+    )
+
+
+def test_limits_default_to_settings_changed_at_runtime(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.llm, "batch_max_requests", 7)
+    monkeypatch.setattr(settings.llm, "batch_max_file_bytes", 1000)
+
+    runner = BatchAnalysisRunner(
+        client=FakeClient(),
+        analysis_step=FakeAnalysisStep(),
+        token_counter=FakeTokenCounter(),
+        batch_dir=tmp_path,
+    )
+
+    assert (runner.max_requests, runner.max_file_bytes) == (7, 1000)
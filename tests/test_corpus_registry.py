@@ -0,0 +1,23 @@
+import pytest
+
+from src.config.settings import TextPaths, settings
+from src.data_preparation.corpus_registry import CorpusRegistry
+
+
+def test_texts_default_to_settings_changed_at_runtime(monkeypatch):
+    texts = {
+        "woolf": TextPaths(raw_path="woolf.txt", role="source", title="Mrs Dalloway"),
+        "homer": TextPaths(raw_path="homer.txt"),
+    }
+    monkeypatch.setattr(settings, "texts", texts)
+
+    registry = CorpusRegistry()
+    assert registry.sources() == ["woolf"]
+    assert registry.targets() == ["homer"]
+    assert registry.title("woolf") == "Mrs Dalloway"
+    assert registry.title("homer") == "homer"
+
+
+def test_a_source_and_a_target_are_required():
+    with pytest.raises(ValueError, match="at least one source and one target"):
+        CorpusRegistry({"homer": TextPaths(raw_path="homer.txt")})
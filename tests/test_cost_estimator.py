@@ -0,0 +1,48 @@
+import pytest
+
+from src.config.settings import settings
+from src.utils.cost_estimator import CostEstimator
+from src.utils.token_counter import TokenCounter
+
+MESSAGES = [
+    [
+        {"role": "system", "content": "You are a literary critic."},
+        {"role": "user", "content": f"Compare passage {i} with its echo."},
+    ]
+    for i in range(3)
+]
+
+
+@pytest.fixture
+def estimator():
+    return CostEstimator(TokenCounter())
+
+
+def test_batch_halves_input_and_output_cost(estimator):
+    interactive = estimator.estimate(MESSAGES)
+    batch = estimator.estimate(MESSAGES, batch=True)
+
+    assert batch.input_tokens == interactive.input_tokens
+    assert batch.input_cost == pytest.approx(interactive.input_cost / 2)
+    assert batch.output_cost == pytest.approx(interactive.output_cost / 2)
+    assert batch.wall_clock_seconds is None
+
+
+def test_prices_follow_configured_model(estimator, monkeypatch):
+    monkeypatch.setattr(settings.llm, "model", "gpt-4o-mini")
+    estimate = estimator.estimate(MESSAGES)
+
+    pricing = TokenCounter.PRICING["gpt-4o-mini"]
+    assert estimate.input_cost == pytest.approx(
+        estimate.input_tokens / 1000 * pricing["input"]
+    )
+
+
+def test_dated_snapshot_priced_as_base_model():
+    assert TokenCounter.pricing("gpt-4o-2024-08-06") == TokenCounter.PRICING["gpt-4o"]
+
+
+def test_unknown_model_fails(estimator, monkeypatch):
+    monkeypatch.setattr(settings.llm, "model", "gpt-unknown")
+    with pytest.raises(ValueError, match="gpt-unknown"):
+        estimator.estimate(MESSAGES)
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+from haystack import Document
+
+from src.config.settings import settings
+from src.data_preparation.data_manager import DataManager
+from src.data_preparation.preprocessed_data_store import PreprocessedDataStore
+from src.data_preparation.preprocessing_cache import PreprocessingCache
+
+NATIVE = 8
+
+
+def unit(dimension, seed):
+    vector = np.random.default_rng(seed).normal(size=dimension).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def manager(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.embeddings, "api_model", "text-embedding-3-small")
+    monkeypatch.setattr(settings.embeddings, "native_dimension", NATIVE)
+
+    manager = DataManager.__new__(DataManager)
+    manager.data_store = PreprocessedDataStore(storage_type="jsonl")
+    manager.preprocessing_cache = PreprocessingCache(tmp_path / "manifest.json")
+    return manager
+
+
+def save(manager, path, content, embedding):
+    manager.data_store.save_chunks(
+        [Document(content=content, embedding=embedding)], str(path)
+    )
+
+
+def record(manager, path, dimension, model="text-embedding-3-small"):
+    manager.preprocessing_cache.entries[str(path)] = {
+        "text": "odyssey",
+        "path": str(path),
+        "embedding_model": model,
+        "embedding_dimension": dimension,
+        "created": str(path),
+    }
+
+
+def test_reduced_dimension_truncates_same_model_entries(manager, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.embeddings, "dimension", 4)
+    entry = tmp_path / "odyssey-full.jsonl"
+    save(manager, entry, "recorded", unit(NATIVE, 0))
+    record(manager, entry, NATIVE)
+    # Chunks at the unversioned path have no manifest entry, so no known model
+    legacy = tmp_path / "odyssey.jsonl"
+    save(manager, legacy, "legacy", unit(NATIVE, 1))
+
+    previous = manager._previous_embeddings("odyssey", "current", str(legacy))
+
+    assert set(previous) == {"recorded"}
+    assert len(previous["recorded"]) == 4
+    assert np.isclose(np.linalg.norm(previous["recorded"]), 1)
+
+
+def test_legacy_chunks_are_reused_at_the_exact_dimension(
+    manager, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(settings.embeddings, "dimension", 4)
+    legacy = tmp_path / "odyssey.jsonl"
+    save(manager, legacy, "legacy", unit(4, 1))
+
+    previous = manager._previous_embeddings("odyssey", "current", str(legacy))
+
+    np.testing.assert_allclose(previous["legacy"], unit(4, 1))
+
+
+def test_full_dimension_never_truncates(manager, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.embeddings, "dimension", NATIVE)
+    entry = tmp_path / "odyssey-larger.jsonl"
+    save(manager, entry, "recorded", unit(2 * NATIVE, 0))
+    record(manager, entry, 2 * NATIVE)
+
+    previous = manager._previous_embeddings(
+        "odyssey", "current", str(tmp_path / "odyssey.jsonl")
+    )
+
+    assert previous == {}
+
+
+def test_npy_store_reuses_legacy_jsonl_chunks(manager, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.embeddings, "dimension", NATIVE)
+    legacy = tmp_path / "odyssey_processed.jsonl"
+    # Saved as JSONL by a version without the npy store
+    save(manager, legacy, "legacy", unit(NATIVE, 1))
+    manager.data_store = PreprocessedDataStore(storage_type="npy")
+    assert not manager.data_store.exists(str(legacy))
+
+    previous = manager._previous_embeddings("odyssey", "current", str(legacy))
+
+    np.testing.assert_allclose(previous["legacy"], unit(NATIVE, 1))
+
+
+def test_npy_store_truncates_npy_entries(manager, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.embeddings, "dimension", 4)
+    manager.data_store = PreprocessedDataStore(storage_type="npy")
+    entry = tmp_path / "odyssey-full.jsonl"
+    save(manager, entry, "recorded", unit(NATIVE, 0))
+    record(manager, entry, NATIVE)
+
+    previous = manager._previous_embeddings(
+        "odyssey", "current", str(tmp_path / "odyssey.jsonl")
+    )
+
+    expected = unit(NATIVE, 0)[:4] / np.linalg.norm(unit(NATIVE, 0)[:4])
+    np.testing.assert_allclose(previous["recorded"], expected, rtol=1e-6)
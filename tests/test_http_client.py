@@ -0,0 +1,42 @@
+import pytest
+
+from src.config.settings import settings
+from src.embeddings.openai_embedder import OpenAIEmbedder
+from src.utils import http_client
+
+
+@pytest.fixture(autouse=True)
+def fresh_client(monkeypatch):
+    """Start every test without a shared client"""
+    monkeypatch.setattr(http_client, "_openai_client", None)
+    monkeypatch.setattr(settings.http, "http2", False)
+
+
+def test_shared_client_is_reused_by_the_embedders(monkeypatch):
+    monkeypatch.setattr(settings.embeddings, "cache_enabled", False)
+    client = http_client.get_openai_client()
+    embedder = OpenAIEmbedder(cache=None)
+
+    assert http_client.get_openai_client() is client
+    assert embedder.document_embedder.client is client
+    assert embedder.text_embedder.client is client
+
+
+def test_pool_limits_and_timeouts_come_from_settings(monkeypatch):
+    monkeypatch.setattr(settings.http, "max_connections", 7)
+    monkeypatch.setattr(settings.http, "max_keepalive_connections", 3)
+    monkeypatch.setattr(settings.http, "keepalive_expiry", 12.5)
+    monkeypatch.setattr(settings.http, "timeout", 45.0)
+    monkeypatch.setattr(settings.http, "connect_timeout", 4.0)
+    monkeypatch.setattr(settings.http, "max_retries", 5)
+
+    client = http_client.get_openai_client()
+
+    # The pool of the httpx client wrapped by the OpenAI client
+    pool = client._client._transport._pool
+    assert pool._max_connections == 7
+    assert pool._max_keepalive_connections == 3
+    assert pool._keepalive_expiry == 12.5
+    assert client._client.timeout.read == 45.0
+    assert client._client.timeout.connect == 4.0
+    assert client.max_retries == 5
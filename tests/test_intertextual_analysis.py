@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+from haystack import Document
+
+from src.config.settings import settings
+from src.pipeline.steps.intertextual_analysis import IntertextualAnalysisStep
+from src.utils.token_counter import TokenCounter
+
+
+class FakePromptGenerator:
+    def generate(self, template_name, **variables):
+        return f"Compare {variables['dalloway_text']} with {variables['odyssey_text']}"
+
+
+class FakeCompletions:
+    def parse(self, **request):
+        return SimpleNamespace(
+            model=request["model"],
+            usage=SimpleNamespace(
+                prompt_tokens=10, completion_tokens=5, prompt_tokens_details=None
+            ),
+            choices=[SimpleNamespace(message=SimpleNamespace(parsed="analysis"))],
+        )
+
+
+class RecordingRateLimiter:
+    def __init__(self):
+        self.acquired = []
+
+    def acquire(self, tokens=0):
+        self.acquired.append(tokens)
+
+
+def test_rate_limiter_reserves_prompt_tokens_and_expected_output(monkeypatch):
+    monkeypatch.setattr(settings.llm, "estimated_output_tokens", 300)
+    monkeypatch.setattr(settings.llm, "max_tokens", 2000)
+    token_counter = TokenCounter()
+    rate_limiter = RecordingRateLimiter()
+    step = IntertextualAnalysisStep(
+        client=SimpleNamespace(
+            beta=SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+        ),
+        prompt_generator=FakePromptGenerator(),
+        system_prompt="You are a literary critic.",
+        token_counter=token_counter,
+        rate_limiter=rate_limiter,
+    )
+    doc = Document(
+        content="the wine-dark sea", score=0.9, meta={"similarity_type": "similar"}
+    )
+
+    assert step.execute({"query_text": "the waves", "document": doc}) == "analysis"
+
+    messages = step.build_messages("the waves", doc)
+    assert rate_limiter.acquired == [token_counter.count_message_tokens(messages) + 300]
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from src.config.settings import settings
+from src.utils import metrics as metrics_module
+from src.utils.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Registry whose timed calls take 1, 2, ..., 100 ms in turn"""
+    ticks = iter(
+        moment for duration in range(1, 101) for moment in (0.0, duration / 1000)
+    )
+    monkeypatch.setattr(metrics_module.time, "perf_counter", lambda: next(ticks))
+    return MetricsRegistry(opentelemetry=False)
+
+
+def time_calls(registry, failures=0):
+    for i in range(100):
+        try:
+            with registry.timer("llm.request"):
+                if i < failures:
+                    raise ConnectionError("API unavailable")
+        except ConnectionError:
+            pass
+
+
+def test_percentiles_and_errors(registry):
+    time_calls(registry, failures=3)
+    registry.increment("llm.prompt_tokens", 1500)
+    registry.increment("llm.prompt_tokens", 500)
+
+    summary = registry.summary()
+    stage = summary["stages"]["llm.request"]
+    assert stage["count"] == 100
+    assert stage["errors"] == 3
+    assert stage["p50_s"] == pytest.approx(0.0505)
+    assert stage["p95_s"] == pytest.approx(0.09505)
+    assert stage["max_s"] == pytest.approx(0.1)
+    assert stage["total_s"] == pytest.approx(5.05)
+    assert summary["counters"]["llm.prompt_tokens"]["total"] == 2000
+
+
+def test_timed_decorator_counts_calls(registry):
+    @registry.timed("search")
+    def search(query):
+        return query
+
+    assert search("flowers") == "flowers"
+    assert registry.summary()["stages"]["search"]["count"] == 1
+
+
+def test_json_output(registry, tmp_path):
+    time_calls(registry, failures=1)
+    path = tmp_path / "metrics" / "run.json"
+
+    registry.write_json(path)
+
+    written = json.loads(path.read_text())
+    assert written["stages"]["llm.request"]["errors"] == 1
+    assert written["stages"]["llm.request"]["p50_s"] == pytest.approx(0.0505)
+
+
+def test_prometheus_output(registry):
+    time_calls(registry, failures=2)
+    registry.increment("embedding.tokens", 42)
+
+    lines = registry.to_prometheus().splitlines()
+
+    assert "# TYPE woolf_stage_duration_seconds summary" in lines
+    assert (
+        'woolf_stage_duration_seconds{stage="llm.request",quantile="0.5"} 0.0505'
+        in lines
+    )
+    assert 'woolf_stage_duration_seconds_count{stage="llm.request"} 100' in lines
+    assert 'woolf_stage_errors_total{stage="llm.request"} 2' in lines
+    assert "woolf_embedding_tokens_total 42" in lines
+
+
+def test_reset_discards_metrics(registry):
+    time_calls(registry)
+    registry.reset()
+    assert registry.summary()["stages"] == {}
+
+
+def test_spans_follow_settings_changed_at_runtime(monkeypatch):
+    monkeypatch.setattr(MetricsRegistry, "_create_tracer", staticmethod(object))
+    registry = MetricsRegistry()
+
+    monkeypatch.setattr(settings.metrics, "opentelemetry", True)
+    assert registry.tracer is not None
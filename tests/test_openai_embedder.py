@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from haystack import Document
+
+from src.config.settings import settings
+from src.embeddings.embedding_cache import EmbeddingCache
+from src.embeddings.openai_embedder import OpenAIEmbedder
+
+DIMENSION = 8
+
+
+class FlakyBatches:
+    """Embeds one text per batch, failing for texts containing "fail" """
+
+    def __init__(self):
+        self.embedded = []
+
+    def __call__(self, texts, cache):
+        if any("fail" in text for text in texts):
+            raise ConnectionError("API unavailable")
+        self.embedded.extend(texts)
+        return [np.full(DIMENSION, 1 / np.sqrt(DIMENSION)).tolist() for _ in texts]
+
+
+@pytest.fixture
+def embedder(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.embeddings, "dimension", DIMENSION)
+    monkeypatch.setattr(settings.embeddings, "native_dimension", DIMENSION)
+    monkeypatch.setattr(settings.embeddings, "cache_enabled", False)
+
+    embedder = OpenAIEmbedder()
+    embedder.document_cache = EmbeddingCache(cache_dir=tmp_path, dimension=DIMENSION)
+    # No API client is created; every text is a batch of its own
+    embedder.document_embedder = object()
+    embedder._token_batches = lambda texts: [[i] for i in range(len(texts))]
+    embedder._embed_batch = FlakyBatches()
+    return embedder
+
+
+def test_corpus_batches_persist_with_the_cache_disabled(embedder):
+    assert embedder.cache is None
+    documents = [Document(content=text) for text in ["a", "b", "fail"]]
+
+    with pytest.raises(RuntimeError, match="cached, re-run to resume"):
+        embedder.embed_documents(documents)
+
+    # The re-run only embeds the text whose batch failed
+    embedder._embed_batch = FlakyBatches()
+    documents[2] = Document(content="c")
+    embedded = embedder.embed_documents(documents)
+    assert embedder._embed_batch.embedded == ["c"]
+    assert all(doc.embedding is not None for doc in embedded)
+
+
+def test_failure_without_a_cache_does_not_promise_a_resume(embedder):
+    with pytest.raises(RuntimeError, match="were not persisted"):
+        embedder._embed_texts(["a", "fail"], cache=None)
+
+
+class FakeTextEmbedder:
+    def run(self, text):
+        return {"embedding": np.full(DIMENSION, 1 / np.sqrt(DIMENSION)).tolist()}
+
+
+def test_embeddings_are_lists_whether_cached_or_not(embedder, tmp_path):
+    embedder.cache = embedder.document_cache
+    embedder.text_embedder = FakeTextEmbedder()
+
+    missed, hit = embedder.embed_query("query"), embedder.embed_query("query")
+    assert type(missed) is list and type(hit) is list
+    np.testing.assert_allclose(hit, missed, rtol=1e-6)
+
+    embedder.embed_documents([Document(content="passage")])
+    (document,) = embedder.embed_documents([Document(content="passage")])
+    assert embedder._embed_batch.embedded == ["passage"]
+    assert type(document.embedding) is list
+
+
+def test_default_cache_follows_settings_changed_at_runtime(monkeypatch, tmp_path):
+    monkeypatch.setitem(settings.storage, "embeddings_dir", tmp_path)
+    monkeypatch.setattr(settings.embeddings, "api_model", "text-embedding-3-large")
+    monkeypatch.setattr(settings.embeddings, "dimension", 256)
+    monkeypatch.setattr(settings.embeddings, "native_dimension", 3072)
+    monkeypatch.setattr(settings.embeddings, "cache_enabled", True)
+
+    embedder = OpenAIEmbedder()
+
+    assert embedder.cache.db_path == tmp_path / "embeddings.sqlite"
+    assert embedder.cache.model == "text-embedding-3-large"
+    assert embedder.cache.dimension == 256
@@ -0,0 +1,43 @@
+import subprocess
+import sys
+
+import pytest
+
+from src.config.settings import settings
+from src.pipeline.orchestrator import PipelineOrchestrator
+from src.vector_store.quantized_index import QuantizedSimilarityIndex
+
+
+@pytest.mark.parametrize("backend", ["ivf", "qdrant"])
+def test_quantization_is_rejected_by_other_backends(monkeypatch, backend):
+    monkeypatch.setattr(settings.vector_store, "backend", backend)
+    monkeypatch.setattr(settings.embeddings, "quantization", "int8")
+
+    with pytest.raises(ValueError, match='only supported by the "numpy" backend'):
+        PipelineOrchestrator(token_counter=None).get_index("odyssey")
+
+
+def test_quantization_of_the_numpy_backend(monkeypatch):
+    monkeypatch.setattr(settings.vector_store, "backend", "numpy")
+    monkeypatch.setattr(settings.embeddings, "quantization", "pq")
+
+    index = PipelineOrchestrator(token_counter=None).get_index("odyssey")
+    assert isinstance(index, QuantizedSimilarityIndex)
+
+
+def test_importing_the_orchestrator_defers_heavy_dependencies():
+    # A fresh interpreter, since the test session has imported them already
+    deferred = [
+        "haystack",
+        "src.embeddings.openai_embedder",
+        "src.vector_store.numpy_index",
+        "src.utils.cost_estimator",
+    ]
+    code = (
+        "import sys, src.pipeline.orchestrator; "
+        f"print([name for name in {deferred!r} if name in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from src.config.settings import settings
+from src.data_preparation.preprocessing import TextPreprocessor
+
+WORDS = "sea wine dark ship morning flowers Clarissa bell Big Ben".split()
+
+
+def paragraphs(rng, count):
+    """Paragraphs of short sentences, wrapped over several lines"""
+    for _ in range(count):
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))).capitalize()
+            + "."
+            for _ in range(rng.randint(1, 6))
+        ]
+        yield "\n".join(
+            " ".join(sentences[i : i + 2]) for i in range(0, len(sentences), 2)
+        )
+
+
+@pytest.fixture
+def preprocessor(monkeypatch, request):
+    monkeypatch.setattr(settings.preprocessing, "strategy", request.param)
+    # Small windows, so every text is streamed in many windows
+    monkeypatch.setattr(settings.preprocessing, "stream_window_chars", 300)
+    return TextPreprocessor()
+
+
+def write_books(path):
+    """Text of three BOOK sections after a preface"""
+    rng = random.Random(1)
+    path.write_text(
+        "Preface skipped by both.\n\n"
+        + "\n\n".join(
+            f"BOOK {numeral}.\n\n" + "\n\n".join(paragraphs(rng, 15))
+            for numeral in ["I", "II", "III"]
+        )
+        + "\n"
+    )
+    return path
+
+
+def chunks(documents):
+    return [(doc.content, doc.meta) for doc in documents]
+
+
+@pytest.mark.parametrize("preprocessor", ["period", "word"], indirect=True)
+def test_streamed_text_chunks_match_whole_text_chunks(preprocessor, tmp_path):
+    path = tmp_path / "text.txt"
+    path.write_text("\n\n".join(paragraphs(random.Random(0), 40)) + "\n")
+
+    expected = preprocessor.process_text(str(path), "Mrs Dalloway")
+    streamed = list(preprocessor.iter_text(str(path), "Mrs Dalloway"))
+
+    assert len(expected) > 10
+    assert chunks(streamed) == chunks(expected)
+
+
+@pytest.mark.parametrize("preprocessor", ["period", "word"], indirect=True)
+def test_streamed_book_chunks_match_whole_text_chunks(preprocessor, tmp_path):
+    path = write_books(tmp_path / "books.txt")
+
+    expected = preprocessor.process_books(str(path), "The Odyssey")
+    streamed = list(preprocessor.iter_books(str(path), "The Odyssey"))
+
+    assert {doc.meta["book_number"] for doc in expected} == {1, 2, 3}
+    assert chunks(streamed) == chunks(expected)
+
+
+@pytest.mark.parametrize("preprocessor", ["period", "word"], indirect=True)
+def test_books_processed_in_parallel_match_serial_processing(
+    preprocessor, monkeypatch, tmp_path
+):
+    path = write_books(tmp_path / "books.txt")
+
+    monkeypatch.setattr(settings.preprocessing, "num_workers", 1)
+    serial = preprocessor.process_books(str(path), "The Odyssey")
+    monkeypatch.setattr(settings.preprocessing, "num_workers", 2)
+    parallel = preprocessor.process_books(str(path), "The Odyssey")
+
+    assert len(serial) > 10
+    assert chunks(parallel) == chunks(serial)
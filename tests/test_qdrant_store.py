@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from haystack import Document
+
+from src.config.settings import settings
+from src.vector_store.qdrant_store import QdrantManager
+
+DOCUMENTS = [
+    Document(id=str(i), content=f"passage {i}", embedding=[1.0, 0.0, 0.0, float(i)])
+    for i in range(3)
+]
+
+
+@pytest.fixture
+def open_index(tmp_path):
+    """Open persistent indexes under tmp_path, closing the previous one first
+
+    The local Qdrant store locks its directory while a client is open.
+    """
+    opened = []
+
+    def open_index(fingerprint="corpus-a", embedding_dim=4):
+        if opened:
+            opened[-1].document_store.close()
+        index = QdrantManager(
+            embedding_dim=embedding_dim, path=tmp_path, fingerprint=fingerprint
+        )
+        opened.append(index)
+        return index
+
+    yield open_index
+    opened[-1].document_store.close()
+
+
+def build(open_index):
+    index = open_index()
+    assert not index.is_current()
+    index.add_documents(DOCUMENTS)
+    return index
+
+
+def test_manifest_records_fingerprint_dimension_and_count(open_index, tmp_path):
+    build(open_index)
+
+    manifest = json.loads((tmp_path / "index_manifest.json").read_text())
+    assert manifest == {"fingerprint": "corpus-a", "embedding_dim": 4, "documents": 3}
+
+
+def test_same_corpus_reuses_the_index(open_index):
+    build(open_index)
+
+    index = open_index()
+    assert index.is_current()
+    assert index.document_store.count_documents() == 3
+
+
+@pytest.mark.parametrize("changes", [{"fingerprint": "corpus-b"}, {"embedding_dim": 8}])
+def test_changed_corpus_or_dimension_rebuilds_the_index(open_index, changes):
+    build(open_index)
+
+    index = open_index(**changes)
+    assert not index.is_current()
+    assert index.document_store.count_documents() == 0
+
+
+def test_count_mismatch_reindexes(open_index, tmp_path):
+    build(open_index)
+    manifest_path = tmp_path / "index_manifest.json"
+    manifest = json.loads(manifest_path.read_text())
+    manifest_path.write_text(json.dumps({**manifest, "documents": 4}))
+
+    index = open_index()
+    assert not index.is_current()
+    index.add_documents(DOCUMENTS)
+    assert open_index().is_current()
+
+
+def test_dimension_defaults_to_settings_changed_at_runtime(monkeypatch):
+    monkeypatch.setattr(settings.embeddings, "dimension", 16)
+    index = QdrantManager()
+    assert index.embedding_dim == 16
+    index.document_store.close()
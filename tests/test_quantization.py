@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from src.vector_store.quantization import (
+    ProductQuantizer,
+    ScalarQuantizer,
+    create_quantizer,
+)
+
+
+def unit_rows(rng, n, dim=32):
+    matrix = rng.normal(size=(n, dim)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    embeddings, queries = unit_rows(rng, 2000), unit_rows(rng, 5)
+    return embeddings, queries, queries @ embeddings.T
+
+
+def test_scalar_quantizer_scores_are_close_to_exact(data):
+    embeddings, queries, exact = data
+    quantizer = ScalarQuantizer().fit(embeddings)
+    codes = quantizer.encode(embeddings)
+
+    assert codes.dtype == np.int8 and codes.shape == embeddings.shape
+    np.testing.assert_allclose(quantizer.scores(codes, queries), exact, atol=0.01)
+
+
+def test_product_quantizer_keeps_the_nearest_neighbours(data):
+    embeddings, queries, exact = data
+    quantizer = ProductQuantizer(subvectors=8).fit(embeddings)
+    codes = quantizer.encode(embeddings)
+    scores = quantizer.scores(codes, queries)
+
+    assert codes.dtype == np.uint8 and codes.shape == (len(embeddings), 8)
+    assert scores.shape == exact.shape
+    assert np.corrcoef(scores.ravel(), exact.ravel())[0, 1] > 0.9
+    # The exact top 10 survive among the 100 candidates that are rescored
+    exact_top = np.argsort(-exact, axis=1)[:, :10]
+    candidates = np.argsort(-scores, axis=1)[:, :100]
+    recall = np.mean([np.isin(e, c).mean() for e, c in zip(exact_top, candidates)])
+    assert recall >= 0.9
+
+
+def test_product_quantizer_needs_subvectors_dividing_the_dimension(data):
+    embeddings, _, _ = data
+    with pytest.raises(ValueError, match="do not divide"):
+        ProductQuantizer(subvectors=5).fit(embeddings)
+
+
+def test_create_quantizer():
+    assert isinstance(create_quantizer("int8", 96), ScalarQuantizer)
+    assert create_quantizer("pq", 48).subvectors == 48
+    with pytest.raises(ValueError, match="Unknown quantization"):
+        create_quantizer("binary", 96)
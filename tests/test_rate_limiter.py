@@ -0,0 +1,69 @@
+import pytest
+
+from src.utils import rate_limiter
+from src.utils.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    """Monotonic clock that only advances when the limiter sleeps"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.slept += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_requests_wait_for_the_bucket_to_refill(clock):
+    limiter = RateLimiter(requests_per_minute=60)
+    for _ in range(60):
+        limiter.acquire()
+    assert clock.slept == 0
+
+    # One request per second is added back
+    limiter.acquire()
+    assert clock.slept == pytest.approx(1.0)
+
+    clock.now += 5
+    for _ in range(5):
+        limiter.acquire()
+    assert clock.slept == pytest.approx(1.0)
+
+
+def test_refill_is_capped_at_one_minute(clock):
+    limiter = RateLimiter(requests_per_minute=60)
+    clock.now += 600
+    for _ in range(61):
+        limiter.acquire()
+    assert clock.slept == pytest.approx(1.0)
+
+
+def test_tokens_wait_for_the_bucket_to_refill(clock):
+    limiter = RateLimiter(tokens_per_minute=600)
+    limiter.acquire(tokens=600)
+    limiter.acquire(tokens=300)
+    assert clock.slept == pytest.approx(30.0)
+
+    # A request larger than the bucket waits for a full bucket, not forever
+    limiter.acquire(tokens=10_000)
+    assert clock.slept == pytest.approx(90.0)
+
+
+def test_disabled_limits_never_wait(clock):
+    limiter = RateLimiter()
+    for _ in range(1000):
+        limiter.acquire(tokens=1_000_000)
+    assert clock.slept == 0
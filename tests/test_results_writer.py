@@ -0,0 +1,79 @@
+import pytest
+
+from src.utils.results_writer import (
+    PAIR_COLUMNS,
+    RESULT_COLUMNS,
+    ResultsWriter,
+    result_key,
+)
+
+
+def row(dalloway_text, odyssey_text, prompt_type="default", **extra):
+    return {
+        **{column: "" for column in RESULT_COLUMNS},
+        "dalloway_text": dalloway_text,
+        "odyssey_text": odyssey_text,
+        "prompt_type": prompt_type,
+        **extra,
+    }
+
+
+def test_completed_keys_of_a_missing_file(tmp_path):
+    assert ResultsWriter.completed_keys(tmp_path / "results.csv") == set()
+
+
+def test_completed_keys_survive_quoting(tmp_path):
+    path = tmp_path / "results.csv"
+    with ResultsWriter(path) as writer:
+        writer.write(row('Mrs Dalloway said,\n"flowers"', "Sing, O goddess"))
+        writer.write(row("Big Ben struck", "Sing, O goddess", "few_shot"))
+
+    assert ResultsWriter.completed_keys(path) == {
+        result_key('Mrs Dalloway said,\n"flowers"', "Sing, O goddess", "default"),
+        result_key("Big Ben struck", "Sing, O goddess", "few_shot"),
+    }
+
+
+def test_completed_keys_of_all_pairs_runs(tmp_path):
+    path = tmp_path / "results.csv"
+    with ResultsWriter(path, columns=RESULT_COLUMNS + PAIR_COLUMNS) as writer:
+        writer.write(row("a", "b", source_corpus="dalloway", target_corpus="odyssey"))
+        writer.write(row("a", "b", source_corpus="dalloway", target_corpus="ulysses"))
+
+    assert ResultsWriter.completed_keys(path) == {
+        result_key("a", "b", "default", "odyssey"),
+        result_key("a", "b", "default", "ulysses"),
+    }
+
+
+def test_appending_writes_the_header_once(tmp_path):
+    path = tmp_path / "results.csv"
+    for text in ["a", "b"]:
+        with ResultsWriter(path) as writer:
+            writer.write(row(text, "passage"))
+
+    lines = path.read_text().splitlines()
+    assert lines[0] == ",".join(RESULT_COLUMNS)
+    assert len(lines) == 3
+    assert ResultsWriter.completed_keys(path) == {
+        result_key("a", "passage", "default"),
+        result_key("b", "passage", "default"),
+    }
+
+
+@pytest.mark.parametrize(
+    "written, resumed",
+    [
+        (RESULT_COLUMNS, RESULT_COLUMNS + PAIR_COLUMNS),
+        (RESULT_COLUMNS + PAIR_COLUMNS, RESULT_COLUMNS),
+    ],
+)
+def test_resuming_with_other_columns_is_refused(tmp_path, written, resumed):
+    path = tmp_path / "results.csv"
+    with ResultsWriter(path, columns=written) as writer:
+        writer.write(row("a", "passage"))
+    contents = path.read_text()
+
+    with pytest.raises(ValueError, match="--all-pairs"):
+        ResultsWriter(path, columns=resumed)
+    assert path.read_text() == contents
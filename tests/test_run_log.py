@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.config.settings import settings
+from src.utils.run_log import RunLogger
+
+
+def read(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_close_flushes_queued_records(tmp_path):
+    run_log = RunLogger(log_dir=tmp_path)
+    for i in range(1000):
+        run_log.log("search", query=i, scores=np.array([0.5, 0.25]))
+
+    path = run_log.close()
+
+    records = read(path)
+    assert [record["query"] for record in records] == list(range(1000))
+    assert records[0]["event"] == "search"
+    assert records[0]["scores"] == [0.5, 0.25]
+    assert run_log.thread is None
+
+
+def test_logging_after_close_appends_to_the_same_file(tmp_path):
+    run_log = RunLogger(log_dir=tmp_path)
+    run_log.log("search", query=0)
+    path = run_log.close()
+    run_log.log("search", query=1)
+
+    assert run_log.close() == path
+    assert [record["query"] for record in read(path)] == [0, 1]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_nothing_logged_creates_no_file(tmp_path):
+    assert RunLogger(log_dir=tmp_path).close() is None
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize(
+    "verbosity, info, debug",
+    [("quiet", False, False), ("info", True, False), ("debug", True, True)],
+)
+def test_verbosity_levels(tmp_path, verbosity, info, debug):
+    run_log = RunLogger(log_dir=tmp_path, verbosity=verbosity)
+    assert run_log.enabled_for("info") is info
+    assert run_log.enabled_for("debug") is debug
+
+
+def test_sampling_keeps_about_the_sample_rate(tmp_path):
+    run_log = RunLogger(log_dir=tmp_path, sample_rate=0.25, seed=1)
+    kept = sum(run_log.sample() for _ in range(10_000))
+    assert 2_200 < kept < 2_800
+
+    assert all(RunLogger(log_dir=tmp_path, sample_rate=1).sample() for _ in range(100))
+
+
+def test_defaults_follow_settings_changed_at_runtime(monkeypatch, tmp_path):
+    run_log = RunLogger(log_dir=tmp_path)
+
+    monkeypatch.setattr(settings.run_log, "verbosity", "debug")
+    monkeypatch.setattr(settings.run_log, "sample_rate", 0.0)
+
+    assert run_log.enabled_for("debug")
+    assert not run_log.sample()
@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.config.settings import settings
+from src.utils import token_counter
+from src.utils.token_counter import TokenCounter
+
+MESSAGES = [
+    {"role": "system", "content": "You are a literary critic."},
+    {"role": "user", "content": "Compare the two passages."},
+]
+
+
+def track(model=None, **kwargs):
+    counter = TokenCounter()
+    counter.track_completion(
+        messages=MESSAGES,
+        prompt_tokens=3000,
+        cached_tokens=1000,
+        completion_tokens=500,
+        model=model,
+        **kwargs,
+    )
+    return counter.usage["completion"]["cost"]
+
+
+def expected_cost(model):
+    pricing = TokenCounter.PRICING[model]
+    return 2 * pricing["input"] + 1 * pricing["cached_input"] + 0.5 * pricing["output"]
+
+
+def test_completions_are_priced_by_the_answering_model():
+    assert track("gpt-4o-mini-2024-07-18") == pytest.approx(
+        expected_cost("gpt-4o-mini")
+    )
+    assert track("gpt-4o") == pytest.approx(expected_cost("gpt-4o"))
+
+
+def test_configured_model_prices_unreported_models(monkeypatch):
+    monkeypatch.setattr(settings.llm, "model", "gpt-4o-mini")
+    assert track() == pytest.approx(expected_cost("gpt-4o-mini"))
+
+
+def test_unknown_answering_models_are_priced_as_the_configured_model(monkeypatch):
+    monkeypatch.setattr(settings.llm, "model", "gpt-4o")
+    assert track("gpt-4o-experimental") == pytest.approx(expected_cost("gpt-4o"))
+
+
+TEXTS = [f"passage {i} " + "word " * i for i in range(10)]
+
+
+def test_batch_counts_match_single_counts():
+    counter = TokenCounter()
+    assert counter.count_tokens_batch(TEXTS) == [
+        counter.count_tokens(text) for text in TEXTS
+    ]
+
+
+def test_counts_split_across_processes_keep_their_order(monkeypatch):
+    # Threads stand in for worker processes, which wouldn't see the test encoding
+    monkeypatch.setattr(token_counter, "ProcessPoolExecutor", ThreadPoolExecutor)
+    counter = TokenCounter()
+
+    assert counter.count_tokens_batch(TEXTS, processes=3) == [
+        counter.count_tokens(text) for text in TEXTS
+    ]
+
+
+def test_message_counts_in_bulk_match_single_counts():
+    counter = TokenCounter()
+    messages_list = [
+        MESSAGES,
+        [MESSAGES[0], {"role": "user", "content": "Another pair of passages."}],
+    ]
+    assert counter.count_message_tokens_batch(messages_list) == [
+        counter.count_message_tokens(messages) for messages in messages_list
+    ]
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+from haystack import Document
+
+from src.config.settings import settings
+from src.vector_store.ivf_index import IVFSimilarityIndex
+from src.vector_store.numpy_index import (
+    NORM_BLOCK_SIZE,
+    NumpySimilarityIndex,
+    is_normalized,
+)
+from src.vector_store.quantization import ScalarQuantizer
+from src.vector_store.quantized_index import QuantizedSimilarityIndex
+
+
+def unit_rows(rng, n, dim=32):
+    matrix = rng.normal(size=(n, dim)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    embeddings = unit_rows(rng, 300)
+    documents = [Document(id=str(i), content=f"passage {i}") for i in range(300)]
+    return documents, embeddings, rng.normal(size=32)
+
+
+def ids(documents):
+    return [doc.id for doc in documents]
+
+
+def test_is_normalized_checks_every_block_of_a_memmap(tmp_path):
+    rows = unit_rows(np.random.default_rng(1), 2 * NORM_BLOCK_SIZE + 10, dim=4)
+    path = tmp_path / "embeddings.npy"
+    np.save(path, rows)
+    assert is_normalized(np.load(path, mmap_mode="r"))
+
+    rows[-1] *= 1.01
+    np.save(path, rows)
+    assert not is_normalized(np.load(path, mmap_mode="r"))
+    assert not is_normalized(rows.astype(np.float64))
+
+
+def test_ivf_probing_every_list_matches_exact_search(corpus):
+    documents, embeddings, query = corpus
+    exact = NumpySimilarityIndex()
+    exact.add_documents(documents, embeddings)
+
+    ivf = IVFSimilarityIndex(nlist=4, nprobe=4)
+    # Added in two parts, the second add re-clusters the grouped embeddings
+    ivf.add_documents(documents[:200], embeddings[:200])
+    ivf.add_documents(documents[200:], embeddings[200:])
+
+    expected, result = exact.search(query, 5), ivf.search(query, 5)
+    assert ids(result.similar) == ids(expected.similar)
+    assert ids(result.dissimilar) == ids(expected.dissimilar)
+    np.testing.assert_allclose(
+        [doc.score for doc in result.similar],
+        [doc.score for doc in expected.similar],
+        rtol=1e-5,
+    )
+
+
+def test_ivf_keeps_a_single_copy_of_the_embeddings(corpus):
+    documents, embeddings, _ = corpus
+    ivf = IVFSimilarityIndex(nlist=4)
+    ivf.add_documents(documents, embeddings)
+
+    assert ivf.matrix.size == 0
+    assert ivf.list_matrix.shape == embeddings.shape
+    np.testing.assert_array_equal(ivf.list_matrix, embeddings[ivf.list_rows])
+
+
+def test_numpy_block_size_defaults_to_settings_changed_at_runtime(monkeypatch):
+    monkeypatch.setattr(settings.vector_store, "query_block_size", 7)
+    assert NumpySimilarityIndex().query_block_size == 7
+
+
+def test_ivf_defaults_follow_settings_changed_at_runtime(monkeypatch):
+    monkeypatch.setattr(settings.vector_store, "ivf_nlist", 16)
+    monkeypatch.setattr(settings.vector_store, "ivf_nprobe", 3)
+    monkeypatch.setattr(settings.vector_store, "query_block_size", 7)
+
+    ivf = IVFSimilarityIndex()
+    assert (ivf.nlist, ivf.nprobe, ivf.query_block_size) == (16, 3, 7)
+
+
+def test_quantized_defaults_follow_settings_changed_at_runtime(monkeypatch):
+    monkeypatch.setattr(settings.embeddings, "rescore_candidates", 50)
+    monkeypatch.setattr(settings.vector_store, "query_block_size", 7)
+
+    index = QuantizedSimilarityIndex(quantizer=ScalarQuantizer())
+    assert (index.rescore_candidates, index.query_block_size) == (50, 7)
+
+
+def test_quantized_index_keeps_added_embeddings_in_place(corpus, tmp_path):
+    documents, embeddings, query = corpus
+    exact = NumpySimilarityIndex()
+    exact.add_documents(documents, embeddings)
+
+    path = tmp_path / "embeddings.npy"
+    np.save(path, embeddings[:200])
+    on_disk = np.load(path, mmap_mode="r")
+    embedded = [
+        Document(id=doc.id, content=doc.content, embedding=row.tolist())
+        for doc, row in zip(documents[200:], embeddings[200:])
+    ]
+    # Every document is rescored, so the results are exact
+    index = QuantizedSimilarityIndex(
+        quantizer=ScalarQuantizer(), rescore_candidates=300
+    )
+    index.add_documents(documents[:200], on_disk)
+    index.add_documents(embedded)
+
+    assert index.segments[0] is on_disk
+    assert index.segments[1].dtype == np.float32
+    assert all(doc.embedding is None for doc in index.documents)
+    assert all(doc.embedding is not None for doc in embedded)
+
+    expected, result = exact.search(query, 5), index.search(query, 5)
+    assert ids(result.similar) == ids(expected.similar)
+    assert ids(result.dissimilar) == ids(expected.dissimilar)